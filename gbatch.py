@@ -0,0 +1,364 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+gbatch.py - GeigerLog batch conversion of history and log files into databases
+
+Converts many files into *.hisdb or *.logdb databases - the same as done by
+GeigerLog's 'Get History from ...' and 'Get Log from CSV File' - but without
+any GUI, and in parallel: each file is converted by one of several worker
+processes, so all CPU cores are used. Throughput is reported per file.
+
+Start as:   geigerlog convert [Options] File ...
+       or:  gbatch.py         [Options] File ...
+
+Options:
+    -h, --help          Show this help and exit.
+    -d, --debug         Run with printing debug info.
+    -v, --verbose       Be more verbose.
+    -w, --werbose       Be much more verbose.
+    -j, --jobs N        Number of files converted in parallel.
+                        Default is the number of CPU cores.
+    -o, --outdir dir    Folder for the databases. Default is the
+                        folder of each file.
+    -s, --skip          Skip files whose database exists and is
+                        newer than the file.
+    -c, --columns cols  For *.his and *.log files: the CSV column
+                        numbers of Index, DateTime, CPM, CPS, CPM1st,
+                        CPS1st, CPM2nd, CPS2nd, CPM3rd, CPS3rd, T, P,
+                        H, X, comma separated; 'd' for a dummy column
+                        of missing values; see 'Get Data from CSV
+                        File'. Default is "0,1,2,3,4,5,6,7,8,9,10,11,12,13".
+
+File:   any number of files or glob patterns like 'archive/**/*.bin'; give
+        patterns in quotes to have them expanded here. Converted are:
+
+        *.bin           GMC binary history        --> <name>.hisdb
+        *.his           GMC parsed history (CSV)  --> <name>.hisdb
+        *.log           GeigerLog log (CSV)       --> <name>.logdb
+        *.dat           Gamma-Scout memory dump   --> <name>.dat.hisdb
+        *.CAM, *.CPS    AmbioMon binary history   --> <name>.CAM.hisdb
+
+        An existing database is overwritten. The files remain unchanged.
+"""
+
+###############################################################################
+#    This file is part of GeigerLog.
+#
+#    GeigerLog is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    GeigerLog is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with GeigerLog.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+__author__          = "ullix"
+__copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
+__credits__         = [""]
+__license__         = "GPL3"
+
+
+import gglobs
+gglobs.headless     = True                  # MUST be set BEFORE importing gutils!
+
+from   gutils       import *
+
+import glob
+import contextlib
+import multiprocessing
+import concurrent.futures                   # process pool of the workers
+
+import gsql
+import ghist
+import ggscout
+import gambiomon
+
+
+# the source for getHistory / getLogFile, and the extension of the database,
+# by file extension (lower case); Gamma-Scout and AmbioMon databases keep the
+# file extension in their name, as in getHistory
+fileTypes = {
+    ".bin": ("Binary File", ".hisdb"),
+    ".his": ("Parsed File", ".hisdb"),
+    ".log": ("CSV File",    ".logdb"),
+    ".dat": ("GSDatFile",   ".hisdb"),
+    ".cam": ("AMFileCAM",   ".hisdb"),
+    ".cps": ("AMFileCPS",   ".hisdb"),
+}
+
+# the CSV column of Index, DateTime, and the variables, as set in the dialog of
+# getCSV; -1 for None
+defaultPointer = list(range(gglobs.datacolsDefault + 1))
+
+# True when the config has been read in this process; see setupGlobals
+configured = False
+
+
+def setupGlobals(flags):
+    """Set paths and the command line flags, and read the config, as done by
+    GeigerLog at start. Called in the main process, and in each worker unless
+    it has already got them from the main process (start method 'fork')"""
+
+    global configured
+
+    gglobs.progName         = "geigerlog"           # to use the same config file as GeigerLog
+    gglobs.progPath         = getProgPath   ()
+    gglobs.gresPath         = getGresPath   ()
+    gglobs.dataPath         = getDataPath   ()
+    gglobs.proglogPath      = os.path.join(gglobs.dataPath, "gbatch.proglog")
+    gglobs.stdlogPath       = os.path.join(gglobs.dataPath, "gbatch.stdlog")
+    gglobs.configPath       = getConfigPath ()
+
+    for name, value in flags.items(): setattr(gglobs, name, value)
+
+    readGeigerLogConfig()
+    configured = True
+
+
+def initWorker(flags):
+    """Initializer of the worker processes"""
+
+    if not configured:
+        with quietOutput(flags["debug"]):
+            setupGlobals(flags)
+
+
+def quietOutput(debug):
+    """Context for printing only to the proglog file, not to the terminal,
+    unless in debug mode"""
+
+    if debug: return contextlib.nullcontext()
+
+    return contextlib.redirect_stdout(None)                     # print() does nothing
+
+
+def getJobs(patterns, outdir=None, skip=False):
+    """Expand the files and glob patterns. Return: (jobs, notes) with jobs a
+    list of (source, path, dbpath), largest file first, and notes the list of
+    files not converted, with the reason"""
+
+    paths = []
+    notes = []
+    for pattern in patterns:
+        found = sorted(glob.glob(pattern, recursive=True))
+        if len(found) == 0: notes.append((pattern, "no such file"))
+        paths += [path for path in found if os.path.isfile(path) and path not in paths]
+
+    jobs    = []
+    dbpaths = {}
+    for path in paths:
+        fname_base, fext = os.path.splitext(path)
+        if fext.lower() not in fileTypes:
+            notes.append((path, "unknown file type '{}'".format(fext)))
+            continue
+
+        source, dbext = fileTypes[fext.lower()]
+        dbpath = (path if source in ("GSDatFile", "AMFileCAM", "AMFileCPS") else fname_base) + dbext
+        if outdir is not None: dbpath = os.path.join(outdir, os.path.basename(dbpath))
+
+        if dbpath in dbpaths:
+            notes.append((path, "same database '{}' as for '{}'".format(dbpath, dbpaths[dbpath])))
+            continue
+        dbpaths[dbpath] = path
+
+        if skip and os.path.isfile(dbpath) and os.path.getmtime(dbpath) > os.path.getmtime(path):
+            notes.append((path, "database is up to date"))
+            continue
+
+        jobs.append((source, path, dbpath))
+
+    # the largest files first, so that no single large file is left at the end
+    jobs.sort(key=lambda job: os.path.getsize(job[1]), reverse=True)
+
+    return jobs, notes
+
+
+def makeDatabase(source, path, dbpath):
+    """Convert the file path into the database dbpath, as getHistory or
+    getLogFile do. Return: (error, message, records)"""
+
+    gglobs.binFilePath  = None
+    gglobs.hisFilePath  = None
+    gglobs.datFilePath  = None
+    gglobs.hisDBPath    = dbpath
+
+    gsql.DB_deleteDatabase(None, dbpath)
+    gglobs.hisConn      = gsql.DB_openDatabase(None, dbpath)
+    gglobs.currentConn  = gglobs.hisConn                # DB_convertCSVtoDB writes comments into it
+
+    try:
+        if   source == "Binary File":
+            gglobs.binFilePath  = path
+            error, message      = ghist.makeHistory(source)
+
+        elif source in ("Parsed File", "CSV File"):
+            gsql.DB_convertCSVtoDB(gglobs.hisConn, path)
+            error, message      = 0, ""
+
+        elif source == "GSDatFile":
+            gglobs.datFilePath  = path
+            gglobs.GSActivation = True                  # no device needed for a file
+            error, message      = ggscout.GSmakeHistory(source, gglobs.GSDeviceName)
+
+        elif source in ("AMFileCAM", "AMFileCPS"):
+            gglobs.AMFilePath       = path
+            gglobs.AmbioActivation  = True              # no device needed for a file
+            error, message          = gambiomon.AMmakeHistory(source, gglobs.AmbioDeviceName)
+
+        records = gglobs.hisConn.execute("SELECT count(*) FROM data").fetchone()[0]
+
+    finally:
+        gsql.DB_closeDatabase(gglobs.hisConn)
+        gglobs.hisConn      = None
+        gglobs.currentConn  = None
+
+    return error, message, records
+
+
+def convertFile(job):
+    """Convert a single file in a worker process; the output of the
+    conversion goes only to the proglog file, unless in debug mode. Return:
+    dict with the path, dbpath, error, message, bytes, records, and duration"""
+
+    source, path, dbpath = job
+
+    start = time.time()
+    try:
+        with quietOutput(gglobs.debug):
+            error, message, records = makeDatabase(source, path, dbpath)
+    except Exception as e:
+        error, message, records = -1, "Exception: {}".format(e), 0
+
+    return {"path": path, "dbpath": dbpath, "error": error, "message": message,
+            "bytes": os.path.getsize(path), "records": records, "duration": time.time() - start}
+
+
+def printResult(result):
+    """Print the line of a converted file with its throughput"""
+
+    duration = max(result["duration"], 1e-6)
+    status   = "ERROR" if result["error"] == -1 else "OK"
+    print("{:5s} {:>10,.1f} kB {:>10,d} rec {:>8.2f} s {:>10,.1f} kB/s {:>10,.0f} rec/s  {} --> {}".format(
+            status, result["bytes"] / 1000, result["records"], duration,
+            result["bytes"] / 1000 / duration, result["records"] / duration,
+            result["path"], os.path.basename(result["dbpath"])))
+    if result["error"] == -1: print("      " + cleanHTML(result["message"]))
+
+
+def convertFiles(jobs, nworkers):
+    """Convert all jobs with nworkers processes, one file per worker at a
+    time. Return: list of the result dicts of convertFile"""
+
+    # 'fork' gives the workers the config of this process, and does not run
+    # the main script again, as 'spawn' would; not available on Windows
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    flags   = {name: getattr(gglobs, name) for name in ("debug", "verbose", "werbose", "pointer")}
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nworkers, mp_context=context,
+                                                initializer=initWorker, initargs=(flags,)) as executor:
+        futures = [executor.submit(convertFile, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            printResult(result)
+            results.append(result)
+
+    return results
+
+
+def main():
+
+    try:
+        opts, args = getopt.getopt([a for a in sys.argv[1:] if a != "convert"],     # 'convert' when started via geigerlog
+                                   "hdvwj:o:sc:", ["help", "debug", "verbose", "werbose", "jobs=", "outdir=", "skip", "columns="])
+    except getopt.GetoptError as errmessage:
+        print("ERROR: '{}', use 'gbatch.py -h' for help".format(errmessage))
+        return 1
+
+    flags    = {"debug": False, "verbose": False, "werbose": False, "pointer": defaultPointer}
+    nworkers = os.cpu_count() or 1
+    outdir   = None
+    skip     = False
+    for opt, optval in opts:
+        if   opt in ("-h", "--help"):
+            print(__doc__)
+            return 0
+
+        elif opt in ("-d", "--debug"):
+            flags["debug"]      = True
+
+        elif opt in ("-v", "--verbose"):
+            flags["verbose"]    = True
+            flags["debug"]      = True
+
+        elif opt in ("-w", "--werbose"):
+            flags["werbose"]    = True
+            flags["verbose"]    = True
+            flags["debug"]      = True
+
+        elif opt in ("-j", "--jobs"):
+            try:    nworkers = int(optval)
+            except: nworkers = 0
+            if nworkers < 1:
+                print("ERROR: jobs must be a number of at least 1; got: '{}'".format(optval))
+                return 1
+
+        elif opt in ("-o", "--outdir"):
+            outdir = optval
+            if not os.path.isdir(outdir) or not os.access(outdir, os.W_OK):
+                print("ERROR: Folder '{}' does not exist or is not writable".format(outdir))
+                return 1
+
+        elif opt in ("-s", "--skip"):
+            skip = True
+
+        elif opt in ("-c", "--columns"):
+            try:    pointer = [-1 if col.strip() == "d" else int(col) for col in optval.split(",")]
+            except: pointer = []
+            if not 2 <= len(pointer) <= len(defaultPointer) or min(pointer) < -1:
+                print("ERROR: columns must be up to {} comma separated numbers or 'd'; got: '{}'".format(len(defaultPointer), optval))
+                return 1
+            flags["pointer"] = pointer + [-1] * (len(defaultPointer) - len(pointer))
+
+    if len(args) == 0:
+        print("ERROR: no files given, use 'gbatch.py -h' for help")
+        return 1
+
+    with quietOutput(flags["debug"]):
+        setupGlobals(flags)
+        clearProgramLogFile()
+
+    jobs, notes = getJobs(args, outdir, skip)
+    for path, reason in notes: print("SKIP  {} - {}".format(path, reason))
+    if len(jobs) == 0:
+        print("Nothing to convert")
+        return 0
+
+    nworkers = min(nworkers, len(jobs))
+    print("Converting {} files with {} processes".format(len(jobs), nworkers))
+
+    start   = time.time()
+    results = convertFiles(jobs, nworkers)
+    wall    = max(time.time() - start, 1e-6)
+
+    failed  = sum(1 for result in results if result["error"] == -1)
+    nbytes  = sum(result["bytes"]    for result in results)
+    records = sum(result["records"]  for result in results)
+    busy    = sum(result["duration"] for result in results)
+    print("Converted {} files, {} failed, {} skipped: {:,.1f} MB, {:,d} records in {:0.2f} s ({:,.2f} MB/s, {:,.0f} rec/s); "
+          "speedup by {} processes: {:0.1f}x".format(len(results) - failed, failed, len(notes), nbytes / 1E6, records, wall,
+                                                    nbytes / 1E6 / wall, records / wall, nworkers, busy / wall))
+
+    return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+"""
+gcatalog.py - GeigerLog catalog of the database files in a folder, and the
+merged timeline of several of them
+
+use in programs with:
+    import gcatalog
+"""
+
+###############################################################################
+#    This file is part of GeigerLog.
+#
+#    GeigerLog is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    GeigerLog is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with GeigerLog.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+__author__          = "ullix"
+__copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
+__credits__         = [""]
+__license__         = "GPL3"
+
+from   gutils       import *
+
+import concurrent.futures       # parallel indexing and loading of files
+
+import gsql
+
+
+# the index of the database files is kept in this file in the data folder
+catalogName     = "geigerlog.catalog"
+
+# max number of files indexed or loaded in parallel
+maxWorkers      = min(8, os.cpu_count() or 1)
+
+# the columns of the index; vnames is a comma separated list of the variables
+# having values, device the name of the device from table device (history),
+# or from the latest DEVICES comment (log); parts the number of partitions
+sqlCreateCatalog = """
+    CREATE TABLE IF NOT EXISTS catalog
+         (
+          path      TEXT PRIMARY KEY,
+          size      INTEGER,
+          mtime     REAL,
+          nrows     INTEGER,
+          first     REAL,
+          last      REAL,
+          vnames    TEXT,
+          device    TEXT,
+          parts     INTEGER
+         )
+    """
+
+catalogColumns  = ("path", "size", "mtime", "nrows", "first", "last", "vnames", "device", "parts")
+
+# all records of a single file, in the layout of getDataFromDatabase
+sqlTimeline = """
+    SELECT Julianday - {}, {}
+    FROM main.data
+    WHERE Julianday IS NOT NULL
+    ORDER BY Julianday
+    """.format(gglobs.JULIAN111, ", ".join(gglobs.varnames))
+
+
+def indexDatabase(path):
+    """Read the index data of the database file path. Return: dict with the
+    keys of catalogColumns, or None if not a GeigerLog database. May be
+    called in any thread"""
+
+    fncname = "indexDatabase: "
+
+    try:
+        stat   = os.stat(path)
+        conn   = gsql.DB_openReader(path, [])
+        counts = ", ".join("count({})".format(vname) for vname in gglobs.varnames)
+        row    = conn.execute("SELECT count(*), min(Julianday), max(Julianday), {} FROM main.data".format(counts)).fetchone()
+
+        device = conn.execute("SELECT dname FROM main.device ORDER BY ROWID DESC LIMIT 1").fetchone()
+        if device is None:
+            device = conn.execute("SELECT cinfo FROM main.comments WHERE ctype = 'DEVICES' ORDER BY ROWID DESC LIMIT 1").fetchone()
+        device = "" if device is None else str(device[0]).replace("Connected: ", "")
+
+        parts  = len(gsql.DB_getPartitions(conn))
+        conn.close()
+
+    except Exception as e:
+        wprint(fncname + "not a GeigerLog database: '{}': ".format(path), e)
+        return None
+
+    vnames = [vname for vname, count in zip(gglobs.varnames, row[3:]) if count > 0]
+
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime, "nrows": row[0],
+            "first": row[1], "last": row[2], "vnames": ",".join(vnames), "device": device, "parts": parts}
+
+
+def hasWal(path):
+    """True if the database file path has a WAL file holding data, see
+    gsql.DB_setWAL"""
+
+    try:    return os.path.getsize(path + "-wal") > 0
+    except: return False                                    # no WAL file
+
+
+def scanCatalog(folder):
+    """Update the index of all *.logdb and *.hisdb files in folder: files
+    new or changed since the last scan are indexed, in parallel, the others
+    are taken from the catalog file. Return: list of the index dicts, sorted
+    by path"""
+
+    fncname = "scanCatalog: "
+
+    start   = time.time()
+    paths   = sorted(entry.path for entry in os.scandir(folder) if entry.is_file() and entry.name.endswith((".logdb", ".hisdb")))
+
+    catconn = sqlite3.connect(os.path.join(folder, catalogName))
+    catconn.execute(sqlCreateCatalog)
+    known   = {row[0]: dict(zip(catalogColumns, row)) for row in catconn.execute("SELECT {} FROM catalog".format(", ".join(catalogColumns))).fetchall()}
+
+    # a file with records in its WAL file, e.g. one being logged to, is always
+    # indexed, as its own size and mtime change only at a checkpoint
+    todo    = []
+    for path in paths:
+        stat = os.stat(path)
+        item = known.get(path)
+        if item is None or item["size"] != stat.st_size or item["mtime"] != stat.st_mtime or hasWal(path): todo.append(path)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        for path, item in zip(todo, executor.map(indexDatabase, todo)):
+            known[path] = item
+
+    catalog = [known[path] for path in paths if known.get(path) is not None]
+
+    catconn.execute("DELETE FROM catalog")
+    catconn.executemany("INSERT INTO catalog ({}) VALUES ({})".format(", ".join(catalogColumns), ", ".join("?" * len(catalogColumns))),
+                        [[item[col] for col in catalogColumns] for item in catalog])
+    catconn.commit()
+    catconn.close()
+
+    dprint(fncname + "{} files, {} indexed, in {:0.1f} ms".format(len(catalog), len(todo), (time.time() - start) * 1000))
+
+    return catalog
+
+
+def printCatalog(folder):
+    """Print the catalog of the database files in folder to the NotePad"""
+
+    fprint(header("Catalog of Databases"))
+    fprint("Folder:", folder)
+
+    catalog = scanCatalog(folder)
+    if len(catalog) == 0:
+        fprint("No databases found")
+        return
+
+    fmt = "{:30s} {:19s} {:19s} {:>10s}  {}"
+    fprint(fmt.format("File", "First", "Last", "Records", "Variables / Device"))
+    for item in catalog:
+        first, last = [julianToString(j) for j in (item["first"], item["last"])]
+        name        = os.path.basename(item["path"])
+        if item["parts"] > 0: name += " +{}".format(item["parts"])
+        fprint(fmt.format(name, first, last, "{:n}".format(item["nrows"]), item["vnames"]))
+        if item["device"] != "": fprint(fmt.format("", "", "", "", item["device"]))
+
+
+def julianToString(julian):
+    """'2018-10-11 12:33:44' for the Julianday, or '' if None"""
+
+    if julian is None: return ""
+
+    return (datetime.datetime(1970, 1, 1) + datetime.timedelta(days=julian - 2440587.5)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def loadDataArray(path):
+    """Read all records of the database file path, without its partitions.
+    Return: array in the layout of getDataFromDatabase, None as NAN. May be
+    called in any thread"""
+
+    conn = gsql.DB_openReader(path, [])
+    try:        rows = conn.execute(sqlTimeline).fetchall()
+    finally:    conn.close()
+
+    return np.array(rows, dtype=np.float64).reshape(len(rows), 1 + len(gglobs.varnames))
+
+
+def loadTimeline(paths):
+    """Load the records of all database files paths, in parallel, and merge
+    them into a single timeline. Return: (dataArray, varchecked) like
+    getDataFromDatabase"""
+
+    fncname = "loadTimeline: "
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        arrays = list(executor.map(loadDataArray, paths))
+
+    dataArray = np.concatenate(arrays) if len(arrays) > 0 else np.empty((0, 1 + len(gglobs.varnames)))
+    if np.any(np.diff(dataArray[:, 0]) < 0):                           # files overlapping in time
+        dataArray = dataArray[np.argsort(dataArray[:, 0], kind="stable")]
+
+    varchecked = {vname: bool(np.any(~np.isnan(dataArray[:, i + 1]))) for i, vname in enumerate(gglobs.varnames)}
+
+    dprint(fncname + "{:n} records from {} files in {:0.1f} ms".format(dataArray.shape[0], len(paths), (time.time() - start) * 1000))
+
+    return dataArray, varchecked
+
+
+def createMergedDatabase(paths, mergedPath):
+    """Create the database mergedPath, with the files paths as its partitions:
+    reading it spans all of them, see gsql.DB_fetchall. Any previous file
+    mergedPath is overwritten; the files paths remain unchanged"""
+
+    fncname = "createMergedDatabase: "
+
+    # a log with partitions is taken with all its partition files
+    allpaths = []
+    for path in paths:
+        conn = gsql.DB_openReader(path, [])
+        allpaths += gsql.DB_getPartitions(conn) + [path]
+        conn.close()
+
+    items = [indexDatabase(path) for path in allpaths]
+    items = sorted([item for item in items if item is not None], key=lambda item: item["first"] or 0)
+
+    gsql.DB_deleteDatabase(None, mergedPath)
+    conn = sqlite3.connect(mergedPath, isolation_level="EXCLUSIVE")
+    gsql.DB_createStructure(conn)
+    conn.execute(gsql.sqlCreatePartitions)
+    conn.executemany("INSERT INTO partitions (pname, pfirst, plast, prows) VALUES (?, ?, ?, ?)",
+                     [(os.path.abspath(item["path"]), item["first"], item["last"], item["nrows"]) for item in items])
+    gsql.DB_commit(conn)
+    conn.close()
+
+    dprint(fncname + "'{}' with {} files".format(mergedPath, len(items)))
+
+    return len(items)
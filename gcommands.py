@@ -1186,7 +1186,7 @@ def getDateTimeAsNum():
         #fprint("getDateTimeAsNum: Device Date & Time:", errmessage, error=True, debug=True)
         return gglobs.NAN
     else:
-        delta = (mpld.datestr2num(str(rec)) - mpld.datestr2num(stime())) * 86400
+        delta = datestr2num(str(rec)) - datestr2num(stime())     # in sec; no matplotlib needed
         wprint("getDateTimeAsNum: str(rec):", str(rec), ", Delta:", delta)
         return round(delta, 0) # 1 sec precision
 
@@ -0,0 +1,331 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+gdaemon.py - GeigerLog headless logging daemon
+
+Logs all devices activated in the configuration file geigerlog.cfg into a
+*.logdb database - the same format as used by GeigerLog - but without any GUI,
+i.e. neither Qt nor matplotlib will be imported. Intended for unattended
+monitoring nodes.
+
+Start as:   geigerlog daemon [Options] [LogDBFile]
+       or:  gdaemon.py       [Options] [LogDBFile]
+Stop with:  CTRL-C, or SIGTERM (e.g. 'kill <pid>')
+
+Options:
+    -h, --help          Show this help and exit.
+    -d, --debug         Run with printing debug info.
+    -v, --verbose       Be more verbose.
+    -w, --werbose       Be much more verbose.
+    -c, --cycle sec     Logcycle in seconds (at least 0.1s); overrides
+                        the setting in the config file and in the database.
+
+LogDBFile:  the database to log into; a relative path is relative to the data
+            directory. The extension '.logdb' is added if missing. An existing
+            file will be appended. Default is 'gdaemon.logdb'.
+"""
+
+###############################################################################
+#    This file is part of GeigerLog.
+#
+#    GeigerLog is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    GeigerLog is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with GeigerLog.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+__author__          = "ullix"
+__copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
+__credits__         = [""]
+__license__         = "GPL3"
+
+
+import gglobs
+gglobs.headless     = True                  # MUST be set BEFORE importing gutils!
+
+from   gutils       import *
+
+import importlib                            # glabjack is imported only when LabJack is activated
+
+import gcommands
+import gradmon
+import gambiomon
+import gi2c
+import ggscout
+import gsounddev
+import graspi
+
+import gsql
+import glogcycle
+
+
+class GeigerLogDaemon():
+    """Connects the configured devices and logs their values into a database
+    on a fixed schedule, as does GeigerLog's getLogValues, but without GUI"""
+
+    def __init__(self, cycleOverride=None):
+
+        gglobs.exgg         = self          # gcommands calls exgg.addError()
+        self.stopEvent      = threading.Event()
+        self.cycleOverride  = cycleOverride # logcycle given on command line, or None
+        self.glabjack       = None          # the module glabjack, once imported
+
+
+    def addError(self, errtext):
+        """Adds ERROR info from gcommands as comment to the current log"""
+
+        logPrint("#COMMENT, {}, {}".format(stime(), errtext))
+
+        if not gglobs.logConn is None:
+            gsql.DB_insertComments(gglobs.logConn, [["DevERROR", "NOW", "localtime", errtext]])
+
+
+    def openLogDatabase(self, logDBPath):
+        """Open existing or create new log database; as getLogFile of GeigerLog"""
+
+        fncname = "openLogDatabase: "
+
+        gglobs.logFilePath  = None
+        gglobs.logDBPath    = logDBPath
+        gglobs.currentDBPath= logDBPath
+
+        dprint(fncname + "Log database: '{}'".format(logDBPath))
+        setDebugIndent(1)
+
+        if not os.path.isfile(logDBPath):
+            linfo = "LogFile newly created as '{}'".format(os.path.basename(logDBPath))
+            logPrint("#HEADER , {}, ".format(stime()) + linfo)
+            gglobs.logConn = gsql.DB_openDatabase(gglobs.logConn, logDBPath)
+            if gglobs.compactSchema:
+                gsql.DB_createCompact(gglobs.logConn, [vname for vname in gglobs.varnames if gglobs.loggableVars[vname]])
+            gsql.DB_insertComments(gglobs.logConn, [["HEADER", "NOW", "localtime", linfo]])
+        else:
+            gglobs.logConn = gsql.DB_openDatabase(gglobs.logConn, logDBPath)
+        gsql.DB_setWAL(gglobs.logConn)
+
+        # the logcycle stored in the database is used, unless given on the command line
+        testcycle = gsql.DB_readLogcycle(gglobs.logConn)
+        if testcycle is None:
+            gsql.DB_insertLogcycle(gglobs.logConn, gglobs.logcycle)
+        elif self.cycleOverride is None:
+            gglobs.logcycle = testcycle
+        else:
+            gsql.DB_updateLogcycle(gglobs.logConn, gglobs.logcycle)
+
+        setDebugIndent(0)
+
+
+    def connectDevices(self):
+        """Connect all activated devices; as switchConnections of GeigerLog"""
+
+        fncname = "connectDevices: "
+
+        dprint(fncname)
+        setDebugIndent(1)
+
+        if gglobs.GMCActivation:
+            errmsg = gcommands.initGMC()
+            if gglobs.GMCConnection:    gcommands.getDeviceProperties()
+            else:                       edprint(fncname + "GMC: " + errmsg)
+
+        if gglobs.AudioActivation:      gsounddev.initSounddev()
+        if gglobs.I2CActivation:        gi2c.initI2C()
+        if gglobs.RMActivation:         gradmon.initRadMon()
+        if gglobs.AmbioActivation:      gambiomon.initAmbioMon()
+
+        if gglobs.LJActivation:
+            self.glabjack = importlib.import_module("glabjack")
+            self.glabjack.initLabJack()
+
+        if gglobs.GSActivation:         ggscout.initGammaScout()
+        if gglobs.RaspiActivation:      graspi.initRaspi()
+
+        gglobs.textDevVars     = ""
+        gglobs.activeVariables = 0
+        gglobs.varMap          = {}
+        for vname in gglobs.varnames:    gglobs.varMap[vname] = 0
+
+        for devname in gglobs.DevicesNames:
+            if gglobs.DevicesVars[devname] != None and glogcycle.isDeviceConnected(devname):
+                gglobs.textDevVars              += "{}(".format(devname)
+                for vname in gglobs.DevicesVars[devname]:
+                    gglobs.varMap[vname]        += 1
+                    gglobs.activeVariables      += 1
+                    gglobs.textDevVars          += " {}".format(vname)
+                    gglobs.loggableVars[vname]   = True
+                    gglobs.varcheckedLog[vname]  = True
+                gglobs.textDevVars += " ); "
+
+        dprint(fncname + "Connected: {}".format(gglobs.textDevVars))
+        setDebugIndent(0)
+
+
+    def disconnectDevices(self):
+        """Terminate all connected devices"""
+
+        if gglobs.GMCConnection:        gcommands.terminateGMC()
+        if gglobs.AudioConnection:      gsounddev.terminateSounddev()
+        if gglobs.I2CConnection:        gi2c.terminateI2C()
+        if gglobs.RMConnection:         gradmon.terminateRadMon()
+        if gglobs.AmbioConnection:      gambiomon.terminateAmbioMon()
+        if gglobs.LJConnection and self.glabjack is not None:   self.glabjack.terminateLabJack()
+        if gglobs.GSConnection:         ggscout.terminateGammaScout(gglobs.GSDeviceName)
+        if gglobs.RaspiConnection:      graspi.terminateRaspi()
+
+
+    def getLogValues(self):
+        """Reads variables from all connected devices and saves them to the
+        database; the same as getLogValues of GeigerLog, without GUI"""
+
+        glogcycle.runLogRecord()
+        glogcycle.finishLogRecord()
+
+
+    def run(self):
+        """Logs until stopped. Cycles are scheduled by CycleScheduler at
+        absolute deadlines; cycles which cannot be met are skipped and
+        recorded as comment"""
+
+        fncname = "run: "
+
+        if gglobs.activeVariables == 0:
+            edprint(fncname + "No variables for logging available; Logging is not possible!")
+            return 1
+
+        gglobs.logging      = True
+        gglobs.cpm_counter  = 0
+        gglobs.logTiming    = CycleTiming()
+        if gglobs.timingTable: gsql.DB_createTiming(gglobs.logConn)
+        if gsql.DB_isCompact(gglobs.logConn):
+            gsql.DB_createCompact(gglobs.logConn, [vname for vname in gglobs.varnames if gglobs.loggableVars[vname]])
+
+        comments    = []
+        comments.append(["DEVICES", "NOW", "localtime", "Connected: {}"         .format(gglobs.textDevVars)])
+        comments.append(["LOGGING", "NOW", "localtime", "Start: Cycle: {} sec"  .format(gglobs.logcycle)])
+        gsql.DB_insertComments(gglobs.logConn, comments)
+        for c in comments: logPrint("#{}, {}, {}".format(c[0], stime(), c[3]))
+
+        if gglobs.GMCConnection:        gcommands.getExtraByte()     # clean pipeline
+
+        scheduler   = CycleScheduler(gglobs.logcycle)
+        while not self.stopEvent.is_set():
+            scheduler.begin()
+            self.getLogValues()
+
+            wait, missed = scheduler.next()
+            if missed > 0:
+                cinfo = "Missed {} cycle(s); last cycle took {:0.3f} sec (total missed: {})".format(missed, gglobs.logTiming.last["Total"] / 1000, scheduler.missed)
+                dprint(fncname + cinfo)
+                logPrint("#MISSED, {}, {}".format(stime(), cinfo))
+                gsql.DB_insertComments(gglobs.logConn, [["MISSED", "NOW", "localtime", cinfo]])
+
+            self.stopEvent.wait(wait)
+
+        gglobs.logging = False
+
+        timing = gglobs.logTiming
+        dprint(fncname + "Timing: {} cycles, {} overruns; durations in ms:".format(timing.cycles, timing.overruns))
+        for row in timing.summary():
+            dprint(fncname + "   {:15s} Count:{:8d}  Last:{:8.2f}  P_50%:{:8.2f}  P_95%:{:8.2f}  P_99%:{:8.2f}  Max:{:8.2f}".format(*row))
+
+        gsql.DB_insertComments(gglobs.logConn, [["LOGGING", "NOW", "localtime", "Stop"]])
+        logPrint("#LOGGING, {}, Stop".format(stime()))
+
+        if gglobs.GMCConnection:        gcommands.getExtraByte()
+
+        return 0
+
+
+    def stop(self, signum=None, frame=None):
+        """Signal handler for SIGINT, SIGTERM; ends the logging loop"""
+
+        dprint("stop: received signal: {}".format(signum))
+        self.stopEvent.set()
+
+
+def main():
+
+    gglobs.progName         = "geigerlog"           # to use the same config file as GeigerLog
+    gglobs.progPath         = getProgPath   ()
+    gglobs.gresPath         = getGresPath   ()
+    gglobs.dataPath         = getDataPath   ()
+    gglobs.proglogPath      = os.path.join(gglobs.dataPath, "gdaemon.proglog")
+    gglobs.stdlogPath       = os.path.join(gglobs.dataPath, "gdaemon.stdlog")
+    gglobs.configPath       = getConfigPath ()
+
+    argv = [a for a in sys.argv[1:] if a != "daemon"]   # 'daemon' when started via geigerlog
+    try:
+        opts, args = getopt.getopt(argv, "hdvwc:", ["help", "debug", "verbose", "werbose", "cycle="])
+    except getopt.GetoptError as errmessage:
+        print("ERROR: '{}', use 'gdaemon.py -h' for help".format(errmessage))
+        return 1
+
+    cycle = None
+    for opt, optval in opts:
+        if   opt in ("-h", "--help"):
+            print(__doc__)
+            return 0
+
+        elif opt in ("-d", "--debug"):
+            gglobs.debug    = True
+
+        elif opt in ("-v", "--verbose"):
+            gglobs.verbose  = True
+            gglobs.debug    = True
+
+        elif opt in ("-w", "--werbose"):
+            gglobs.werbose  = True
+            gglobs.verbose  = True
+            gglobs.debug    = True
+
+        elif opt in ("-c", "--cycle"):
+            try:    cycle = float(optval)
+            except: cycle = -1
+            if cycle < 0.1:
+                print("ERROR: logcycle must be a number of at least 0.1 sec; got: '{}'".format(optval))
+                return 1
+
+    if not os.access(gglobs.dataPath, os.W_OK):
+        print("ERROR: main: Data directory '{}' does not exist or is not writable".format(gglobs.dataPath))
+        return 1
+
+    clearProgramLogFile()
+
+    readGeigerLogConfig()
+    if gglobs.startup_failure != "":
+        print("ERROR: " + cleanHTML(gglobs.startup_failure.replace("<br>", " ")))
+        return 1
+
+    if cycle is not None: gglobs.logcycle = cycle
+
+    logDBPath = args[0] if len(args) > 0 else "gdaemon.logdb"
+    if not logDBPath.endswith(".logdb"):    logDBPath += ".logdb"
+    if not os.path.isabs(logDBPath):        logDBPath  = os.path.join(gglobs.dataPath, logDBPath)
+
+    daemon = GeigerLogDaemon(cycleOverride=cycle)
+
+    signal.signal(signal.SIGINT,  daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+
+    daemon.openLogDatabase(logDBPath)
+    daemon.connectDevices()
+    try:
+        status = daemon.run()
+    finally:
+        daemon.disconnectDevices()
+        gsql.DB_closeDatabase(gglobs.logConn)
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -51,7 +51,15 @@ startup_failure     = ""                  # if configuration file is missing or
 # pointers
 exgg                = None                # pointer to ggeiger
 notePad             = None                # pointer to print into notePad area
+notePadBuffer       = []                  # texts from fprint not yet written to the notePad
+notePadRate         = 20                  # max number of writes to the notePad per second
+notePadMaxLines     = 200000              # max number of lines in the notePad; oldest are removed
+notePadFlushed      = 0                   # time of last write to the notePad
+notePadTimer        = False               # True if a write to the notePad is scheduled
+notePadUpdating     = False               # True while fprint is processing Qt events
 logPad              = None                # pointer to print into logPad area
+logPadMaxLines      = 2000                # number of lines kept in the logPad; older lines are loaded from the database on scrolling
+logPadTimes         = []                  # the Julianday of each line in the logPad
 btn                 = None                # the cycle time OK button; for inactivation
 plotAudioPointer    = None                # points to the dialog window of plotaudio
 plotScatterPointer  = None                # points to the dialog window of plotscatter
@@ -71,6 +79,7 @@ devel               = False               # set some conditions for development
 devel1              = False               # =devel  + ADDITIONAL condition: load default db: default.logdb
 devel2              = False               # =devel1 + ADDITIONAL condition: make connections
 tput                = False               # to issue the tput command
+headless            = False               # True when run as daemon (gdaemon.py); no Qt, no matplotlib
 redirect            = False               # on True redirects output from stdout and stderr to file stdlogPath
 debugIndent         = ""                  # to indent printing
 
@@ -273,6 +282,8 @@ AudioPulseMax       = None                # +/- 32768 as maximum pulse height fo
 AudioPulseDir       = None                # False for negative; True for positive pulse
 AudioThreshold      = None                # Percentage of pulse height to trigger a count
                                           # 60% of +/- 32768 => approx 20000
+AudioDeadtime       = "auto"              # dead time of counter in µs for count rate correction; 0 = no correction
+AudioResolvingTime  = 0                   # measured mean time in µs from pulse onset until the detector is re-armed
 AudioRate           = None                # becomes 44100:  sampling rate audio; works for most sound cards
 AudioChunk          = None                # becomes 32:     samples per read
 AudioChannels       = None                # becomes (1,1):  1= Mono, 2=Stereo
@@ -286,6 +297,10 @@ AudioCalibration    = "auto"              # units: CPM / (µSv/h)
 AudioMultiPulses    = None                # stores the concatenated audio data for plotting
 AudioRecording      = None                # stores the Recording
 AudioPlotData       = None                # stores the data to be plotted
+AudioPulseBufferSize= 2**19               # ring buffer size for pulse timestamps; holds 1 min at ~8700 CPS
+AudioPulseTimes     = None                # ring buffer: sample index of every detected pulse (int64)
+AudioPulseCount     = 0                   # total number of pulses detected since connection
+AudioSampleCount    = 0                   # total number of samples read since connection
 
 # I2C stuff
 I2CActivation       = False               # Not available if False; to be set via config
@@ -355,10 +370,9 @@ RMconnect           = (-99, "")           # flag to signal connection
 RMdisconnect        = (-99, "")           # flag to signal dis-connection
 
 rm_client           = None                # to be set in gradmon.initRadMon
-rm_cpm              = None                # temporary storage for CPM
-rm_temp             = None                # temporary storage for Temperature
-rm_press            = None                # temporary storage for Pressure
-rm_hum              = None                # temporary storage for Humidity
+rm_buffer           = {}                  # per variable deque of (time, value), filled by MQTT callback
+rm_stats            = {}                  # per variable (mean, min, max, count) of last log cycle
+RMBufferSize        = 1000                # max no of samples kept per variable between log cycles
 rm_rssi             = None                # temporary storage for RSSI
 
 
@@ -431,6 +445,10 @@ logging             = False               # flag for logging
 logcycle            = 3                   # time in seconds between CPM or CPS calls in logging
 lastValues          = None                # last values received from device
 lastRecord          = None                # last records received from devices
+logTiming           = None                # CycleTiming of the stages of getLogValues; set at start of logging
+timingTable         = False               # if True the stage durations are saved in table timing of the log database
+compactSchema       = False               # if True new log databases are created with the compact data table, see gsql.DB_createCompact
+logPartition        = None                # period of the partition files of the log database: 'daily', 'monthly', 'yearly'; see gsql.DB_rollPartitions
 
 # History Options
 keepFF              = False               # Flag in startup-options
@@ -583,6 +601,7 @@ varcheckedCurrent   = {}                   # is variable checked for inclusion i
 varcheckedLog       = {}                   # is variable checked for inclusion in plot for Log
 varcheckedHis       = {}                   # is variable checked for inclusion in plot for History
 varlabels           = {}                   # info on avg, StdDev etc; will be set in gplot
+varStats            = {}                   # RunningStats of the plotted slice per variable; will be set in gplot
 loggableVars        = {}                   # Vars which can be logged with current connections
 
 for vname in varnames:
@@ -620,6 +639,9 @@ avgChecked          = False               # Plot the lines Average, +/- 95% conf
 mavChecked          = False               # Plot the Moving Average line, and Legend with MovAvg length ins seconds and data points
 mav_initial         = 60                  # length of Moving Average period in seconds
 mav                 = mav_initial         # currently selected mav period
+mavMode             = "time"              # "time": average over a time window; "points": over a number of datapoints
+rollupPoints        = 2000                # min number of points to plot when using the rollup tables; 0: always raw
+rollupMinRecords    = 100000              # files with more records are plotted from the rollup tables
 fprintMAV           = False               # to print to NotePad the moving average comments
 
 # Plotstyle                               # placeholder; don't change here - is set in config
@@ -789,6 +811,12 @@ Commands:
                         on parsing strategy.
     devel               Development settings; careful!
                         see program code
+    daemon              Run as headless logging daemon without
+                        GUI; see 'geigerlog daemon -h'.
+    convert             Convert *.bin, *.his, *.log, *.dat, and
+                        AmbioMon files into databases, in
+                        parallel and without GUI; see
+                        'geigerlog convert -h'.
 
 To watch debug and verbose output start the program from the
 command line in a terminal. The output will print to the terminal.
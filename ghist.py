@@ -41,11 +41,18 @@ import gsql                             # database handling
 
 
 
-def makeHistory(sourceHist):
+def makeHistory(sourceHist, update=False, confirmOverwrite=None):
     """make the History by reading data either from file or from device,
-    parse them, sort them by date&time, and write into files"""
+    parse them, sort them by date&time, and write into files.
+    With update the existing database gglobs.hisConn is updated: only the
+    memory pages not yet in its binary data are read from the device, see
+    getUpdateStart, and only the new records are added. If that is not
+    possible, the history in the file is replaced only if the callback
+    confirmOverwrite() returns True; without a callback the update is
+    cancelled"""
 
     str_data_origin = u"Downloaded {} from device '{}'"
+    cut             = None    # for an update: the last byte index in the database
 
     #
     # get binary HIST data - either from file or from device
@@ -93,12 +100,23 @@ def makeHistory(sourceHist):
         hist    = b""
         page    = gglobs.SPIRpage # 4096 or 2048, see: getDeviceProperties
         FFpages = 0               # number of successive pages having only FF
+        first   = 0               # address of first page to read
 
         # Cleaning pipeline BEFORE reading history
         dprint("makeHistory: Cleaning pipeline BEFORE reading history")
         extra = gcommands.getExtraByte()
 
-        for address in range(0, gglobs.GMCmemory, page): # prepare to read all memory
+        if update:
+            start   = getUpdateStart(page)
+            if start is not None:
+                hist, first = start
+                cut         = gsql.DB_getHistoryCut(gglobs.hisConn)
+            elif confirmOverwrite is not None and confirmOverwrite():
+                cut         = -1  # all is replaced
+            else:
+                return (-1, "Update of History is cancelled; the file is unchanged")
+
+        for address in range(first, gglobs.GMCmemory, page): # prepare to read all memory
             time.sleep(0.1) # fails occasionally to read all data when
                             # sleep is only 0.1; still not ok at 0.2 sec
                             # wieder auf 0.1, da GQ Dataviewer deutlich scneller ist
@@ -144,26 +162,79 @@ def makeHistory(sourceHist):
     gglobs.HistoryCommentList   = []
 
     fprint("Parsing binary data", debug=gglobs.debug)
+    start = time.time()
     parseHIST(hist)
+    parsetime = time.time() - start
 
     dbhisClines    = [None] * 2
     #                  ctype    jday, jday modifier to use time unmodified
     dbhisClines[0] = ["HEADER", None, "0 hours", "File created from History Download Binary Data"]
     dbhisClines[1] = ["ORIGIN", None, "0 hours", "{}".format(data_origin)]
 
-# write to database
-    gsql.DB_insertBin           (gglobs.hisConn, hist)
-    gsql.DB_insertDevice        (gglobs.hisConn, *data_originDB)
-    gsql.DB_insertComments      (gglobs.hisConn, dbhisClines)
-    gsql.DB_insertComments      (gglobs.hisConn, gglobs.HistoryCommentList)
-    gsql.DB_insertData          (gglobs.hisConn, gglobs.HistoryDataList)
-    gsql.DB_insertParse         (gglobs.hisConn, gglobs.HistoryParseList)
+    # for an update keep only what is after the last byte index in the database
+    if cut is not None:
+        gglobs.HistoryDataList      = [x for x in gglobs.HistoryDataList    if x[0] > cut]
+        gglobs.HistoryParseList     = [x for x in gglobs.HistoryParseList   if x[0] > cut]
+        gglobs.HistoryCommentList   = [x for x in gglobs.HistoryCommentList if x[0] > cut]
+        dbhisClines                 = [["ORIGIN", None, "0 hours", "{} (update)".format(data_origin)]]
+        fprint("New records:", len(gglobs.HistoryDataList))
 
+# write to database
+    start = time.time()
+    rows  = np.array(gglobs.HistoryDataList, dtype=np.float64).reshape(-1, 5)
+    index = np.arange(len(rows))
+    col   = rows[:, 2].astype(int)
+    data  = np.full((len(rows), gglobs.datacolsDefault + 1), np.nan)
+    data[:, 0]              = rows[:, 0]
+    data[:, 1]              = getLocaltimeJulianArray(np.floor(rows[:, 1]))    # full seconds only, as in the time strings of comments
+    data[index, col]        = rows[:, 3]
+    data[index, col + 1]    = rows[:, 4]
+    nrows = gsql.DB_insertHistory(gglobs.hisConn, hist, data_originDB, dbhisClines + gglobs.HistoryCommentList, data, gglobs.HistoryParseList, cut=cut)
+    if nrows < 0:
+        return (-1, "ERROR: Cannot write History to database")
+    writetime = time.time() - start
+
+    fprint("Parsing: {:0.3f} s, Writing {} rows: {:0.3f} s ({:0.0f} rows/s)".format(parsetime, nrows, writetime, nrows / max(writetime, 1e-6)), debug=gglobs.debug)
     fprint("Database is created", debug=gglobs.debug)
 
     return (0, "")
 
 
+def getUpdateStart(page):
+    """For an update of the history in gglobs.hisConn: the part of its binary
+    data which is still the same in the device memory, and the address of
+    the page to continue reading with. The memory is assumed unchanged up to
+    the end of the stored data, if its first page and the stored part of the
+    last page are still the same; else the memory was erased or has wrapped
+    around, and None is returned to read all"""
+
+    old = gsql.DB_readBinblob(gglobs.hisConn)
+    if old is None:
+        fprint("No binary data in database - reading all")
+        return None
+
+    end   = len(old.rstrip(b'\xff'))     # end of the data written by the device
+    start = end // page * page
+    if end == 0 or end == len(old):     # erased or full at last download
+        fprint("Cannot update from binary data in database - reading all")
+        return None
+
+    checks = [(start, old[start:end])]
+    if start > 0: checks.insert(0, (0, old[0:page]))
+    for address, stored in checks:
+        time.sleep(0.1)
+        rec, error, errmessage = gcommands.getSPIR(address, page)
+        if error not in (0, 1) or rec[0:len(stored)] != stored:
+            fprint("Memory has changed since last download - reading all")
+            return None
+
+    txt = "Memory unchanged up to address {} - reading from page @address: {}".format(end, start)
+    dprint("getUpdateStart: " + txt)
+    fprint(txt)
+
+    return old[0:start], start
+
+
 def printHistDetails(hist=False):
     """ """
 
@@ -176,17 +247,17 @@ def printHistDetails(hist=False):
         fprint(header("Show History Binary Data Details"))
         fprint("from: {}\n".format(gglobs.hisDBPath))
 
-        hist    = gsql.DB_readBinblob(gglobs.hisConn)
-        if hist == None:
+        hv      = gsql.getHistView(gglobs.hisConn)
+        if hv == None:
             fprint("No binary data found in this database", error=True)
             return
+    else:
+        hv      = gsql.HistView(hist)
 
-    histlen     = len(hist)                  # Total length; could be any length e.g. when read from file
-    histFF      = hist.count(b'\xFF')        # total count of FF bytes
-
-    histRC      = hist.rstrip(b'\xFF')       # after right-clip FF (removal of all trailing 0xff)
-    histRClen   = len(histRC)                # total byte count
-    histRCFF    = histRC.count(b'\xFF')      # total count of FF in right-clipped data
+    histlen     = hv.size                    # Total length; could be any length e.g. when read from file
+    histFF      = hv.countFF                 # total count of FF bytes
+    histRClen   = hv.sizeRC                  # byte count after right-clip FF (removal of all trailing 0xff)
+    histRCFF    = histFF - (histlen - histRClen) # total count of FF in right-clipped data
 
     fprint("Binary data total byte count:"     , "{} Bytes".format(histlen))
     fprint("Count of data bytes:"              , "{} Bytes".format(histRClen))
@@ -474,7 +545,6 @@ def parseValueAdder(i, cpx, CPSmode, rectimestamp, cpms, saveinterval, parsecomm
     global histCPSCum, tubeSelected
 
     cpxValid = 1
-    cpmtime  = datetime.datetime.fromtimestamp(rectimestamp + cpms * saveinterval).strftime('%Y-%m-%d %H:%M:%S')
 
     if CPSmode: # measurement is CPS
         histCPSCum.append(cpx)          # add new data as 61st element (= #60)
@@ -485,26 +555,21 @@ def parseValueAdder(i, cpx, CPSmode, rectimestamp, cpms, saveinterval, parsecomm
         histCPSCum  = [0] * 60
 
     # create the data for the database
-    # Index, DateTime, CPM, CPS, CPM1st, CPS1st, CPM2nd, CPS2nd,  Temp, Press, Humid, RMCPM
-    datalist     = [None] * (gglobs.datacolsDefault + 2) # 13 x None
-    datalist[0]  = i
-    datalist[1]  = cpmtime
-    datalist[2]  = "0 hours"
-
-    if   tubeSelected == 0: pointer = 3
-    elif tubeSelected == 1: pointer = 5
-    elif tubeSelected == 2: pointer = 7
+    # compact as: Index, unix time, column of CPM in table data, CPM, CPS (None in CPM mode)
+    # makeHistory converts these to the columns of table data in bulk
+    if   tubeSelected == 0: pointer = 2
+    elif tubeSelected == 1: pointer = 4
+    elif tubeSelected == 2: pointer = 6
     else:
         fprint("ERROR: detected tubeSelected={}, but only 0,1,2 is permitted".format(tubeSelected), error=true, debug=True, errsound=True)
-        pointer  = 3#2
+        pointer  = 2
         cpxValid = -1
 
     if CPSmode: # CPS mode
-        datalist[pointer]       = int(cpm) * cpxValid
-        datalist[pointer + 1]   = cpx * cpxValid
+        datalist = (i, rectimestamp + cpms * saveinterval, pointer, int(cpm) * cpxValid, cpx * cpxValid)
 
     else:        # CPM mode
-        datalist[pointer]       = cpx * cpxValid
+        datalist = (i, rectimestamp + cpms * saveinterval, pointer, cpx * cpxValid, None)
 
     gglobs.HistoryDataList.append (datalist)
     gglobs.HistoryParseList.append([i, parsecomment + savetext])
@@ -160,6 +160,23 @@ def getI2CValues(varlist):
     return alldata
 
 
+def getI2CSample():
+    """Get one reading of all sensors. The BME280 measurement is triggered and
+    fetched within the same dongle transactions as the first TSL2591
+    measurement, so that its conversion time is hidden in the integration
+    time of the TSL2591"""
+
+    bme = gglobs.bme280 ['hndl']
+    tsl = gglobs.tsl2591['hndl']
+
+    # the first TSL2591 run integrates 100ms, waiting 150ms, longer than the
+    # BME280 conversion time
+    tslreading = tsl.TSL2591getLumAuto(trigger=bme.BME280triggerCmds(), fetch=bme.BME280fetchCmds())
+    bmereading = bme.BME280convert(tsl.fetched[0])
+
+    return bmereading, tslreading
+
+
 def resetI2C():
 
     gglobs.elv.ELVreset()
@@ -284,13 +301,14 @@ class I2CReader(threading.Thread):
         self.running = True
         while self.running:
             #print("self.QueueBME280 + T .qsize():", self.QueueBME280.qsize(), self.QueueTSL2591.qsize())
+            start = time.time()
             try:
-                if self.QueueBME280.qsize()  < 3:
-                    self.QueueBME280.put(gglobs.bme280  ['hndl'].BME280getTPH())
-                if self.QueueTSL2591.qsize() < 3:
-                    self.QueueTSL2591.put(gglobs.tsl2591['hndl'].TSL2591getLumAuto())
+                bmereading, tslreading = getI2CSample()
+                if self.QueueBME280.qsize()  < 3:   self.QueueBME280.put(bmereading)
+                if self.QueueTSL2591.qsize() < 3:   self.QueueTSL2591.put(tslreading)
             except Exception as e:
                 srcinfo = "I2CReader: run:"
                 exceptPrint(e, sys.exc_info(), srcinfo)
-            time.sleep(self.readingDelay)
+            # readingDelay is the period of reading, not a pause on top of it
+            time.sleep(max(0, self.readingDelay - (time.time() - start)))
 
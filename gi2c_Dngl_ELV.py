@@ -122,72 +122,58 @@ class ELVdongle:
         return rec
 
 
-    def ELVaskDongle(self, addr, data, rbytes, name="no name", info="no info", doPrint=True, end="\n"):
-        """ Function doc """
-
-        doPrint = False
-
-        self.ELVwriteData(addr, data, name=name, info=info, doPrint=doPrint)
-        if rbytes > 0:
-            self.ELVinitializeRead(addr, rbytes, name=name, doPrint=doPrint)
-            answ = self.ELVreadData(length=rbytes, name=name, doPrint=doPrint)
-            if doPrint: print(end=end)
-        else:
-            answ = None
-
-        return answ
-
-
-    def ELVwriteData (self, addr, data, name="", info ="", doPrint=True):
-        """write commands for the sensors via the ELV USB-I2C"""
-
-        doPrint = False
-
-        wA      = "{:02X}".format((addr << 1) + 0)
-        wdata   = ""
-        for a in data: wdata += " {:02X}".format(a) # puts a space at the beginning
-
-        command = bytes('S {}{} P'.format(wA, wdata), 'ASCII').upper()
-        wrt     = gglobs.I2Cser.write(command)  # wrt = no of bytes written
-        if doPrint: print(self.pTemplate.format(name, "TX", stime()[11:], len(command), wrt, info, command))
-
-
-    def ELVinitializeRead(self, addr, rbytes, name="", info="", doPrint=True):
-        """initialize reading from the sensor via the ELV USB-I2C"""
-
-        doPrint = False
-
-        rA      = "{:02X}".format((addr << 1) + 1)  # read address
-        rb      = "{:02X}".format(rbytes)           # no of bytes
-        command = bytes('S {} {} P'.format(rA, rb), 'ASCII').upper()
+    def ELVaskDongle(self, addr, data, rbytes, name="no name", info="no info"):
+        """ A single transaction; see ELVtransaction """
+
+        return self.ELVtransaction([(addr, data, rbytes)], name=name, info=info)[0]
+
+
+    def ELVtransaction(self, transactions, name="", info=""):
+        """Execute a list of I2C transactions (addr, data, rbytes) as a single
+        serial write, and read all responses with a single framed read.
+        Returns a list with one answer per transaction: a list of integer for
+        transactions with rbytes > 0, None otherwise"""
+
+        # With 'y30' set at init the dongle sends neither ACK nor NACK; only
+        # the read parts produce output: 3 chars per byte ('FF ') + CR, LF.
+        # As the output length is known in advance, a single read of this
+        # length is sufficient; no draining of the buffer byte-by-byte
+        commands    = []
+        expected    = 0
+        for addr, data, rbytes in transactions:
+            wA      = "{:02X}".format((addr << 1) + 0)
+            wdata   = "".join(" {:02X}".format(a) for a in data)
+            commands.append("S {}{} P".format(wA, wdata))
+            if rbytes > 0:
+                rA  = "{:02X}".format((addr << 1) + 1)
+                commands.append("S {} {:02X} P".format(rA, rbytes))
+                expected += rbytes * 3 + 2
+
+        command = bytes(" ".join(commands), 'ASCII').upper()
         wrt     = gglobs.I2Cser.write(command)  # wrt = no of bytes written
-        if doPrint: print(self.pTemplate.format("", "iR", stime()[11:], len(command), wrt, info, command))
-
-
-    def ELVreadData (self, length=1, name="", info="", doPrint=True):
-        """ read data from the ELV USB-I2C """
-
-        doPrint=False
-
-        rec = gglobs.I2Cser.read(length * 3 + 2) # 3 chars per byte('FF ') + CR, LF
-        cnt = gglobs.I2Cser.in_waiting
-        if cnt > 0:
-            print("ELVreadData Bytes waiting:", cnt)
-            while True:                # read single byte until nothing is returned
-                x = gglobs.I2Cser.read(1)
-                if len(x) == 0: break
-                rec += x
-
-        rec = rec.rstrip(b"\r\n")       # remove carridge return, linefeed, keep last space
-
-        if doPrint: print( self.pTemplate.format("", "RX", stime()[11:], length, len(rec), info, rec), end="")
-
-        if not rec.strip().startswith(b"Solve ") or \
-           not rec.strip().startswith(b"Err: "):        # conversion unless an error msg from dongle
-            rlist = self.__getListfromRec(rec)
-            return rlist
-        else:
-            return rec
+        #print(self.pTemplate.format(name, "TX", stime()[11:], len(command), wrt, info, command))
+
+        if expected > 0:    rec = gglobs.I2Cser.read(expected)
+        else:               rec = b""
+        #print(self.pTemplate.format("", "RX", stime()[11:], expected, len(rec), info, rec))
+
+        if len(rec) < expected:
+            dprint("ELVtransaction: {} {}: received {} bytes, expected {}".format(name, info, len(rec), expected), debug=True)
+
+        frames  = rec.split(b"\r\n")
+        answers = []
+        for addr, data, rbytes in transactions:
+            if rbytes > 0:
+                frame = frames.pop(0) if frames else b""
+                if frame.strip().startswith(b"Solve ") or frame.strip().startswith(b"Err: "):
+                    dprint("ELVtransaction: {} {}: dongle reports: {}".format(name, info, frame), debug=True)
+                    answers.append(None)
+                else:
+                    answers.append(self.__getListfromRec(frame))
+            else:
+                answers.append(None)
+
+        return answers
 
 
     def ELVclose(self):
@@ -196,23 +196,31 @@ class SensorBME280:
         return True
 
 
-    def BME280getTPH(self):
-        """ get one measurement of T, P, H """
+    # max. measurement time in sec for oversampling * 16 for all of T, P, H
+    # BOSCH: t measure,max = 1.25 + [2.3 ⋅ 16] + [2.3 ⋅ 16 + 0.575] + [2.3 ⋅ 16 + 0.575] = 112.8 ms
+    convtime = 0.113
+
+    def BME280triggerCmds(self):
+        """ I2C transactions to trigger one measurement """
 
         # trigger measurement with: ctrl_meas
         # makes one measurement, then waits for next trigger due to forced mode
         # 0b 101 101 10  = D6 = P oversampling * 16, T oversampling * 16,  forced mode
-        data    = [0xf4, 0xd6]
-        rbytes  = 1
-        answ =        gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="ctrl_meas")
-        #time.sleep(0.05) # appears to be insufficient, occasional faulty result, though it should be plenty:
-        #                   BOSCH: t measure,max = 1.25 + [2.3 ⋅ 1] + [2.3 ⋅ 4 + 0.575] + [0] = 13.325 ms
-        time.sleep(0.1)
+        return [(self.addr, [0xf4, 0xd6], 0)]
 
-        data    = [0xf7]
-        rbytes  = 8
-        answ =        gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="Get data F7...FE", end="")
-        #print("BME280getTPH: answ:", answ)
+
+    def BME280fetchCmds(self):
+        """ I2C transactions to read the result of a measurement """
+
+        # get all 8 bytes for T, P, H from F7 onwards
+        return [(self.addr, [0xf7], 8)]
+
+
+    def BME280convert(self, answ):
+        """ convert the answer of the fetch transaction into T, P, H; NAN if
+        the dongle reported an error, i.e. the answer is None """
+
+        if answ is None: return ("BME280", gglobs.NAN, gglobs.NAN, gglobs.NAN)
 
         t_raw, p_raw, h_raw = self.__BME280getRawData(answ)
         t, p, h             = readBME280All(self.cal1, self.cal2, self.cal3, p_raw, t_raw, h_raw)
@@ -221,6 +229,18 @@ class SensorBME280:
         return ("BME280", t, p, h)
 
 
+    def BME280getTPH(self):
+        """ get one measurement of T, P, H """
+
+        gglobs.elv.ELVtransaction(self.BME280triggerCmds(), name=self.name, info="ctrl_meas")
+        time.sleep(self.convtime)   # the former 0.05 s was insufficient for oversampling * 16
+
+        answ = gglobs.elv.ELVtransaction(self.BME280fetchCmds(), name=self.name, info="Get data F7...FE")[0]
+        #print("BME280getTPH: answ:", answ)
+
+        return self.BME280convert(answ)
+
+
     def __BME280getRawData(self, rec):
         """calcs raw press, temp, hum"""
 
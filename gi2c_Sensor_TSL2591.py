@@ -158,8 +158,9 @@ class SensorTSL2591:
         return True
 
 
-    def TSL2591getLumAuto(self, integration_time="500ms"):
-        """get Lum. 1st run fast with 100ms inttime, then with desired inttime"""
+    def TSL2591getLumAuto(self, integration_time="500ms", trigger=None, fetch=None):
+        """get Lum. 1st run fast with 100ms inttime, then with desired inttime.
+        trigger and fetch are passed to the 1st run only, see TSL2591getLum"""
 
         if integration_time in self.integration_time:
             finalatime = integration_time
@@ -178,9 +179,12 @@ class SensorTSL2591:
         firstRun  = True
         breakflag = False
 
+        #get a lum value, with the other transactions riding along
+        vis, ir, visraw, irraw, gainFct, inttime = self.TSL2591getLum(gain=again, intgrl=atime, trigger=trigger, fetch=fetch)
+        fetched   = self.fetched
+
         while True:
-            #get a lum value
-            vis, ir, visraw, irraw, gainFct, inttime = self.TSL2591getLum(gain=again, intgrl=atime)
+            if np.isnan(visraw): break                  # dongle error; a NAN sample
 
             wprint("prelim result: Vis: {:3.3g},   IR: {:3.3g}, Gain: {:4d},   RAW: Vis: {},   IR: {}, IntTime:{}"\
                                   .format(vis, ir, gainFct, visraw, irraw, inttime ))
@@ -224,38 +228,58 @@ class SensorTSL2591:
             again       = selector[selindex]            # set new gain
             atime       = finalatime                    # set best resolution for final run
 
+            #get a lum value
+            vis, ir, visraw, irraw, gainFct, inttime = self.TSL2591getLum(gain=again, intgrl=atime)
+
+        self.fetched = fetched
+
         wprint("Final result:  Vis: {:3.3g},   IR: {:3.3g}, Gain: {:4d},   RAW: Vis: {},   IR: {}, IntTime:{}"\
                                .format(vis, ir, gainFct, visraw, irraw, inttime ))
 
         return ("TSL2591", vis, ir, visraw, irraw, gainFct, inttime)
 
 
-    def TSL2591getLum(self, gain = 'Low', intgrl = "100ms"):
-
-        #print("-------------------------TSL2591getLum - Begin")
+    def TSL2591startCmds(self, gain, intgrl):
+        """ I2C transactions to start a measurement with gain and integration time """
 
         gainFV  = self.sensorgain[gain][0]   # Field Value
-        gainFct = self.sensorgain[gain][1]   # Gain Factor
-
         intFV   = self.sensorint[intgrl][0]  # Field Value
-        intTime = self.sensorint[intgrl][1]  # integration time in ms
-        intFct  = intTime / 100              # Gain Factor by integration time
 
         # Control Register (0x01) - Setting Gain Mode and Integration Time
-        data    = [self.CMD + 0x01, gainFV << 4 | intFV ]
-        rbytes  = 1
-        answ        = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="Gain:{}, Int:{} ms".format(gainFct, intTime))
-
         # Cycle the AEN (ALS Enable) bit in the Enable Register (truly necessary?)
-        # Enable Register (0x00)
-        data    = [self.CMD + 0x00, 0x01]   # ALS Disable
-        rbytes  = 1
-        answ        = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="Disable AEN")
+        # Enable Register (0x00): 0x01 = ALS Disable, 0x03 = ALS Enable
+        return [(self.addr, [self.CMD + 0x01, gainFV << 4 | intFV], 0),
+                (self.addr, [self.CMD + 0x00, 0x01],                0),
+                (self.addr, [self.CMD + 0x00, 0x03],                0),
+               ]
 
-        # Enable Register (0x00)
-        data    = [self.CMD + 0x00, 0x03]   # ALS Enable
-        rbytes  = 1
-        answ        = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="Enable AEN")
+
+    def TSL2591fetchCmds(self):
+        """ I2C transactions to read status and data of a measurement """
+
+        # Status Register (0x13), ALS Data Register (0x14 - 0x17)
+        return [(self.addr, [self.CMD + 0x13], 1),
+                (self.addr, [self.CMD + 0x14], 4),
+               ]
+
+
+    def TSL2591getLum(self, gain = 'Low', intgrl = "100ms", trigger=None, fetch=None):
+        """The I2C transactions in trigger and fetch (e.g. of another sensor on
+        the same dongle) are sent within the same serial writes as the start
+        and the read of this measurement, so that their conversion time is
+        hidden in the integration time. The answers to fetch are in self.fetched.
+        On an error reported by the dongle the values are NAN"""
+
+        #print("-------------------------TSL2591getLum - Begin")
+
+        if trigger is None: trigger = []
+        if fetch   is None: fetch   = []
+
+        gainFct = self.sensorgain[gain][1]   # Gain Factor
+        intTime = self.sensorint[intgrl][1]  # integration time in ms
+        intFct  = intTime / 100              # Gain Factor by integration time
+
+        gglobs.elv.ELVtransaction(self.TSL2591startCmds(gain, intgrl) + trigger, name=self.name, info="Gain:{}, Int:{} ms".format(gainFct, intTime))
 
         start = time.time()
         time.sleep(intTime / 1000 * 1.5  ) # sleeping for integration time is almost
@@ -263,32 +287,28 @@ class SensorTSL2591:
                                            # added 50%
 
         # Read the Status register until the AVALID bit (Bit #0 in Status) is set
-        # Status Register (0x13)
-        data    = [self.CMD + 0x13]
-        rbytes  = 1
-        answ        = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="status", doPrint = True, end = "")
-        if answ[0] & 0x01:
+        answ         = gglobs.elv.ELVtransaction(self.TSL2591fetchCmds() + fetch, name=self.name, info="status + data")
+        status, data = answ[0:2]
+        self.fetched = answ[2:]
+        nansample    = (gglobs.NAN, gglobs.NAN, gglobs.NAN, gglobs.NAN, gainFct, intTime)
+        if status is None or data is None: return nansample    # error frame from the dongle
+
+        if status[0] & 0x01:
      #       util.ncprint("Data ready")
             pass
         else:
             ecprint("Data not ready", end="")
             ecprint(".", end="") # one dot for each call of status
             while True:
-                if answ[0] & 0x01:
+                if status[0] & 0x01:
                     ncprint("ready after {:3.2f}sec".format(time.time() - start))
                     break
-                data    = [self.CMD + 0x13] # Status is Register (0x13)
-                rbytes  = 1
-                answ        = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="status", doPrint = False)
+                status, data = gglobs.elv.ELVtransaction(self.TSL2591fetchCmds(), name=self.name, info="status + data")
+                if status is None or data is None: return nansample
                 ecprint(".", end="")
 
-        # ALS Data Register (0x14 - 0x17)
-        data   = [self.CMD + 0x14]
-        rbytes = 4
-        answ   = gglobs.elv.ELVaskDongle(self.addr, data, rbytes, name=self.name, info="Get data", end="")
-
-        visraw = answ[0] | (answ[1] << 8)
-        irraw  = answ[2] | (answ[3] << 8)
+        visraw = data[0] | (data[1] << 8)
+        irraw  = data[2] | (data[3] << 8)
 
         # Results are validated for being a good approximation by this
         # normalization over all Gain factors
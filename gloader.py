@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+"""
+gloader.py - GeigerLog loading of the *.logdb and *.hisdb database files for
+analysis in scripts and notebooks, without the GUI
+
+Needs only numpy; PyQt, matplotlib, and the device libraries are not imported.
+
+use in programs with:
+    import gloader
+
+    with gloader.LogDatabase("data/default.logdb") as db:
+        print(db.variables(), db.timeRange())
+
+        # all records, as dict of numpy arrays with key 'time' as datetime64[ms]
+        data = db.read()
+
+        # selected variables and time range, as numpy structured array
+        data = db.read(["CPM", "T"], start="2020-01-01", end="2020-02-01", structured=True)
+
+        # larger-than-memory files: chunks of at most chunksize records
+        for chunk in db.iterChunks(["CPM"], chunksize=100000):
+            print(chunk["time"][0], np.nanmean(chunk["CPM"]))
+
+Time is the local wall-clock time, as recorded by GeigerLog, given as numpy
+datetime64[ms] without timezone. Missing values are NAN.
+"""
+
+###############################################################################
+#    This file is part of GeigerLog.
+#
+#    GeigerLog is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    GeigerLog is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with GeigerLog.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+__author__          = "ullix"
+__copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
+__credits__         = [""]
+__license__         = "GPL3"
+
+import os
+import sqlite3
+import urllib.request
+import numpy as np
+
+import gglobs                               # only for the names of the variables
+
+
+# the time of a record as integer milliseconds since 1970-01-01 00:00:00, the
+# same as column tms of the compact table datac, see gsql.DB_createCompact
+sqlTms          = "CAST(round((Julianday - 2440587.5) * 86400000) AS INTEGER)"
+sqlCommentTms   = "CAST(round((cJulianday - 2440587.5) * 86400000) AS INTEGER)"
+
+# the range of tms covering all records
+tmsMin          = -2**62
+tmsMax          = 2**62
+
+# records per chunk when not given
+defaultChunksize = 100000
+
+
+def toTms(t):
+    """Milliseconds since 1970-01-01 00:00:00 for the time t, given as
+    datetime64, datetime.datetime, datetime.date, string like '2020-01-31
+    12:33:44' or '2020-01-31', or as float Julianday. Return: int"""
+
+    if isinstance(t, (int, float)) and not isinstance(t, bool):
+        return int(round((t - 2440587.5) * 86400000))               # Julianday
+
+    if isinstance(t, str): t = t.strip().replace(" ", "T")
+
+    return int(np.datetime64(t, "ms").astype(np.int64))
+
+
+def tmsToDatetime64(tms):
+    """the numpy array of datetime64[ms] for the array of milliseconds tms"""
+
+    return np.asarray(tms, dtype=np.int64).astype("datetime64[ms]")
+
+
+def openReadOnly(path):
+    """Open the database file path read-only; it is never created or changed.
+    Return: sqlite3 connection"""
+
+    if not os.path.isfile(path): raise FileNotFoundError("No such database file: '{}'".format(path))
+
+    uri = "file:{}?mode=ro".format(urllib.request.pathname2url(os.path.abspath(path)))
+
+    return sqlite3.connect(uri, uri=True)
+
+
+class LogDatabase:
+    """A GeigerLog database file, *.logdb or *.hisdb, opened read-only for
+    loading its records. A log with partition files, see
+    gsql.DB_rollPartitions, or a merged log, see gcatalog.createMergedDatabase,
+    is read with all its files. Time range and variables are selected in the
+    SQL, so only the selected data are read"""
+
+    def __init__(self, path):
+
+        self.path   = path
+        self.conn   = openReadOnly(path)
+        self.files  = self._getFiles()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        """Close the database"""
+
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+    def _getFiles(self):
+        """the files holding the records as list of (path, first, last) with
+        the first and last Julianday, the partitions oldest first, the file
+        itself last; first and last of the file itself are None"""
+
+        try:    rows = self.conn.execute("SELECT pname, pfirst, plast FROM main.partitions ORDER BY pfirst").fetchall()
+        except: rows = []                                           # no table partitions
+
+        folder = os.path.dirname(os.path.abspath(self.path))
+        files  = [(os.path.join(folder, pname), pfirst, plast) for pname, pfirst, plast in rows]
+
+        return files + [(self.path, None, None)]
+
+
+    def _selectFiles(self, tmsStart, tmsEnd):
+        """the files having records in the range tmsStart <= tms < tmsEnd,
+        known by the first and last of the partitions table"""
+
+        selected = []
+        for path, first, last in self.files:
+            if first is not None and last is not None:
+                if toTms(last) < tmsStart or toTms(first) >= tmsEnd: continue
+            selected.append(path)
+
+        return selected
+
+
+    def _checkVnames(self, vnames):
+        """the list of the variables vnames; all if None"""
+
+        if vnames is None:          return list(gglobs.varnames)
+        if isinstance(vnames, str): vnames = [vnames]
+
+        for vname in vnames:
+            if vname not in gglobs.varnames:
+                raise ValueError("Unknown variable '{}', must be one of: {}".format(vname, ", ".join(gglobs.varnames)))
+
+        return list(vnames)
+
+
+    def _getDataSql(self, conn, vnames):
+        """the SELECT of tms and vnames in the range tms >= ? AND tms < ?, in
+        the order of time; for the compact table directly on datac, using its
+        key for the range"""
+
+        compact = conn.execute("SELECT count(*) FROM main.sqlite_master WHERE type='table' AND name='datac'").fetchone()[0] > 0
+
+        if compact:
+            have = [row[1] for row in conn.execute("PRAGMA main.table_info(datac)").fetchall()]
+            cols = ["tms"] + [vname if vname in have else "NULL" for vname in vnames]
+            sql  = "SELECT {} FROM main.datac WHERE tms >= ? AND tms < ? ORDER BY tms".format(", ".join(cols))
+        else:
+            cols = [sqlTms] + vnames
+            sql  = "SELECT {} FROM main.data WHERE Julianday IS NOT NULL AND {t} >= ? AND {t} < ? ORDER BY Julianday".format(", ".join(cols), t=sqlTms)
+
+        return sql
+
+
+    def _makeChunk(self, rows, vnames, structured):
+        """the rows of (tms, vnames) as dict of arrays or structured array"""
+
+        array = np.array(rows, dtype=np.float64).reshape(len(rows), 1 + len(vnames))     # None as NAN
+        times = tmsToDatetime64(array[:, 0])
+
+        if structured:
+            chunk = np.empty(len(rows), dtype=[("time", "datetime64[ms]")] + [(vname, np.float64) for vname in vnames])
+            chunk["time"] = times
+            for i, vname in enumerate(vnames): chunk[vname] = array[:, i + 1]
+        else:
+            chunk = {"time": times}
+            for i, vname in enumerate(vnames): chunk[vname] = array[:, i + 1]
+
+        return chunk
+
+
+    def iterChunks(self, vnames=None, start=None, end=None, chunksize=defaultChunksize, structured=False):
+        """Yield the records with start <= time < end of the variables vnames
+        (all if None) in chunks of at most chunksize records, each as returned
+        by read(). Only one chunk is held in memory. Records are in the order
+        of time within each file; the files of a merged log may overlap"""
+
+        vnames   = self._checkVnames(vnames)
+        tmsStart = tmsMin if start is None else toTms(start)
+        tmsEnd   = tmsMax if end   is None else toTms(end)
+
+        for path in self._selectFiles(tmsStart, tmsEnd):
+            conn = self.conn if path == self.path else openReadOnly(path)
+            try:
+                cursor = conn.execute(self._getDataSql(conn, vnames), (tmsStart, tmsEnd))
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if len(rows) == 0: break
+                    yield self._makeChunk(rows, vnames, structured)
+            finally:
+                if conn is not self.conn: conn.close()
+
+
+    def read(self, vnames=None, start=None, end=None, structured=False):
+        """Read the records with start <= time < end of the variables vnames
+        (all if None), in the order of time. start and end as for toTms(), None
+        for no limit. Return: dict of numpy arrays with key 'time' as
+        datetime64[ms] and the vnames as float64, or, if structured, a numpy
+        structured array with these fields"""
+
+        vnames = self._checkVnames(vnames)
+        chunks = list(self.iterChunks(vnames, start, end, chunksize=defaultChunksize, structured=True))
+
+        if len(chunks) > 0: data = np.concatenate(chunks)
+        else:               data = self._makeChunk([], vnames, structured=True)
+
+        if np.any(np.diff(data["time"].astype(np.int64)) < 0):            # files overlapping in time
+            data = data[np.argsort(data["time"], kind="stable")]
+
+        if structured: return data
+
+        return {name: np.ascontiguousarray(data[name]) for name in data.dtype.names}
+
+
+    def comments(self, start=None, end=None):
+        """Read the comments with start <= time < end. Return: numpy
+        structured array with fields time (datetime64[ms]), ctype and cinfo
+        (str)"""
+
+        tmsStart = tmsMin if start is None else toTms(start)
+        tmsEnd   = tmsMax if end   is None else toTms(end)
+        sql      = "SELECT {t}, ctype, cinfo FROM main.comments WHERE cJulianday IS NOT NULL AND {t} >= ? AND {t} < ? ORDER BY cJulianday".format(t=sqlCommentTms)
+
+        rows = []
+        for path in self._selectFiles(tmsStart, tmsEnd):
+            conn = self.conn if path == self.path else openReadOnly(path)
+            try:     rows += conn.execute(sql, (tmsStart, tmsEnd)).fetchall()
+            finally:
+                if conn is not self.conn: conn.close()
+
+        dtype = [("time", "datetime64[ms]"), ("ctype", object), ("cinfo", object)]
+        data  = np.array([(np.datetime64(tms, "ms"), str(ctype), str(cinfo)) for tms, ctype, cinfo in rows], dtype=dtype)
+
+        return data[np.argsort(data["time"], kind="stable")]
+
+
+    def variables(self):
+        """the list of the variables having values in any of the files"""
+
+        counts = ", ".join("count({})".format(vname) for vname in gglobs.varnames)
+        have   = set()
+        for path, first, last in self.files:
+            conn = self.conn if path == self.path else openReadOnly(path)
+            try:
+                row   = conn.execute("SELECT {} FROM main.data".format(counts)).fetchone()
+                have |= {vname for vname, count in zip(gglobs.varnames, row) if count > 0}
+            finally:
+                if conn is not self.conn: conn.close()
+
+        return [vname for vname in gglobs.varnames if vname in have]
+
+
+    def timeRange(self):
+        """the time of the first and the last record as datetime64[ms], both
+        None if there are no records"""
+
+        tmss = []
+        for path, first, last in self.files:
+            conn = self.conn if path == self.path else openReadOnly(path)
+            try:
+                row   = conn.execute("SELECT min({t}), max({t}) FROM main.data".format(t=sqlTms)).fetchone()
+                tmss += [tms for tms in row if tms is not None]
+            finally:
+                if conn is not self.conn: conn.close()
+
+        if len(tmss) == 0: return None, None
+
+        return np.datetime64(min(tmss), "ms"), np.datetime64(max(tmss), "ms")
+
+
+def load(path, vnames=None, start=None, end=None, structured=False):
+    """Read the records of the database file path; see LogDatabase.read()"""
+
+    with LogDatabase(path) as db:
+        return db.read(vnames, start, end, structured)
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+"""
+glogcycle.py - GeigerLog acquisition and storing of the record of one logging
+cycle, shared by the GUI (geigerlog getLogValues) and the headless daemon
+(gdaemon.py); no Qt or matplotlib is needed
+
+use in programs with:
+    import glogcycle
+"""
+
+###############################################################################
+#    This file is part of GeigerLog.
+#
+#    GeigerLog is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    GeigerLog is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with GeigerLog.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+__author__          = "ullix"
+__copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
+__credits__         = [""]
+__license__         = "GPL3"
+
+from   gutils       import *
+
+import importlib                # glabjack is imported only when LabJack is activated
+
+import gcommands
+import gradmon
+import gambiomon
+import gi2c
+import ggscout
+import gsounddev
+import graspi
+
+import gsql
+
+
+def isDeviceConnected(devname):
+    """True if the device with name devname is connected"""
+
+    connected = {
+                "GMC"        : gglobs.GMCConnection,
+                "Audio"      : gglobs.AudioConnection,
+                "I2C"        : gglobs.I2CConnection,
+                "RadMon"     : gglobs.RMConnection,
+                "AmbioMon"   : gglobs.AmbioConnection,
+                "LabJack"    : gglobs.LJConnection,
+                "Gamma-Scout": gglobs.GSConnection,
+                "Raspi"      : gglobs.RaspiConnection,
+                }
+
+    return connected[devname]
+
+
+def getDeviceValues(timing):
+    """Read the variables of all connected devices, marking the time of each
+    device in timing. Return: dict of all variables, NAN if not read"""
+
+    logValue = {}
+    for vname in gglobs.varnames:
+        logValue[vname] = gglobs.NAN
+
+    # e.g.: gglobs.DevicesVars['GMC']    : ['CPM', 'CPS']
+    # e.g.: gglobs.DevicesVars['RadMon'] : ['T', 'P', 'H', 'R']
+    for devname in gglobs.DevicesNames:
+        if not isDeviceConnected(devname): continue
+
+        varlist = gglobs.DevicesVars[devname]
+        if   devname == "GMC":          logValue.update(gcommands.getGMCValues        (varlist))
+        elif devname == "RadMon":       logValue.update(gradmon.getRadMonValues       (varlist))
+        elif devname == "AmbioMon":     logValue.update(gambiomon.getAmbioMonValues   (varlist))
+        elif devname == "LabJack":      logValue.update(importlib.import_module("glabjack").getLabJackValues(varlist))
+        elif devname == "Audio":        logValue.update(gsounddev.getSounddevValues   (varlist))
+        elif devname == "I2C":          logValue.update(gi2c.getI2CValues             (varlist))
+        elif devname == "Gamma-Scout":  logValue.update(ggscout.getGammaScoutValues   (varlist))
+        elif devname == "Raspi":        logValue.update(graspi.getRaspiValues         (varlist))
+        timing.mark(devname)
+
+    return logValue
+
+
+def runLogRecord():
+    """Start the timing of the cycle in gglobs.logTiming, read all connected
+    devices, print the record to the LogPad, and save it to the log database
+    gglobs.logConn with its rollups and partitions, unless all values are NAN.
+    Advances gglobs.cpm_counter. Finish the cycle with finishLogRecord().
+    Return: (Julianday of the record, dict of the values, True if saved)"""
+
+    timing = gglobs.logTiming
+    timing.start()
+
+    # the time of the sample is the start of acquisition, from the computer clock
+    timeJulian, timetag = getLocaltimeJulian() # e.g.: 2458512.928904213, '2019-01-29 10:17:37'
+
+    logValue = getDeviceValues(timing)
+
+    if gglobs.debug:
+        printstring = "Non-NAN LogValues: "
+        for vname in gglobs.varnames:
+            if not np.isnan(logValue[vname]):  printstring += ("{}:{}  ".format(vname, logValue[vname]))
+        dprint(printstring)
+
+    printstring = formatLogPadLine(gglobs.cpm_counter, timetag, logValue, gglobs.varcheckedLog)
+    logPrint(printstring, julian=timeJulian)
+    gglobs.lastRecord   = printstring    # needed when a record was snapped
+    timing.mark("LogPad")
+
+    datalist     = [None] * (gglobs.datacolsDefault + 1) # (12 + 1) x None
+    datalist[0]  = gglobs.cpm_counter
+    datalist[1]  = timeJulian
+
+    nanOnly      = True
+    for i, vname in enumerate(gglobs.varnames):
+        if not np.isnan(logValue[vname]):
+            nanOnly         = False
+            datalist[i + 2] = logValue[vname]
+
+    # save data, but only if at least one variable is not nan
+    if not nanOnly:
+        gsql.DB_insertDataJulian(gglobs.logConn, [datalist])
+        gsql.DB_updateRollups(gglobs.logConn)
+        gsql.DB_checkPartition(gglobs.logConn, timeJulian)
+    timing.mark("DB_insertData")
+
+    gglobs.cpm_counter += 1
+
+    return timeJulian, logValue, not nanOnly
+
+
+def finishLogRecord():
+    """Stop the timing of the cycle begun by runLogRecord(), and save it to the
+    table timing if configured; see File -> Show Logging Timing Statistics"""
+
+    timing = gglobs.logTiming
+
+    duration, overrun = timing.stop(gglobs.logcycle)
+    if overrun:
+        dprint("finishLogRecord: Cycle overrun: duration {:0.1f} ms > logcycle {} sec ({} of {} cycles)".format(duration, gglobs.logcycle, timing.overruns, timing.cycles))
+
+    if gglobs.timingTable:
+        tindex = gglobs.cpm_counter - 1
+        trows  = [[tindex, "NOW", "localtime", stage, ms, int(overrun)] for stage, ms in timing.current.items()]
+        gsql.DB_insertTiming(gglobs.logConn, trows)
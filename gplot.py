@@ -34,6 +34,28 @@ __license__         = "GPL3"
 
 from   gutils       import *
 
+import gsql
+
+# cache of the statistics of the plotted slice per variable:
+# vname: (key, end, RunningStats); end is the record after the last one included
+statsCache = {}
+
+# cache of the scaled slice per variable, and of its x and y without the NAN
+# values, see getSliceArrays; the arrays are buffers with spare capacity
+sliceCache = {}
+
+# cache of the moving averages; key: (vname, mode, window, scale, data range)
+mavCache   = {}
+
+# cache of the time bases and unit converted columns of the current data;
+# the arrays are buffers with spare capacity, of which 'rows' are valid
+prepCache  = {"key": None, "rows": 0, "time": None, "timediff": None, "T": None}
+
+# the data of large files at the rollup levels, see getRollupData;
+# path: {level: (dataArray, aggregates)}, with level "raw" for the records
+rollupCache = {}
+rollupSwitching = False         # True while makePlot re-plots after a switch of level
+
 # keep - had been used for legend placement
 #legendPlacement = {0:'upper left', 1:'upper center', 2:'upper right', 3:'center right', 4:'lower right', 5:'lower center', 6:'lower left', 7:'center left', 8:'center'}
 
@@ -86,7 +108,7 @@ def getXLabelsToD():
 
     global plotTime, strFirstRecord
 
-    totalDays     = (plotTime.max() - plotTime.min()) # in days
+    totalDays     = (plotTime[-1] - plotTime[0]) # in days; plotTime is sorted
 
     if totalDays > 5:
         #print 1
@@ -123,7 +145,7 @@ def getXLabelsSince(Xunit):
     newXunit = Xunit
 
     if Xunit == "auto":
-        l = plotTime.max() - plotTime.min()
+        l = plotTime[-1] - plotTime[0]
         #print l
 
         if l > 3:
@@ -190,6 +212,257 @@ def getXLabelsSince(Xunit):
     return 'time {} since first record: {}'.format(xlabel, strFirstRecord)
 
 
+def getSliceStats(vname, y, recmin, recmax, scale):
+    """Statistics of the slice y = data[recmin:recmax + 1] of variable vname.
+    When the slice only grew at its end since the last call, e.g. while
+    logging, only the new records are added; otherwise all are recomputed"""
+
+    level  = getRollupLevel()
+    if level != "raw":
+        aggregates = rollupCache[os.path.realpath(gglobs.currentDBPath)][level][1][vname]
+        return getRollupStats(vname, y, aggregates[recmin:recmax + 1], scale)
+
+    key    = (gglobs.currentDBPath, recmin, gglobs.logTime[recmin], scale, gglobs.varunit[vname])
+    end    = recmax + 1
+
+    cached = statsCache.get(vname)
+    if cached is not None and cached[0] == key and cached[1] <= end:
+        stats = cached[2]
+        stats.add(y[cached[1] - recmin:])
+    else:
+        stats = RunningStats(y)
+
+    statsCache[vname] = (key, end, stats)
+
+    return stats
+
+
+def getSliceArrays(vname, x, ySlice, recmin, recmax, scale):
+    """The scaled slice y = ySlice * scale of variable vname, and x and y with
+    the NAN values removed. When the slice only grew at its end since the
+    last call, e.g. while logging, only the new records are scaled and
+    appended; otherwise all are computed. Return: (y, var_x, var_y)"""
+
+    key    = (gglobs.currentDBPath, getRollupLevel(), gglobs.Xunit, recmin, gglobs.logTime[recmin], x[0], scale, gglobs.varunit[vname])
+    end    = recmax + 1
+
+    cached = sliceCache.get(vname)
+    if cached is None or cached["key"] != key or cached["end"] > end:
+        cached = {"key": key, "end": recmin, "y": np.empty(0), "x": np.empty(0), "yf": np.empty(0), "nf": 0}
+        sliceCache[vname] = cached
+
+    done = cached["end"]
+    rows = end - recmin
+    if end > done:
+        new   = ySlice[done - recmin:] * scale
+        mask  = np.isfinite(new)                            # mask for nan values
+        nf    = cached["nf"] + np.count_nonzero(mask)
+
+        # grow the buffers, with spare room for appended records
+        if rows > cached["y"].size:
+            buf = np.empty(max(rows, 2 * cached["y"].size, 1024))
+            buf[:done - recmin] = cached["y"][:done - recmin]
+            cached["y"] = buf
+        if nf > cached["x"].size:
+            for name in ("x", "yf"):
+                buf = np.empty(max(nf, 2 * cached[name].size, 1024))
+                buf[:cached["nf"]] = cached[name][:cached["nf"]]
+                cached[name] = buf
+
+        cached["y"] [done - recmin:rows]    = new
+        cached["x"] [cached["nf"]:nf]       = x[done - recmin:][mask]
+        cached["yf"][cached["nf"]:nf]       = new[mask]
+        cached["nf"]                        = nf
+        cached["end"]                       = end
+
+    return cached["y"][:rows], cached["x"][:cached["nf"]], cached["yf"][:cached["nf"]]
+
+
+def getRollupData():
+    """For a large file return the data of the coarsest rollup level which
+    gives at least gglobs.rollupPoints points over the full time range, or
+    None to use the raw records. Updates the rollups first, if the file is
+    writable. Called by getDataFromDatabase when a file is loaded"""
+
+    fncname = "getRollupData: "
+
+    conn = gglobs.currentConn
+    path = os.path.realpath(conn.execute("PRAGMA database_list").fetchone()[2])    # 1st row is 'main'
+    rollupCache.pop(path, None)
+
+    if gglobs.rollupPoints == 0:                            return None
+    if gglobs.logging and path == os.path.realpath(gglobs.logDBPath):   return None     # must append raw records
+
+    if os.access(path, os.W_OK): gsql.DB_updateRollups(conn)
+
+    info = gsql.DB_getRollupInfo(conn)
+    if info is None or info[0] <= gglobs.rollupMinRecords: return None
+
+    level = chooseRollupLevel(info[2] - info[1])
+    if level == "raw":                                      return None
+
+    rollupCache[path] = {}
+    data = loadRollupLevel(path, level)
+    dprint(fncname + "{:n} records; using level '{}' with {:n} buckets".format(info[0], level, data.shape[0]))
+
+    return data
+
+
+def chooseRollupLevel(span, margin=1.0):
+    """the coarsest rollup level with at least margin * gglobs.rollupPoints
+    buckets in span (in days), else 'raw'"""
+
+    for level, N in reversed(gsql.rollupLevels):
+        if span * N >= gglobs.rollupPoints * margin: return level
+
+    return "raw"
+
+
+def loadRollupLevel(path, level):
+    """read level from the database into rollupCache, unless already there"""
+
+    if level not in rollupCache[path]:
+        start = time.time()
+        if level == "raw":  rollupCache[path][level] = (gglobs.exgg.getDataFromDatabase(raw=True)[0], None)
+        else:               rollupCache[path][level] = gsql.DB_readRollup(gglobs.currentConn, level)
+        dprint("loadRollupLevel: level '{}' loaded in {:0.1f} ms".format(level, (time.time() - start) * 1000))
+
+    return rollupCache[path][level][0]
+
+
+def getRollupLevel():
+    """the level of gglobs.currentDBData: 'raw', or one of the rollup levels"""
+
+    cache = rollupCache.get(os.path.realpath(gglobs.currentDBPath))
+    if cache is not None:
+        for level in cache:
+            if cache[level][0] is gglobs.currentDBData: return level
+
+    return "raw"
+
+
+def isRollupShown(tool):
+    """True, with a message, if the plot shows rollup buckets instead of the
+    records; tool, like Poisson or FFT, needs the records and is not run"""
+
+    level = getRollupLevel()
+    if level == "raw": return False
+
+    msg = "{} needs the records, but the plot shows the means of the rollup level '{}'; zoom in to a shorter time range to plot the records".format(tool, level)
+    gglobs.exgg.showStatusMessage(msg)
+    dprint("isRollupShown: " + msg)
+
+    return True
+
+
+def switchRollupLevel(span):
+    """If the plot of a time range of span days is better served by another
+    level, then make that the current data and return True; must not switch
+    the log currently being logged to"""
+
+    path  = os.path.realpath(gglobs.currentDBPath)
+    cache = rollupCache.get(path)
+    if cache is None or rollupSwitching:                                        return False
+    if gglobs.logging and gglobs.currentDBPath == gglobs.logDBPath:             return False
+
+    current = getRollupLevel()
+    level   = chooseRollupLevel(span)
+    if level == current:                                                        return False
+
+    # switch to a coarser level only with some margin, to avoid toggling
+    # between levels for ranges right at a threshold
+    levels  = ["raw"] + [lv for lv, N in gsql.rollupLevels]
+    if levels.index(level) > levels.index(current) and chooseRollupLevel(span, margin=1.2) != level:
+        return False
+
+    data = loadRollupLevel(path, level)
+    if gglobs.activeDataSource == "His":  gglobs.hisDBData = data
+    else:                                 gglobs.logDBData = data
+    gglobs.currentDBData = data
+    dprint("switchRollupLevel: '{}' -> '{}' for range of {:0.4g} days".format(current, level, span))
+
+    return True
+
+
+def getRollupStats(vname, y, aggregates, scale):
+    """Statistics of variable vname from the rollup aggregates of the plotted
+    buckets; count, mean, variance, min, and max are exact, the quantiles are
+    taken from the bucket means in y. 'T' may be shown in °F."""
+
+    stats   = RunningStats(y)
+
+    a, b    = scale, 0.0                        # y = a * value + b
+    if vname == "T" and gglobs.varunit["T"] == "°F": a, b = scale * 9 / 5, scale * 32
+
+    n, s, vmin, vmax, sq = (aggregates[:, i] for i in range(5))
+    count   = np.nansum(n)
+    if count == 0: return stats
+
+    mean    = np.nansum(s) / count
+    M2      = max(0.0, np.nansum(sq) - count * mean**2)
+
+    stats.count = int(count)
+    stats.mean  = a * mean + b
+    stats.M2    = a**2 * M2
+    stats.min, stats.max = sorted((a * np.nanmin(vmin) + b, a * np.nanmax(vmax) + b))
+
+    return stats
+
+
+def getPlotDataPrep():
+    """Return the time bases logTime and logTimeDiff, and the variables' data
+    with T in the current unit, of gglobs.currentDBData. These are computed
+    once per dataset; when records were only appended, as while logging,
+    only the new records are converted"""
+
+    # Note
+    # Before Matplotlib 3.3, the epoch was 0000-12-31 which lost modern microsecond
+    # precision and also made the default axis limit of 0 an invalid datetime.
+    # In 3.3 the epoch was changed as above. To convert old ordinal floats to the
+    # new epoch, users can do:
+    #     new_ordinal = old_ordinal + mdates.date2num(np.datetime64('0000-12-31'))
+
+    # convert the times from old style to style since matplotlib 3.3
+    TimeBaseCorrection = mpld.date2num(np.datetime64('0000-12-31'))
+
+    data    = gglobs.currentDBData
+    rows    = data.shape[0]
+    Fdegree = gglobs.varunit["T"] == "°F"
+    key     = (gglobs.currentDBPath, getRollupLevel(), data[0, 0], Fdegree, TimeBaseCorrection)
+    done    = prepCache["rows"]
+
+    # start over unless the data are the same, possibly with appended records
+    if prepCache["key"] != key or rows < done or \
+       (done > 0 and prepCache["time"][done - 1] != data[done - 1, 0] + TimeBaseCorrection):
+        prepCache.update({"key": key, "rows": 0, "time": None, "timediff": None, "T": None})
+        done = 0
+
+    if rows > done:
+        if prepCache["time"] is None or rows > prepCache["time"].size:
+            # grow the buffers, with spare room for appended records
+            capacity = max(rows, 2 * done, 1024)
+            for name in ("time", "timediff", "T"):
+                buf = np.empty(capacity)
+                if done > 0: buf[:done] = prepCache[name][:done]
+                prepCache[name] = buf
+
+        new = data[done:rows]
+        prepCache["time"]    [done:rows] = new[:, 0] + TimeBaseCorrection                       # time data of total file
+        prepCache["timediff"][done:rows] = prepCache["time"][done:rows] - prepCache["time"][0]  # time diff to first record in days
+        # is the temperature to be shown in °C or °F ? (data are in °C )
+        iT = gglobs.varnames.index("T") + 1
+        if Fdegree: prepCache["T"][done:rows] = new[:, iT] / 5 * 9 + 32
+        prepCache["rows"] = rows
+
+    # split multi-dim np.array into single-dim np.arrays like log["CPM"] = [<var data>]
+    log = {}
+    for i, vname in enumerate(gglobs.varnames):
+        log[vname] = data[:, i + 1]
+    if Fdegree: log["T"] = prepCache["T"][:rows]
+
+    return prepCache["time"][:rows], prepCache["timediff"][:rows], log
+
+
 def makePlot():
     """Plots the data in array gglobs.currentDBData vs. time-of-day or
     vs time since start, observing plot settings;
@@ -197,7 +470,7 @@ def makePlot():
 
     Return: nothing
     """
-    global plotTime, strFirstRecord, rdplt, fig, ax1, ax2, xFormatStr
+    global plotTime, strFirstRecord, rdplt, fig, ax1, ax2, xFormatStr, rollupSwitching
 
     fncname = "makePlot: "
     #print(fncname + "  gglobs.currentDBData.shape:",   gglobs.currentDBData.shape)
@@ -239,23 +512,9 @@ def makePlot():
     for vname in gglobs.varnames:
         gglobs.exgg.varDisplayCheckbox[vname].setToolTip(gglobs.vardict[vname][0])
 
-
-
-    # Note
-    # Before Matplotlib 3.3, the epoch was 0000-12-31 which lost modern microsecond
-    # precision and also made the default axis limit of 0 an invalid datetime.
-    # In 3.3 the epoch was changed as above. To convert old ordinal floats to the
-    # new epoch, users can do:
-    #     new_ordinal = old_ordinal + mdates.date2num(np.datetime64('0000-12-31'))
-
-    # convert the times from old style to style since matplotlib 3.3
-    TimeBaseCorrection = mpld.date2num(np.datetime64('0000-12-31'))
-
-    #~gglobs.logTime          = gglobs.currentDBData[:,0]             # time data of total file
-    gglobs.logTime          = gglobs.currentDBData[:,0] + TimeBaseCorrection            # time data of total file
-
+    # time bases and data, from cache as far as available
+    gglobs.logTime, gglobs.logTimeDiff, log = getPlotDataPrep()
     gglobs.logTimeFirst     = gglobs.logTime[0]                     # time of first record in total file
-    gglobs.logTimeDiff      = gglobs.logTime - gglobs.logTimeFirst  # using time diff to first record in days
 
     # mpld.num2date(gglobs.logTimeFirst) delivers date with sec fractions, like:
     # 2019-01-02 18:05:00.999980+00:00
@@ -294,29 +553,33 @@ def makePlot():
         plotTime                = gglobs.logTimeDiff
         xLabelStr               = getXLabelsSince(gglobs.Xunit)
 
-    # split multi-dim np.array into 10 single-dim np.arrays like log["CPM"] = [<var data>]
-    log = {}
-    for i, vname in enumerate(gglobs.varnames):
-        log[vname] = gglobs.currentDBData[:, i + 1]
-        #print("{}: log[{}]: {}".format(i, vname, log[vname]))
-
-    # is the temperature to be shown in °C or °F ? (data are in °C )
-    if gglobs.varunit["T"] == "°F":        log["T"] = log["T"] / 5 * 9 + 32
-
     # confine limits to what is available
     Xleft = gglobs.Xleft
     Xright= gglobs.Xright
 
-    #dprint("before re-setting limits: Xleft, Xright, plotTime.min, plotTime.max   {}   {}   {}   {}".format(gglobs.Xleft, gglobs.Xright, plotTime.min(), plotTime.max()))
-    if Xright == None or Xright > plotTime.max():    Xright = plotTime.max()
-    if                   Xright < plotTime.min():    Xright = plotTime.min()
-    if Xleft  == None or Xleft  < plotTime.min():    Xleft  = plotTime.min()
-    if                   Xleft  > plotTime.max():    Xleft  = plotTime.max()
-    #dprint("after                                                                 {}   {}   {}   {}".format(Xleft, Xright, plotTime.min(), plotTime.max()))
+    # plotTime is sorted (data are ordered by time)
+    plotTimeMin = plotTime[0]
+    plotTimeMax = plotTime[-1]
+
+    #dprint("before re-setting limits: Xleft, Xright, plotTime.min, plotTime.max   {}   {}   {}   {}".format(gglobs.Xleft, gglobs.Xright, plotTimeMin, plotTimeMax))
+    if Xright == None or Xright > plotTimeMax:    Xright = plotTimeMax
+    if                   Xright < plotTimeMin:    Xright = plotTimeMin
+    if Xleft  == None or Xleft  < plotTimeMin:    Xleft  = plotTimeMin
+    if                   Xleft  > plotTimeMax:    Xleft  = plotTimeMax
+    #dprint("after                                                                 {}   {}   {}   {}".format(Xleft, Xright, plotTimeMin, plotTimeMax))
+
+    # for large files use the coarsest rollup level which still fills the plot
+    if gglobs.Xunit == "Time":  span = Xright - Xleft
+    else:                       span = (Xright - Xleft) / {"second":86400, "minute": 1440, "hour":24, "day":1}[gglobs.XunitCurrent]
+    if switchRollupLevel(span):
+        rollupSwitching = True
+        try:     makePlot()
+        finally: rollupSwitching = False
+        return
 
     # find the records, where the time limits apply
-    recmin = np.where(plotTime >= Xleft )[0][0]
-    recmax = np.where(plotTime <= Xright)[0].max() # excludes recs > gglobs.Xleft, and takes max of remaining
+    recmin = np.searchsorted(plotTime, Xleft,  side="left")
+    recmax = np.searchsorted(plotTime, Xright, side="right") - 1 # excludes recs > gglobs.Xright
     #dprint("recmin, recmax:", recmin, recmax)
 
     # slice the arrays; include record #recmax (thus +1)
@@ -492,6 +755,7 @@ def makePlot():
     logSliceMod         = {}            # data of the variables
 
     gglobs.logSliceMod  = {}            # data; will be used by Stat, Poiss, FFT
+    gglobs.varStats     = {}            # statistics; will be used by Stat
 
     # used like:       VarName  Unit   Avg      StdDev     Variance          Range         LastValue
     fmtLineLabel     = "{:8s}: {:7s}{:>8.2f} ±{:<8.3g}   {:>8.2f}   {:>7.6g} ... {:<7.6g}    {}"
@@ -504,10 +768,7 @@ def makePlot():
         if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
             #print("logSlice[vname]:", type(logSlice[vname]), logSlice[vname] )
             #print("scaleFactor[vname]:", type(scaleFactor[vname]), scaleFactor[vname] )
-            y                           = logSlice[vname] * scaleFactor[vname]
-            ymask                       = np.isfinite(y)      # mask for nan values
-            var_y                       = y[ymask]
-            var_x                       = x[ymask]
+            y, var_x, var_y             = getSliceArrays(vname, x, logSlice[vname], recmin, recmax, scaleFactor[vname])
 
             gglobs.logSliceMod[vname]   = y  # will be used by Stat, Poiss, FFT
 
@@ -515,12 +776,13 @@ def makePlot():
             #print("vname: var_size:", vname, var_size)
             if var_size == 0: continue
 
-            var_avg                     = np.nanmean(var_y)
-            var_std                     = np.nanstd (var_y)
-            var_var                     = np.nanvar (var_y)
-            var_max                     = np.nanmax (var_y)
-            var_min                     = np.nanmin (var_y)
-            var_size                    = var_y.size
+            stats                       = getSliceStats(vname, y, recmin, recmax, scaleFactor[vname])
+            gglobs.varStats[vname]      = stats # will be used by Stat
+            var_avg                     = stats.mean
+            var_std                     = stats.std
+            var_var                     = stats.var
+            var_max                     = stats.max
+            var_min                     = stats.min
             var_err                     = var_std / np.sqrt(var_size)
             if gglobs.lastValues == None:
                 var_lastval = "    N.A."
@@ -603,11 +865,10 @@ def plotAverage(x, logSlice, scaleFactor, varPlotStyle):
     vname     = gglobs.varnames[gglobs.exgg.select.currentIndex()]
     #print("average: vname, gglobs.exgg.varDisplayCheckbox[vname].isChecked():", vname, gglobs.exgg.varDisplayCheckbox[vname].isChecked())
     if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
-        avg_Time                     = [x[0], x[-1]]
-        logSliceMod                  = logSlice[vname] * scaleFactor[vname]
-        #print("logSliceMod:", logSliceMod)
+        if vname not in gglobs.varStats: return          # no values in the slice
 
-        avg_avg                      = np.nanmean(logSliceMod)
+        avg_Time                     = [x[0], x[-1]]
+        avg_avg                      = gglobs.varStats[vname].mean     # cached, see getSliceStats
         avg_std                      = np.sqrt(avg_avg)         # this is std.dev derived from avg!
         #print("---StdDev of Data: {:6.3f}, SQRT(avg): {:6.3f}".format(np.nanstd (logSliceMod), avg_std))
 
@@ -643,14 +904,40 @@ def plotAverage(x, logSlice, scaleFactor, varPlotStyle):
             plotLine(avg_Time, avg_CPMS_hi, gglobs.Xunit, vname, **avg_plotstyle)
 
 
+def getMovAvgPoints(y, N):
+    """Moving average over N data points by cumulative sums; linear in the
+    size of y regardless of N. Returns the len(y) - N + 1 averages of all
+    full windows"""
+
+    cs = np.cumsum(np.insert(y, 0, 0.0))
+
+    return (cs[N:] - cs[:-N]) / N
+
+
+def getMovAvgTime(t, y, window):
+    """Moving average over a time window centered on each record, correct
+    also for gaps and changing cycle times; t in days, window in sec.
+    Returns a mask of records with the window fully inside the data, and
+    the averages of all records"""
+
+    half = window / 86400. / 2
+    cs   = np.cumsum(np.insert(y, 0, 0.0))
+    lo   = np.searchsorted(t, t - half, side="left")
+    hi   = np.searchsorted(t, t + half, side="right")
+
+    return (t - half >= t[0]) & (t + half <= t[-1]), (cs[hi] - cs[lo]) / (hi - lo)
+
+
 def plotMovingAverage(x, logSlice, scaleFactor, varPlotStyle):
     """Plot the Moving Average"""
 
     if not gglobs.mavChecked: return
 
-    # Plot the moving average over N datapoints with a thin line in the
-    # variable's color on a yellow thick line.
-    # Do the average over no more than N/2 data points.
+    # Plot the moving average with a thin line in the variable's color on a
+    # yellow thick line.
+    # Mode 'time': average over all records within +/- mav/2 seconds of each
+    # record; skip records closer than mav/2 to the first or last record.
+    # Mode 'points': average over N datapoints, but over no more than N/2.
     # Determine N from time delta between first and last record and the number of records.
     # Note: improper with long periods of no data, or changing cycle time!
     # In plot skip the first and last N/2 data points, which are meaningless due to averaging.
@@ -662,14 +949,11 @@ def plotMovingAverage(x, logSlice, scaleFactor, varPlotStyle):
 
     if logSliceNoNAN.size == 0: return                      # no data, return
 
-    logSliceMod     = logSliceNoNAN * scaleFactor[vname]
-
     x_mav           = x[lSM_mask]
+    t_mav           = gglobs.logTimeSlice[lSM_mask]
     x_mav_size      = x_mav.size
-    x_mav_max       = x_mav.max()
-    x_mav_min       = x_mav.min()
 
-    logCycle        = (gglobs.logTimeSlice.max() - gglobs.logTimeSlice.min()) / x_mav_size
+    logCycle        = (t_mav[-1] - t_mav[0]) / x_mav_size
     logCycle       *= 86400.0                      # apparent cycle time in sec
     Nmav            = round(gglobs.mav / logCycle) # e.g. 100 sec / 2 sec -> 50 datapoints; rounding to integer value
 
@@ -677,29 +961,48 @@ def plotMovingAverage(x, logSlice, scaleFactor, varPlotStyle):
     if gglobs.fprintMAV:
         gglobs.fprintMAV = False # print only once after a change
         fprint("\nINFO:")
-        fprint("Moving Average requested over: {:0.2f} seconds; with {:0.1f} seconds".format(gglobs.mav, logCycle))
-        fprint("average cycle time this equals {:0.0f} datapoints. Current maximum for".format(Nmav))
-        fprint("MovAvg is half of {} datapoints = {} datapoints or {:0.0f} seconds".format(x_mav_size, x_mav_size / 2, x_mav_size / 2 * logCycle))
+        if gglobs.mavMode == "time":
+            fprint("Moving Average requested over: {:0.2f} seconds, averaging all".format(gglobs.mav))
+            fprint("datapoints within this time window (mode 'time'). With {:0.1f} seconds".format(logCycle))
+            fprint("average cycle time this is about {:0.0f} datapoints".format(Nmav))
+        else:
+            fprint("Moving Average requested over: {:0.2f} seconds; with {:0.1f} seconds".format(gglobs.mav, logCycle))
+            fprint("average cycle time this equals {:0.0f} datapoints. Current maximum for".format(Nmav))
+            fprint("MovAvg is half of {} datapoints = {} datapoints or {:0.0f} seconds".format(x_mav_size, x_mav_size / 2, x_mav_size / 2 * logCycle))
 
-    if Nmav < 1.0:
-        Nmav   = 1
-        fprint("ALERT: Moving Average of less than 1 datapoint requested")
-        fprint("ALERT: Corrected to 1 - still not useful!")
+    # the averages depend only on these, and are reused when redrawing
+    key = (vname, gglobs.mavMode, gglobs.mav, scaleFactor[vname], gglobs.currentDBPath, x_mav_size, t_mav[0], t_mav[-1], x_mav[0])
+    if key in mavCache:
+        mav_x, mav_y, mav_label = mavCache[key]
 
-    N           = int(min(len(x_mav) / 2, Nmav)) # take the smaller of N and half of records
-    new_mav     = N * logCycle
+    else:
+        logSliceMod = logSliceNoNAN * scaleFactor[vname]
 
-    lower       = int(N/2)
-    upper       = int(x_mav_size - N / 2 )
-    #dprint("lower, upper, delta:", lower, upper, upper - lower)
+        if gglobs.mavMode == "time":
+            valid, mav  = getMovAvgTime(t_mav, logSliceMod, gglobs.mav)
+            mav_x       = x_mav[valid]
+            mav_y       = mav  [valid]
+            mav_label   = "MvAvg, {:0.0f}sec".format(gglobs.mav)
 
-    if upper - lower > 2: # needs more than a single record
-        if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
+        else:
+            if Nmav < 1.0:
+                Nmav   = 1
+                fprint("ALERT: Moving Average of less than 1 datapoint requested")
+                fprint("ALERT: Corrected to 1 - still not useful!")
 
-            mav_label                   = "MvAvg, N={:0.0f} ({:0.0f}sec)".format(N, new_mav)
+            N           = max(1, int(min(x_mav_size / 2, Nmav))) # take the smaller of N and half of records
+            new_mav     = N * logCycle
+            lower       = int(N / 2)
 
-            mav_x = x_mav[lower:upper]
-            mav_y = np.convolve(logSliceMod,     np.ones((N,))/N, mode='same')[lower:upper]
+            mav_y       = getMovAvgPoints(logSliceMod, N)
+            mav_x       = x_mav[lower:lower + mav_y.size]
+            mav_label   = "MvAvg, N={:0.0f} ({:0.0f}sec)".format(N, new_mav)
+
+        if len(mavCache) > 10: mavCache.clear()
+        mavCache[key] = (mav_x, mav_y, mav_label)
+
+    if mav_x.size > 2: # needs more than a single record
+        if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
 
             mav_plotstyle               = varPlotStyle[vname].copy()
             mav_plotstyle['color']      = 'yellow'
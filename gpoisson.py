@@ -33,6 +33,8 @@ __license__         = "GPL3"
 
 from   gutils            import *
 
+import gplot
+
 
 #** Begin  newplotPoisson *****************************************************
 def newplotPoisson():
@@ -46,6 +48,8 @@ def newplotPoisson():
         gglobs.exgg.showStatusMessage("No data available")
         return
 
+    if gplot.isRollupShown("Poisson Test"): return
+
     try:
         t0 = gglobs.logTimeDiffSlice
         x0 = gglobs.logSliceMod[vname]
@@ -477,6 +481,8 @@ def newplotFFT():
         gglobs.exgg.showStatusMessage("No data available")
         return
 
+    if gplot.isRollupShown("FFT"): return
+
     vindex      = gglobs.exgg.select.currentIndex()
     vname       = gglobs.varnames[vindex]
     vnameFull   = gglobs.vardict[vname][0]
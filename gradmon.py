@@ -49,6 +49,16 @@ __credits__         = [""]
 __license__         = "GPL3"
 
 from   gutils       import *
+import collections                      # deque as bounded sample buffer
+
+# MQTT topic (within RMServerFolder) to GeigerLog variable
+RMTopics = {"temp"      : "T",
+            "pressure"  : "P",
+            "humid"     : "H",
+            "cpm"       : "CPM",
+           }
+
+rmLock = threading.Lock()               # on_message runs in the MQTT loop thread
 
 
 ###############################################################################
@@ -131,11 +141,18 @@ def on_message(client, userdata, msg):
     vprint(">RadMon: on_message: topic: {:20s}, payload: {:10s}, qos: {}, retain: {}".format(msg.topic, str(msg.payload), msg.qos, msg.retain))
     #print("type of msg.payload:", type(msg.payload))
 
-    if   msg.topic == gglobs.RMServerFolder + "temp":     gglobs.rm_temp   = float(msg.payload)    # T
-    elif msg.topic == gglobs.RMServerFolder + "pressure": gglobs.rm_press  = float(msg.payload)    # P
-    elif msg.topic == gglobs.RMServerFolder + "humid":    gglobs.rm_hum    = float(msg.payload)    # H
-    elif msg.topic == gglobs.RMServerFolder + "cpm":      gglobs.rm_cpm    = float(msg.payload)    # CPM*
-    elif msg.topic == gglobs.RMServerFolder + "rssi":     gglobs.rm_rssi   = float(msg.payload)    # rssi
+    topic = msg.topic[len(gglobs.RMServerFolder):] if msg.topic.startswith(gglobs.RMServerFolder) else None
+
+    if topic == "rssi":
+        gglobs.rm_rssi = float(msg.payload)                                 # rssi
+
+    elif topic in RMTopics:                                                 # T, P, H, CPM*
+        try:
+            value = float(msg.payload)
+        except ValueError:
+            dprint(">RadMon: on_message: invalid payload '{}' for topic '{}'".format(msg.payload, msg.topic))
+            return
+        storeRadMonSample(RMTopics[topic], value)
     #else:                                                print("msg.payload:", msg.payload)       # any
 
 
@@ -151,8 +168,34 @@ def on_publish(client, userdata, mid):
 # END MQTT Callbacks
 ###############################################################################
 
+def storeRadMonSample(vname, value, timestamp=None):
+    """Append a sample to the buffer of variable vname; the buffer is bounded
+    to RMBufferSize samples, dropping the oldest ones"""
+
+    if timestamp is None: timestamp = time.time()
+
+    with rmLock:
+        if vname not in gglobs.rm_buffer:
+            gglobs.rm_buffer[vname] = collections.deque(maxlen=gglobs.RMBufferSize)
+        gglobs.rm_buffer[vname].append((timestamp, value))
+
+
+def aggregateRadMonSamples(vname):
+    """Remove all samples of variable vname collected since the last call and
+    return (mean, min, max, count) of them, or None if there are none"""
+
+    with rmLock:
+        buf = gglobs.rm_buffer.get(vname)
+        if not buf: return None
+        samples = np.array([value for timestamp, value in buf])
+        buf.clear()
+
+    return (np.mean(samples), np.min(samples), np.max(samples), samples.size)
+
+
 def getRadMonValues(varlist):
-    """Read all RadMon data; return only when complete"""
+    """Read all RadMon data collected during the last log cycle; the mean of
+    all samples is logged, mean/min/max/count are kept in gglobs.rm_stats"""
 
     #vprint("getRadMonValues({})".format(varname))
     #setDebugIndent(1)
@@ -166,46 +209,15 @@ def getRadMonValues(varlist):
     if varlist == None:
         return alldata
 
-    dataIncomplete = False
     for vname in varlist:
-        if   vname == "T" and gglobs.rm_temp  == None :
-            dataIncomplete = True
-            break
-        elif vname == "P" and gglobs.rm_press == None :
-            dataIncomplete = True
-            break
-        elif vname == "H" and gglobs.rm_hum   == None :
-            dataIncomplete = True
-            break
-        elif vname in ("CPM", "CPM1st", "CPM2nd", "CPM3rd") and gglobs.rm_cpm == None:
-            dataIncomplete = True
-            break
+        if vname in ("CPM", "CPM1st", "CPM2nd", "CPM3rd"):  topicvar = "CPM"
+        else:                                               topicvar = vname
 
-    if not dataIncomplete:
-        for vname in varlist:
-            if   vname == "T":
-                Temp            = gglobs.rm_temp
-                Temp            = scaleVarValues(vname, Temp, gglobs.ValueScale[vname])
-                gglobs.rm_temp  = None
-                alldata.update({"T": Temp})
-
-            elif vname == "P":
-                Press           = gglobs.rm_press
-                Press           = scaleVarValues(vname, Press, gglobs.ValueScale[vname])
-                gglobs.rm_press = None
-                alldata.update({"P": Press})
-
-            elif vname == "H":
-                Hum             = gglobs.rm_hum
-                Hum             = scaleVarValues(vname, Hum, gglobs.ValueScale[vname])
-                gglobs.rm_hum   = None
-                alldata.update({"H": Hum})
-
-            elif vname in ("CPM", "CPM1st", "CPM2nd", "CPM3rd"):
-                cpm             = gglobs.rm_cpm
-                cpm             = scaleVarValues(vname, cpm, gglobs.ValueScale[vname])
-                gglobs.rm_cpm   = None
-                alldata.update({vname: cpm})
+        stats = aggregateRadMonSamples(topicvar)
+        if stats is None: continue          # no new sample in this cycle
+
+        gglobs.rm_stats[vname] = stats
+        alldata.update({vname: scaleVarValues(vname, stats[0], gglobs.ValueScale[vname])})
 
     vprint("{:20s}:  Variables:{}  Data:{}  Folder:'{}'".format("getRadMonValues", varlist, alldata, gglobs.RMServerFolder))
     #setDebugIndent(0)
@@ -242,6 +254,10 @@ Wireless signal strength:     {} (rssi)""".format(\
                                                   gglobs.RMServerFolder, \
                                                   rssi)
 
+        RMInfo += "\nLast log cycle (mean, min, max, count):"
+        for vname in gglobs.rm_stats:
+            RMInfo += "\n   {:8s}                   {:0.3f}, {:0.3f}, {:0.3f}, {}".format(vname, *gglobs.rm_stats[vname])
+
     return RMInfo
 
 
@@ -263,6 +279,10 @@ def terminateRadMon():
     gglobs.rm_client = None
     dprint("terminateRadMon: client was set to: None")
 
+    with rmLock:
+        gglobs.rm_buffer = {}
+    gglobs.rm_stats = {}
+
     # wait for confirmation of dis-connection
     starttime = time.time()
     timeout   = True
@@ -387,3 +407,79 @@ def initRadMon():
 
     setDebugIndent(0)
     return errmsg
+
+
+class FakeMQTTMessage:
+    """Stand-in for paho's MQTTMessage, as passed to on_message"""
+
+    def __init__(self, topic, payload):
+        self.topic   = topic
+        self.payload = payload
+        self.qos     = 0
+        self.retain  = False
+
+
+def checkRadMonBuffer(threads=4, messages=5000, cycles=10):
+    """Publish messages from several threads into on_message while logging
+    cycles read the buffer concurrently, and verify that no sample is lost
+    and the aggregates are correct. Raises AssertionError if not"""
+
+    gglobs.RMConnection     = True
+    gglobs.RMServerFolder   = "/"
+    gglobs.RMBufferSize     = threads * messages       # large enough to lose nothing
+    gglobs.rm_buffer        = {}
+    gglobs.rm_stats         = {}
+
+    print("RadMon buffer check: {} threads with {} messages each, {} log cycles".format(threads, messages, cycles))
+
+    def publish(n):
+        for i in range(messages):
+            on_message(None, None, FakeMQTTMessage("/cpm",  str(float(i)).encode()))
+            on_message(None, None, FakeMQTTMessage("/temp", str(20.0 + n).encode()))
+
+    publishers = [threading.Thread(target=publish, args=(n,)) for n in range(threads)]
+    for t in publishers: t.start()
+
+    count   = {"CPM": 0, "T": 0}
+    vsum    = {"CPM": 0, "T": 0}
+    while any(t.is_alive() for t in publishers) or cycles > 0:
+        time.sleep(0.01)
+        cycles -= 1
+        for vname in count:
+            stats = aggregateRadMonSamples(vname)
+            if stats is None: continue
+            count[vname] += stats[3]
+            vsum [vname] += stats[0] * stats[3]
+    for t in publishers: t.join()
+
+    failed = []
+
+    def check(name, value, expected):
+        """compare value with expected; exact for counts, else to rounding"""
+
+        ok = np.isclose(value, expected, rtol=1e-9, atol=0)
+        print("    {:16s} {:>12}  (expected: {})  {}".format(name + ":", value, expected, "ok" if ok else "FAILED"))
+        if not ok: failed.append(name)
+
+    expected = threads * messages
+    check("CPM samples",    count["CPM"],                           expected)
+    check("T   samples",    count["T"],                             expected)
+    check("CPM mean",       vsum["CPM"] / max(count["CPM"], 1),     (messages - 1) / 2)
+    check("T   mean",       vsum["T"]   / max(count["T"],   1),     20.0 + (threads - 1) / 2)
+
+    # bounded memory: excess samples drop the oldest
+    gglobs.RMBufferSize = 100
+    gglobs.rm_buffer    = {}
+    for i in range(1000): storeRadMonSample("H", float(i))
+    mean, vmin, vmax, n = aggregateRadMonSamples("H")
+    check("bounded count",  n,      100)
+    check("bounded min",    vmin,   900.0)
+    check("bounded max",    vmax,   999.0)
+    check("bounded mean",   mean,   949.5)
+
+    assert len(failed) == 0, "RadMon buffer check failed: " + ", ".join(failed)
+
+
+if __name__ == '__main__':
+    # Start with: 'python3 gradmon.py' to check the sample buffer with a fake client
+    checkRadMonBuffer()
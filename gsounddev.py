@@ -75,6 +75,149 @@ Windows:    sound on Windows: make sure the soundsettings for input and output a
 from   gutils       import *
 
 
+pulseLock = threading.Lock()        # guards the pulse ring buffer, which is written
+                                    # by the thread and read by getSounddevValues
+
+
+class PulseDetector():
+    """Finds the onset of every pulse in a stream of audio chunks with sample
+    accuracy. A count is triggered when the signal exceeds the threshold, and
+    the detector is re-armed only after the signal has returned close to zero,
+    so that a pulse extending over several chunks is counted only once"""
+
+    def __init__(self, llimit, ilimit):
+
+        self.llimit = llimit        # |signal| must exceed this to trigger a count
+        self.ilimit = ilimit        # |signal| must fall below this to re-arm
+        self.armed  = True
+        self.onset  = 0             # sample of the last onset, relative to the chunk start
+        self.busy   = 0             # sum of the samples from onset to re-arm
+        self.rearms = 0             # number of re-arms summed in busy
+
+
+    def resolvingTime(self):
+        """the mean time in µs from the onset of a pulse until the detector is
+        re-armed, during which no other pulse can be counted; 0 if not yet
+        known"""
+
+        if self.rearms == 0: return 0
+
+        return self.busy / self.rearms / gglobs.AudioRate * 1E6
+
+
+    def process(self, npdata):
+        """Return the sample indices - relative to chunk start - of all pulse
+        onsets in the chunk npdata"""
+
+        if gglobs.AudioPulseDir:    sig = +npdata.astype(np.int32)      # True -> positive pulse
+        else:                       sig = -npdata.astype(np.int32)      # False -> negative pulse
+
+        beyond = np.flatnonzero(sig > self.llimit)
+        if self.armed and beyond.size == 0: return np.empty(0, dtype=np.int64)
+        rearm  = np.flatnonzero(sig < self.ilimit)
+
+        # only the crossings are visited, not every sample
+        onsets = []
+        pos    = 0
+        while True:
+            if self.armed:
+                k = np.searchsorted(beyond, pos)
+                if k == beyond.size: break
+                pos         = beyond[k]
+                onsets.append(pos)
+                self.onset  = pos
+                self.armed  = False
+            else:
+                k = np.searchsorted(rearm, pos)
+                if k == rearm.size: break
+                pos          = rearm[k]
+                self.busy   += pos - self.onset
+                self.rearms += 1
+                self.armed   = True
+
+        if not self.armed: self.onset -= npdata.size        # relative to the next chunk
+
+        return np.array(onsets, dtype=np.int64)
+
+
+def _storePulses(pulsetimes, samples):
+    """Append the sample indices of new pulses to the ring buffer, and advance
+    the sample count by the number of samples read"""
+
+    size = gglobs.AudioPulseBufferSize
+    with pulseLock:
+        if pulsetimes.size > 0:
+            if pulsetimes.size > size:  pulsetimes = pulsetimes[-size:]
+            ndx = (gglobs.AudioPulseCount + np.arange(pulsetimes.size)) % size
+            gglobs.AudioPulseTimes[ndx] = pulsetimes
+            gglobs.AudioPulseCount     += pulsetimes.size
+        gglobs.AudioSampleCount += samples
+
+
+def getPulseTimes():
+    """Return the sample indices of all pulses in the ring buffer in
+    chronological order, and the sample count at the time of reading"""
+
+    size = gglobs.AudioPulseBufferSize
+    with pulseLock:
+        count   = gglobs.AudioPulseCount
+        samples = gglobs.AudioSampleCount
+        if count <= size:
+            pulsetimes = gglobs.AudioPulseTimes[:count].copy()
+        else:
+            pos        = count % size
+            pulsetimes = np.concatenate((gglobs.AudioPulseTimes[pos:], gglobs.AudioPulseTimes[:pos]))
+
+    return pulsetimes, samples
+
+
+def getInterArrivalTimes(count=None):
+    """Return the times in sec between consecutive pulses for the last count
+    pulses; all pulses in the ring buffer when count is None"""
+
+    pulsetimes, samples = getPulseTimes()
+    if count is not None: pulsetimes = pulsetimes[-(count + 1):]
+
+    return np.diff(pulsetimes) / gglobs.AudioRate
+
+
+def correctDeadtime(rate):
+    """Correct a measured count rate (per sec) for the counter's dead time
+    using the non-paralyzable model. The dead time is the larger of the
+    configured dead time of the tube and the resolving time of the pulse
+    detector, as no pulse is counted during either. No correction when the
+    configured dead time is 0. Returns NAN when the measured rate is not
+    possible with this dead time"""
+
+    if gglobs.AudioDeadtime <= 0: return rate
+
+    tau = max(gglobs.AudioDeadtime, gglobs.AudioResolvingTime) * 1E-6      # µs -> sec
+
+    loss = rate * tau
+    if loss >= 1: return gglobs.NAN
+
+    return rate / (1 - loss)
+
+
+def getPulseRate(duration):
+    """Return the dead-time corrected count rate in counts per sec over the
+    last duration seconds. The time base is the count of samples, not the wall
+    clock, so processing time has no influence. Less than duration is used when
+    the stream is younger, or the ring buffer does not cover duration"""
+
+    pulsetimes, samples = getPulseTimes()
+    if samples == 0: return gglobs.NAN
+
+    start = max(samples - int(duration * gglobs.AudioRate), 0)
+    if gglobs.AudioPulseCount > gglobs.AudioPulseBufferSize and pulsetimes[0] > start:
+        start = pulsetimes[0]               # ring buffer has overrun within duration
+
+    counts = pulsetimes.size - np.searchsorted(pulsetimes, start)
+    span   = (samples - start) / gglobs.AudioRate
+
+    return correctDeadtime(counts / span)
+
+
 def initSounddev():
     """Start the thread to monitor the audio pulses for clicks"""
 
@@ -93,6 +236,7 @@ def initSounddev():
     if gglobs.AudioPulseMax     == "auto": gglobs.AudioPulseMax     = 32768             # +/- 15 bit
     if gglobs.AudioPulseDir     == "auto": gglobs.AudioPulseDir     = False             # => negative
     if gglobs.AudioThreshold    == "auto": gglobs.AudioThreshold    = 60                # % of max
+    if gglobs.AudioDeadtime     == "auto": gglobs.AudioDeadtime     = 0                 # µs; no correction
     if gglobs.AudioCalibration  == "auto": gglobs.AudioCalibration  = 154               # CPM/(µSv/h), = 0.065 µSv/h/CPM
     if gglobs.AudioVariables    == "auto": gglobs.AudioVariables    = "CPM3rd, CPS3rd"
 
@@ -183,30 +327,38 @@ def terminateSounddev():
     gglobs.AudioConnection = False
 
 
-def sounddevThreadTarget(Dummy):
-    """The thread to read the sounddev input"""
-
-    #~global cpm_counter, getThreadData
-    global cpm_counter
+def sounddevThreadTarget(stream):
+    """The thread to read the sounddev input. stream is None for the sound
+    device, but can be any object having the read() method of an InputStream"""
 
     fncname = "sounddevThreadTarget: "
 
     gglobs.AudioLastCps     = 0
     gglobs.AudioLastCpm     = 0
-    cps_count               = 0
     llimit                  = gglobs.AudioThreshold / 100 * gglobs.AudioPulseMax
-    ilimit                  = 10000                             # the |pulse| must NOT exceed this value on first count in order to be countesd
+    ilimit                  = min(10000, llimit / 2)            # the |pulse| must fall below this value before
+                                                                # the next pulse can be counted
                                                                 # higher values give MORE counts!
+    detector                = PulseDetector(llimit, ilimit)
+
+    gglobs.AudioResolvingTime = 0
+
+    with pulseLock:
+        gglobs.AudioPulseTimes  = np.zeros(gglobs.AudioPulseBufferSize, dtype=np.int64)
+        gglobs.AudioPulseCount  = 0
+        gglobs.AudioSampleCount = 0
 
-    cpm_counter             = np.full(60, 0)                    # storing last 60 sec of CPS values
     gglobs.AudioMultiPulses = np.array([0])                     # time courses for last ~40 of the pulses
     gglobs.AudioRecording   = np.array([0])
     nandata                 = np.full(10, gglobs.NAN)           # creating a gap of 10 values
     chunks40                = (gglobs.AudioChunk + 10) * 40     # the length of 40 single pulses with gaps
 
-    CHUNKstream = sd.InputStream(blocksize=gglobs.AudioChunk)   # no callback so we get blocking read
+    if stream is None:
+        CHUNKstream = sd.InputStream(blocksize=gglobs.AudioChunk)   # no callback so we get blocking read
+    else:
+        CHUNKstream = stream
     CHUNKstream.start()
-    cstart                  = time.time()                       # to record the 1 sec collection period
+    nextCpsSample           = gglobs.AudioRate                  # sample count for next CPS update (1 sec)
 
     while not gglobs.AudioThreadStop:
 
@@ -236,29 +388,18 @@ def sounddevThreadTarget(Dummy):
             pass
             dprint("'overflowed' HAPPENED: Stream calls: record len:{}, overflowed:{}".format(len(record), overflowed) )
 
-        # Determine if there is a count
-        # ignore records catching pulses when already down; they were probably
-        # already counted during last record
-        gotCount = False
-        if gglobs.AudioPulseDir:                        # True -> positive pulse
-            if npdata[0] < +ilimit and npdata.max() > +llimit:
-                gotCount = True
-        else:                                           # False -> negative pulse
-            if npdata[0] > -ilimit and npdata.min() < -llimit:
-                gotCount = True
-
-        if gotCount:
-            cps_count  += 1
+        # Determine all counts in this chunk with sample-accurate timestamps
+        onsets = detector.process(npdata)
+        _storePulses(gglobs.AudioSampleCount + onsets, npdata.size)
+        gglobs.AudioResolvingTime = detector.resolvingTime()
+
+        if onsets.size > 0:
             gglobs.AudioMultiPulses   = np.concatenate((gglobs.AudioMultiPulses, nandata, npdata))[-chunks40:]
             #~print("AudioMultiPulses: ", len(gglobs.AudioMultiPulses), gglobs.AudioMultiPulses)
-            #print("got count: Stream calls: {:7.3f}ms, record len:{}, overflowed:{}".format(dt, len(record), overflowed) )
 
-        deltat = time.time() - cstart
-        if deltat >= 1:
-            gglobs.AudioLastCps  = cps_count / deltat  * 1.05 # correct for calc time
-            cpm_counter          = np.append(cpm_counter, gglobs.AudioLastCps)[1:]
-            cps_count            = 0
-            cstart               = time.time()
+        if gglobs.AudioSampleCount >= nextCpsSample:
+            gglobs.AudioLastCps  = getPulseRate(1)
+            nextCpsSample       += gglobs.AudioRate
 
         #~xdt = (time.time() - xstart) * 1000
         #print("wdt:{:0.3f}ms, xdt:{:0.3f}ms".format(wdt, xdt))
@@ -293,7 +434,10 @@ Sampling Details:
 - CHUNK:                      {} (Samples per read)
 - Pulse Height Max            {} (System reported max signal)
 - Pulse Direction             {} (negative or positive)
-- Pulse Threshold             {}% of Pulse Height Max to trigger count"""\
+- Pulse Threshold             {}% of Pulse Height Max to trigger count
+- Dead Time                   {} µs (0 = no dead time correction)
+- Detector Resolving Time     {:0.0f} µs (measured; used as dead time when larger)
+- Pulses counted              {} (since connection)"""\
                 .format(
                         sd.default.device[0],
                         sd.default.device[1],
@@ -310,6 +454,9 @@ Sampling Details:
                         gglobs.AudioPulseMax,
                         "POSITIVE" if gglobs.AudioPulseDir else "NEGATIVE",
                         gglobs.AudioThreshold,
+                        gglobs.AudioDeadtime,
+                        gglobs.AudioResolvingTime,
+                        gglobs.AudioPulseCount,
                        )
         AudioInfo += "\nFull Device Query:\n"
         AudioInfo += str(sd.query_devices())
@@ -334,8 +481,6 @@ def toggleSounddevPulseDir():
 def getSounddevValues(varlist):
     """Read all sounddev data; return empty dict when not available"""
 
-    global cpm_counter
-
     fncname   = "getSounddevValues: "
     alldata = {}
 
@@ -348,12 +493,16 @@ def getSounddevValues(varlist):
 
     for vname in varlist:
         if   vname in ("CPM", "CPM1st", "CPM2nd", "CPM3rd"):
-            cpm             = int(round(np.sum(cpm_counter), 0))
+            cpm             = getPulseRate(60) * 60
+            if np.isnan(cpm):   continue
+            cpm             = int(round(cpm, 0))
             cpm             = scaleVarValues(vname, cpm, gglobs.ValueScale[vname])
             alldata.update(  {vname: cpm})
 
         elif vname in ("CPS", "CPS1st", "CPS2nd", "CPS3rd"):
-            cps             = int(round(gglobs.AudioLastCps, 0))
+            cps             = getPulseRate(1)
+            if np.isnan(cps):   continue
+            cps             = int(round(cps, 0))
             cps             = scaleVarValues(vname, cps, gglobs.ValueScale[vname] )
             alldata.update(  {vname: cps})
 
@@ -380,6 +529,110 @@ def getLongChunk(duration, recno):
     mystream.stop()
 
 
+class FakeInputStream():
+    """Stands in for a sounddevice InputStream, delivering a synthetic Poisson
+    pulse train of negative pulses with exponential decay, as given by a tube
+    with a non-paralyzable dead time in µs. Sets gglobs.AudioThreadStop when
+    duration sec of samples have been delivered"""
+
+    def __init__(self, cps, duration, deadtime=0, rate=44100, height=30000, decay=4):
+
+        self.rate       = rate
+        self.total      = int(duration * rate)
+        self.position   = 0
+        self.signal     = np.zeros(self.total + 100, dtype=np.float64)
+
+        # Poisson process: exponentially distributed inter-arrival times
+        intervals       = np.random.exponential(1 / cps, int(cps * duration * 1.2) + 100)
+        arrivals        = np.cumsum(intervals)
+        arrivals        = arrivals[arrivals * rate < self.total]
+        self.arrivals   = arrivals.size
+
+        # the tube gives no pulse within the dead time after a pulse
+        tau             = deadtime * 1E-6
+        pulses          = []
+        last            = -np.inf
+        for t in arrivals:
+            if t - last >= tau:
+                pulses.append(t)
+                last = t
+        self.pulsetimes = (np.array(pulses) * rate).astype(np.int64)
+
+        shape           = -height * np.exp(-np.arange(40) / decay)
+        for t in self.pulsetimes:
+            self.signal[t:t + 40] += shape[:len(self.signal[t:t + 40])]
+        self.signal     = np.clip(self.signal, -32768, 32767).astype(np.int16)
+
+    def start(self):    pass
+    def stop(self):     pass
+    def close(self):    pass
+
+    def read(self, frames):
+        record          = self.signal[self.position:self.position + frames].reshape(-1, 1)
+        self.position  += frames
+        if self.position >= self.total: gglobs.AudioThreadStop = True
+
+        return record, False
+
+
+def checkPoisson(cps, duration, deadtime):
+    """Feed a synthetic Poisson pulse train from a tube with dead time in µs
+    through the pulse pipeline, and compare the results with the values
+    expected from the non-paralyzable model, for which the dead time of the
+    whole counter is the larger of tube dead time and detector resolving
+    time. Raises AssertionError if any is outside of its tolerance: 3 sigma of
+    the counting statistics plus 2% for the model. The model holds while the
+    counter is dead for at most 20% of the time; at higher rates the values
+    are shown, but not checked"""
+
+    gglobs.AudioRate        = 44100
+    gglobs.AudioChunk       = 32
+    gglobs.AudioPulseMax    = 32768
+    gglobs.AudioPulseDir    = False
+    gglobs.AudioThreshold   = 60
+    gglobs.AudioDeadtime    = deadtime
+    gglobs.AudioThreadStop  = False
+
+    print("Poisson check: CPS={}, duration={} sec, dead time={} µs".format(cps, duration, deadtime))
+    stream = FakeInputStream(cps, duration, deadtime, rate=gglobs.AudioRate)
+
+    start  = time.time()
+    sounddevThreadTarget(stream)
+    print("    processing took {:0.3f} sec for {} sec of audio".format(time.time() - start, duration))
+
+    span     = stream.total / gglobs.AudioRate
+    truecps  = stream.arrivals / span
+    tau      = max(deadtime, gglobs.AudioResolvingTime) * 1E-6
+    expcps   = truecps / (1 + truecps * tau)                # counted rate
+    expmcps  = truecps if deadtime > 0 else expcps          # rate after dead time correction
+    iat      = getInterArrivalTimes()
+    measured = getPulseRate(span)
+    checked  = expcps * tau <= 0.2                          # fraction of dead time
+    failed   = []
+
+    def check(name, value, expected, fmt):
+        """compare value with expected, within the tolerance for the counts"""
+
+        tolerance = 3 / np.sqrt(max(gglobs.AudioPulseCount, 1)) + 0.02
+        ok        = abs(value - expected) <= tolerance * abs(expected)
+        if   not checked:   result = "not checked"
+        elif ok:            result = "ok"
+        else:               result = "FAILED"
+        print("    {:40s} {:>12s} (expected: {:>12s} ±{:0.1f}%) {}"
+              .format(name + ":", fmt.format(value), fmt.format(expected), tolerance * 100, result))
+        if checked and not ok: failed.append(name)
+
+    print("    {:40s} {:12d}".format("pulses arriving at tube:", stream.arrivals))
+    print("    {:40s} {:12d}".format("pulses given by tube:", stream.pulsetimes.size))
+    print("    {:40s} {:12.0f} µs".format("detector resolving time:", gglobs.AudioResolvingTime))
+    check("pulses detected",                       gglobs.AudioPulseCount,   expcps * span,    "{:0.0f}")
+    check("measured CPS (dead time corrected)",    measured,                 expmcps,          "{:0.1f}")
+    check("mean inter-arrival time [sec]",         np.mean(iat),             1 / expcps,       "{:0.6f}")
+
+    assert gglobs.AudioPulseCount <= stream.pulsetimes.size, "more pulses detected than given"
+    assert len(failed) == 0, "Poisson check failed: " + ", ".join(failed)
+
+
 def plotDataT(AudioMultiPulses, inversrate):
     """plot record of sound data"""
 
@@ -412,8 +665,18 @@ def main():
     Start with: 'python3 gsounddev.py' to get a list of available Sound Devices
     Start with: 'python3 gsounddev.py N' to get a list of available Sound Devices,
                 followed by N recordings and recoding plots from the default device
+    Start with: 'python3 gsounddev.py poisson CPS [DURATION [DEADTIME]]' to check
+                the pulse pipeline with a synthetic Poisson pulse train; DURATION
+                in sec, DEADTIME in µs
     """
 
+    if len(sys.argv) > 2 and sys.argv[1] == "poisson":
+        cps      = float(sys.argv[2])
+        duration = float(sys.argv[3]) if len(sys.argv) > 3 else 60
+        deadtime = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+        checkPoisson(cps, duration, deadtime)
+        return
+
     print("Available Sound Devices:")
     print(sd.query_devices())
     print()
@@ -30,6 +30,8 @@ __license__         = "GPL3"
 
 from   gutils       import *
 
+import zlib                     # compression of the binary history data
+
 
 def DB_getLocaltime():
     """gets the localtime as both Julianday as well as timetag, like:
@@ -96,6 +98,9 @@ def DB_closeDatabase(DB_Connection):
     if DB_Connection == None:
         wprint(fncname + "Database cannot be closed as it is not open")
     else:
+        histViewCache.pop(DB_Connection, None)
+        partitionEnd.pop(DB_Connection, None)
+        DB_closeReaders(DB_Connection)
         try:
             DB_Connection.close()
             wprint(fncname +  "Closing done")
@@ -107,15 +112,30 @@ def DB_closeDatabase(DB_Connection):
 
 
 def DB_deleteDatabase(DB_Connection, DB_FilePath):
-    """Try to close database at DB_Connection, then delete database file at DB_FilePath"""
+    """Try to close database at DB_Connection, then delete database file at
+    DB_FilePath, together with its partition files"""
 
     fncname = "DB_deleteDatabase: "
 
     dprint(fncname + "Deleting DB at file", DB_FilePath)
 
+    # only its own partitions, which are named without folder; those given
+    # with path are files merged by gcatalog.createMergedDatabase
+    parts = []
+    if os.path.exists(DB_FilePath):     # DB_Connection may be of another file
+        try:
+            reader = DB_openReader(DB_FilePath, [])
+            names  = [row[0] for row in reader.execute("SELECT pname FROM main.partitions").fetchall()]
+            parts  = [os.path.join(os.path.dirname(DB_FilePath), name) for name in names if not os.path.isabs(name)]
+            reader.close()
+        except: pass
+
     DB_closeDatabase  (DB_Connection)     # try to close DB
-    try:    os.remove (DB_FilePath)       # try to remove DB file
-    except: pass
+    for path in [DB_FilePath] + parts:
+        try:
+            os.chmod  (path, 0o644)       # partitions are read-only
+            os.remove (path)              # try to remove DB file
+        except: pass
 
 
 def DB_openDatabase(DB_Connection, DB_FilePath):
@@ -206,6 +226,303 @@ def DB_createStructure(DB_Connection):
     setDebugIndent(0)
 
 
+def DB_setWAL(DB_Connection):
+    """Switch the database to journal mode WAL: reading on other connections,
+    see DB_getReader, then neither blocks nor is blocked by writing on this
+    one. The mode is stored in the file. Return: True if in WAL mode"""
+
+    fncname = "DB_setWAL: "
+
+    try:
+        DB_commit(DB_Connection)
+        mode = DB_Connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        DB_Connection.execute("PRAGMA synchronous = NORMAL")     # safe with WAL, and faster
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        return False
+
+    vprint(fncname + "journal mode: ", mode)
+
+    return mode == "wal"
+
+
+def DB_getFilePath(DB_Connection):
+    """the path of the main database of the connection; '' for in-memory"""
+
+    for dbid, name, path in DB_Connection.execute("PRAGMA database_list").fetchall():
+        if name == "main": return path
+
+    return ""
+
+
+# the idle read-only connections per database file, see DB_getReader
+readPool        = {}
+readPoolLock    = threading.Lock()
+readPoolSize    = 4                     # max number of idle connections kept per file
+
+
+def DB_getReader(DB_Connection):
+    """Get a read-only connection to the database file of DB_Connection, for
+    use in any one thread at a time. Only for a database in WAL mode or with
+    partitions, else DB_Connection itself is returned. The newest partitions,
+    as many as can be attached, are included, see DB_openReader. Give it back
+    with DB_putReader"""
+
+    path  = DB_getFilePath(DB_Connection)
+    if path == "": return DB_Connection
+
+    parts = DB_getPartitions(DB_Connection)[-DB_getAttachLimit(DB_Connection):]
+    if len(parts) == 0 and DB_Connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal": return DB_Connection
+
+    with readPoolLock:
+        idle = readPool.get(path, [])
+        while len(idle) > 0:
+            reader = idle.pop()
+            if DB_getAttached(reader) == parts: return reader
+            reader.close()                                  # made before the latest partition
+
+    return DB_openReader(path, parts)
+
+
+def DB_openReader(DB_FilePath, parts, withMain=True):
+    """Open a read-only connection to the database file DB_FilePath, with the
+    partition files parts attached. The tables data and comments are then
+    shadowed by temporary views of the same name over all the partitions and,
+    if withMain, the file itself; ROWID is given as the last column"""
+
+    uri    = "file:{}?mode=ro".format(urllib.request.pathname2url(DB_FilePath))
+    reader = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    if len(parts) == 0 and withMain: return reader
+
+    schemas = []
+    for i, ppath in enumerate(parts):
+        reader.execute("ATTACH DATABASE ? AS p{}".format(i), (ppath,))
+        schemas.append("p{}".format(i))
+    if withMain: schemas.append("main")
+
+    for table, cols in (("data", dataColumns), ("comments", commentsColumns)):
+        selects = ["SELECT {}, ROWID AS ROWID FROM {}.{}".format(", ".join(cols), schema, table) for schema in schemas]
+        reader.execute("CREATE TEMP VIEW {} AS {}".format(table, " UNION ALL ".join(selects)))
+
+    return reader
+
+
+def DB_getAttached(DB_Connection):
+    """the paths of the partition files attached to DB_Connection"""
+
+    return [path for dbid, name, path in DB_Connection.execute("PRAGMA database_list").fetchall() if name not in ("main", "temp")]
+
+
+def DB_getAttachLimit(DB_Connection):
+    """the max number of files which can be attached to a connection"""
+
+    try:    return DB_Connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except: return 10                                       # sqlite default; getlimit needs Python 3.11
+
+
+def DB_putReader(DB_Connection, reader):
+    """Return the reader from DB_getReader for DB_Connection"""
+
+    if reader is DB_Connection: return
+
+    with readPoolLock:
+        idle = readPool.setdefault(DB_getFilePath(DB_Connection), [])
+        if len(idle) < readPoolSize:
+            idle.append(reader)
+            return
+
+    reader.close()
+
+
+def DB_closeReaders(DB_Connection):
+    """Close the idle readers of the database file of DB_Connection"""
+
+    try:    path = DB_getFilePath(DB_Connection)
+    except: return
+
+    with readPoolLock:
+        idle = readPool.pop(path, [])
+
+    for reader in idle: reader.close()
+
+
+# queries whose rows of several groups of partitions cannot simply be
+# concatenated: aggregates, grouping, distinct, limits, descending order
+sqlNotConcatenable = re.compile(r"\b(count|sum|avg|min|max|total|group_concat)\s*\(|\b(group\s+by|distinct|limit|desc)\b", re.IGNORECASE)
+
+
+def DB_fetchall(DB_Connection, sql, params=(), merged=False):
+    """Execute the query sql on a reader of DB_Connection and return all rows.
+    The query runs synchronously; on a WAL database the reader does not block
+    the logging writer, see DB_setWAL.
+    With more partitions than can be attached at once, the query is made on
+    each group of them, oldest first, and the rows are concatenated; this is
+    the same as a single query only for row queries in ascending order of
+    time, any other query raises ValueError, unless merged is True, i.e. the
+    caller merges the rows of the groups itself"""
+
+    def fetch(reader):
+        return reader.execute(sql, params).fetchall()
+
+    rows  = []
+    limit = DB_getAttachLimit(DB_Connection)
+    parts = DB_getPartitions(DB_Connection)
+    older = parts[:-limit]
+    if len(older) > 0 and not merged and sqlNotConcatenable.search(sql):
+        raise ValueError("DB_fetchall: query cannot span {} partitions in groups of {}: {}".format(len(parts), limit, " ".join(sql.split())))
+
+    for i in range(0, len(older), limit):
+        reader = DB_openReader(DB_getFilePath(DB_Connection), older[i : i + limit], withMain=False)
+        try:        rows += fetch(reader)
+        finally:    reader.close()
+
+    reader = DB_getReader(DB_Connection)
+    try:        return rows + fetch(reader)
+    finally:    DB_putReader(DB_Connection, reader)
+
+
+def DB_getPartitions(DB_Connection):
+    """the paths of the partition files of the database, oldest first; see
+    DB_rollPartitions"""
+
+    try:    rows = DB_Connection.execute("SELECT pname FROM main.partitions ORDER BY pfirst").fetchall()
+    except: return []                                       # no table partitions
+
+    folder = os.path.dirname(DB_getFilePath(DB_Connection))
+
+    return [os.path.join(folder, row[0]) for row in rows]
+
+
+# the Julianday at which the period of the latest record ends, per connection
+partitionEnd = {}
+
+
+def DB_checkPartition(DB_Connection, julian):
+    """Called after the record at julian has been logged: on the first call,
+    and whenever a new period has begun, the older periods are moved into
+    their partition files. Nothing done if gglobs.logPartition is None"""
+
+    if gglobs.logPartition is None:                                 return
+    if julian < partitionEnd.get(DB_Connection, 0):                 return
+
+    partitionEnd[DB_Connection] = DB_rollPartitions(DB_Connection, julian)
+
+
+def DB_rollPartitions(DB_Connection, julian):
+    """Move all records of table data and all comments of the periods before
+    the period of julian into the partition file of their period, e.g.
+    'mylog.2020-05.logdb' for 'mylog.logdb' with period monthly. Each of
+    these is a complete log database, listed in the table partitions, and
+    made read-only once done. Return: the Julianday at which the period of
+    julian ends"""
+
+    fncname = "DB_rollPartitions: "
+
+    fmt, start, step = partitionPeriods[gglobs.logPartition]
+    jstart, jend     = DB_Connection.execute("SELECT julianday(?, ?), julianday(?, ?, ?)", (julian, start, julian, start, step)).fetchone()
+
+    try:
+        DB_Connection.execute(sqlCreatePartitions)
+        DB_commit(DB_Connection)
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        return jend
+
+    while True:
+        jmin = DB_Connection.execute("SELECT min(j) FROM (SELECT min(Julianday) AS j FROM main.data UNION ALL SELECT min(cJulianday) FROM main.comments)").fetchone()[0]
+        if jmin is None or jmin >= jstart: break
+
+        key, pend = DB_Connection.execute("SELECT strftime(?, ?), julianday(?, ?, ?)", (fmt, jmin, jmin, start, step)).fetchone()
+        if not DB_movePartition(DB_Connection, key, min(pend, jstart)): break
+
+    return jend
+
+
+def DB_movePartition(DB_Connection, key, jend):
+    """Move the records and comments before Julianday jend into the partition
+    file named with key. Return: True if done"""
+
+    fncname = "DB_movePartition: "
+
+    start   = time.time()
+    path    = DB_getFilePath(DB_Connection)
+    ppath   = "{}.{}.logdb".format(os.path.splitext(path)[0], key)
+    compact = DB_isCompact(DB_Connection)
+    vnames  = [row[1] for row in DB_Connection.execute("PRAGMA main.table_info(datac)").fetchall()][2:]    # after tms, dindex
+
+    created = not os.path.exists(ppath)
+    try:
+        if not created: os.chmod(ppath, 0o644)              # again, e.g. after the clock was set back
+        pconn = sqlite3.connect(ppath)
+        try:
+            DB_createStructure(pconn)
+            if compact: DB_createCompact(pconn, vnames)
+        finally:
+            pconn.close()
+    except Exception as e:
+        srcinfo = fncname + "Exception: cannot create '{}'".format(ppath)
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        DB_dropPartitionFile(ppath, created)
+        return False
+
+    DB_commit(DB_Connection)
+    DB_Connection.execute("ATTACH DATABASE ? AS part", (ppath,))
+    try:
+        # records of a partition made again get new ROWIDs, like the comments;
+        # in the compact table duplicates of (time, index) are dropped
+        if compact:
+            cols = ", ".join(["tms", "dindex"] + vnames)
+            tms  = int(round((jend - 2440587.5) * 86400000))
+            DB_Connection.execute("INSERT OR IGNORE INTO part.datac ({c}) SELECT {c} FROM main.datac WHERE tms < ?".format(c=cols), (tms,))
+            DB_Connection.execute("DELETE FROM main.datac WHERE tms < ?", (tms,))
+        else:
+            cols = ", ".join(dataColumns)
+            DB_Connection.execute("INSERT INTO part.data ({c}) SELECT {c} FROM main.data WHERE Julianday < ? ORDER BY ROWID".format(c=cols), (jend,))
+            DB_Connection.execute("DELETE FROM main.data WHERE Julianday < ?", (jend,))
+
+        cols = ", ".join(commentsColumns)
+        DB_Connection.execute("INSERT INTO part.comments ({c}) SELECT {c} FROM main.comments WHERE cJulianday < ? ORDER BY ROWID".format(c=cols), (jend,))
+        DB_Connection.execute("DELETE FROM main.comments WHERE cJulianday < ?", (jend,))
+        DB_Connection.execute("INSERT INTO part.logcycle SELECT * FROM main.logcycle WHERE NOT EXISTS (SELECT * FROM part.logcycle)")
+
+        pfirst, plast, prows = DB_Connection.execute("SELECT min(Julianday), max(Julianday), count(*) FROM part.data").fetchone()
+        pname = os.path.basename(ppath)
+        DB_Connection.execute("DELETE FROM main.partitions WHERE pname = ?", (pname,))
+        DB_Connection.execute("INSERT INTO main.partitions (pname, pfirst, plast, prows) VALUES (?, ?, ?, ?)", (pname, pfirst, plast, prows))
+        DB_commit(DB_Connection)
+
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        DB_Connection.rollback()
+        DB_Connection.execute("DETACH DATABASE part")
+        DB_dropPartitionFile(ppath, created)
+        return False
+
+    DB_Connection.execute("DETACH DATABASE part")
+    os.chmod(ppath, 0o444)                                  # a finished period is not changed anymore
+
+    DB_closeReaders(DB_Connection)                          # made with the former partitions
+
+    dprint(fncname + "{:n} records into '{}' in {:0.1f} ms".format(prows, ppath, (time.time() - start) * 1000))
+
+    return True
+
+
+def DB_dropPartitionFile(ppath, created):
+    """After a failed move into the partition file ppath: delete it, if it was
+    created for the move, else make it read-only again as it was before"""
+
+    try:
+        if created: os.remove(ppath)
+        else:       os.chmod(ppath, 0o444)
+    except Exception as e:
+        srcinfo = "DB_dropPartitionFile: Exception: '{}'".format(ppath)
+        exceptPrint(e, sys.exc_info(), srcinfo)
+
+
 def DB_insertData(DB_Connection, datalist):
     """Insert many rows of data into the table data"""
 
@@ -223,6 +540,24 @@ def DB_insertData(DB_Connection, datalist):
     DB_commit(DB_Connection)
 
 
+def DB_insertDataJulian(DB_Connection, datalist):
+    """Insert many rows of data into the table data, with the time given
+    directly as Julianday, e.g. from a numpy conversion"""
+
+    fncname = "DB_insertDataJulian: "
+
+    sql = sqlInsertDataJulian
+    wprint(fncname + "SQL:", sql, ", Data: ", datalist[0:10])
+
+    try:
+        DB_Connection.executemany(sql, datalist)
+    except Exception as e:
+        srcinfo = fncname + "Exception:" + sql
+        exceptPrint(e, sys.exc_info(), srcinfo)
+
+    DB_commit(DB_Connection)
+
+
 def DB_insertParse(DB_Connection, datalist):
     """Insert many rows of data into the table parse
     ATTENTION: datalist MUST be a list of lists to 'executemany' !!!"""
@@ -260,15 +595,22 @@ def DB_insertComments(DB_Connection, datalist):
 
 
 def DB_insertBin(DB_Connection, binblob):
-    """Insert a row of data into the table bin - should be the only row!"""
+    """Insert the binary data: as compressed chunks into the table binchunk,
+    see binChunkRows, or, if not bytes, as a row into the table bin - should
+    be the only row!"""
 
     fncname = "DB_insertBin: "
 
     sql = sqlInsertBin
     wprint(fncname + "SQL:", sql, ", Data: ", binblob[0:10])
 
+    histViewCache.pop(DB_Connection, None)
+
     try:
-        DB_Connection.execute(sql, (binblob,))
+        if isinstance(binblob, (bytes, bytearray)):
+            DB_Connection.executemany(sqlInsertBinChunk, binChunkRows(binblob))
+        else:
+            DB_Connection.execute(sql, (binblob,))
     except Exception as e:
         srcinfo = fncname + "Exception: " + sql
         exceptPrint(e, sys.exc_info(), srcinfo)
@@ -293,13 +635,94 @@ def DB_insertDevice(DB_Connection, ddatetime, dname):
     DB_commit(DB_Connection)
 
 
+def DB_insertHistory(DB_Connection, binblob, device, comments, data, parse, cut=None):
+    """Bulk write of a complete history into the tables bin, device, comments,
+    data and parse within a single transaction.
+    device:   (ddatetime, dname)
+    comments: list of lists as for DB_insertComments
+    data:     numpy array with the columns of table data, i.e. dindex,
+              Julianday, CPM, CPS, ...; NAN is stored as NULL
+    parse:    list of lists as for DB_insertParse
+    cut:      for an update of an existing history: bin and device are
+              replaced, and all records, parse lines and comments with a byte
+              index after cut are deleted first, see DB_getHistoryCut
+    Return: number of rows written, or -1 on error"""
+
+    fncname = "DB_insertHistory: "
+
+    start   = time.time()
+    nrows   = 1 + 1 + len(comments) + len(data) + len(parse)
+    wprint(fncname + "Rows: ", nrows, ", Data: ", data[0:10])
+
+    histViewCache.pop(DB_Connection, None)
+
+    # write only the columns holding any data; others remain NULL
+    data    = np.asarray(data, dtype=np.float64)
+    cols    = [0, 1] + [c for c in range(2, data.shape[1]) if not np.isnan(data[:, c]).all()]
+    sql     = sqlInsertDataColumns.format(", ".join(dataColumns[c] for c in cols), ", ".join("?" * len(cols)))
+
+    # the import can simply be repeated on failure, so the safety of
+    # a sync to disk is not needed
+    DB_commit(DB_Connection)
+    sync    = DB_Connection.execute("PRAGMA synchronous").fetchone()[0]
+    cache   = DB_Connection.execute("PRAGMA cache_size").fetchone()[0]
+    DB_Connection.execute("PRAGMA synchronous = OFF")
+    DB_Connection.execute("PRAGMA cache_size = -65536")           # negative: in kiB
+
+    try:
+        if cut is not None:
+            DB_Connection.execute("DELETE FROM bin")
+            DB_Connection.execute("DELETE FROM binchunk")
+            DB_Connection.execute("DELETE FROM device")
+            DB_Connection.execute("DELETE FROM data     WHERE dindex > ?", (cut,))
+            DB_Connection.execute("DELETE FROM parse    WHERE pindex > ?", (cut,))
+            DB_Connection.execute("DELETE FROM comments WHERE typeof(ctype) = 'integer' AND ctype > ?", (cut,))
+        DB_Connection.executemany(sqlInsertBinChunk,   binChunkRows(binblob))
+        DB_Connection.execute    (sqlInsertDevice,     device)
+        DB_Connection.executemany(sqlInsertComments,   comments)
+        DB_Connection.executemany(sql,                 data[:, cols].tolist())
+        DB_Connection.executemany(sqlInsertParse,      parse)
+        DB_Connection.commit()
+    except Exception as e:
+        DB_Connection.rollback()
+        srcinfo = fncname + "Exception: rolled back"
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        nrows   = -1
+
+    DB_Connection.execute("PRAGMA synchronous = {}".format(sync))
+    DB_Connection.execute("PRAGMA cache_size = {}".format(cache))
+
+    duration = time.time() - start
+    vprint(fncname + "{} rows in {:0.3f} sec ({:0.0f} rows/sec)".format(nrows, duration, nrows / max(duration, 1e-6)))
+
+    return nrows
+
+
+def DB_getHistoryCut(DB_Connection):
+    """The last byte index of the binary data with a record, parse line, or
+    comment in the history database; -1 if none. Records are keyed by byte
+    index, so all of a new download after this index are new ones"""
+
+    sql = """
+            SELECT max(i) FROM (
+                SELECT max(dindex) AS i FROM data
+                UNION ALL
+                SELECT max(pindex)      FROM parse
+                UNION ALL
+                SELECT max(ctype)       FROM comments WHERE typeof(ctype) = 'integer'
+            )
+          """
+
+    cut = DB_Connection.execute(sql).fetchone()[0]
+
+    return -1 if cut is None else cut
+
 
 def DB_readData(DB_Connection, sql, limit=0):
     """Read the data from the database data table
     if limit=0, the std sql is called, otherwise the lower or upper LIMIT limit"""
 
-    res     = DB_Connection.execute(sql)
-    rows    = res.fetchall()
+    rows    = DB_fetchall(DB_Connection, sql)
     if limit > 0:    rows   = rows[0:limit] + rows[-limit:]
     #print("rows:", rows)
 
@@ -324,8 +747,7 @@ def DB_readComments(DB_Connection):
             order by julianday asc, rowid asc
             """
 
-    res     = DB_Connection.execute(sql)
-    rows    = res.fetchall()
+    rows    = DB_fetchall(DB_Connection, sql)
     #print("rows:", nrows, "\n", rows)
 
     ddd     = [x[1:2][0] for x in rows] # make a list of only the commentstr
@@ -333,8 +755,61 @@ def DB_readComments(DB_Connection):
     return ddd
 
 
+def binChunkRows(binblob):
+    """The rows of table binchunk for the binary data: per chunk of
+    binChunkSize bytes its index, length, length without trailing FF, count
+    of FF, and the zlib compressed bytes without trailing FF"""
+
+    rows = []
+    for cindex, first in enumerate(range(0, len(binblob), binChunkSize)):
+        chunk   = bytes(binblob[first : first + binChunkSize])
+        notff   = chunk.rstrip(b'\xff')
+        cdata   = zlib.compress(notff, 9) if len(notff) > 0 else b""
+        rows.append((cindex, len(chunk), len(notff), chunk.count(b'\xff'), cdata))
+
+    return rows
+
+
+def DB_readBinChunks(DB_Connection, first=0, last=None):
+    """The decompressed bytes of the chunks first ... last (inclusive; None:
+    to the end) of table binchunk; None if there are no chunks"""
+
+    if last is None: last = 2**31
+    rows = DB_Connection.execute("SELECT clen, cnotff, cdata FROM binchunk WHERE cindex BETWEEN ? AND ? ORDER BY cindex", (first, last)).fetchall()
+    if len(rows) == 0: return None
+
+    return b"".join((zlib.decompress(cdata) if cnotff > 0 else b"") + b'\xff' * (clen - cnotff) for clen, cnotff, cdata in rows)
+
+
+def DB_readBinRange(DB_Connection, first, last):
+    """The bytes first ... last - 1 of the binary data, decompressing only
+    the chunks needed"""
+
+    data = DB_readBinChunks(DB_Connection, first // binChunkSize, (last - 1) // binChunkSize)
+    if data is None: return DB_readBinblob(DB_Connection)[first:last]
+
+    offset = first // binChunkSize * binChunkSize
+
+    return data[first - offset : last - offset]
+
+
+def DB_getBinSummary(DB_Connection):
+    """(total length, count of FF, length without trailing FF) of the binary
+    data from table binchunk, without decompressing; None if no chunks"""
+
+    sql = "SELECT count(*), sum(clen), sum(cff), max(CASE WHEN cnotff > 0 THEN cindex * {} + cnotff ELSE 0 END) FROM binchunk".format(binChunkSize)
+    nchunks, size, countFF, sizeRC = DB_Connection.execute(sql).fetchone()
+    if nchunks == 0: return None
+
+    return size, countFF, sizeRC
+
+
 def DB_readBinblob(DB_Connection):
-    """Read the data from the database table bin"""
+    """Read the binary data from the database table binchunk, or else from
+    table bin"""
+
+    blob = DB_readBinChunks(DB_Connection)
+    if blob is not None: return blob
 
     sql = """
             select
@@ -350,6 +825,138 @@ def DB_readBinblob(DB_Connection):
         return blob[0]
 
 
+class HistView:
+    """The binary history data of a database, decoded once into a numpy
+    uint8 array with the summaries needed by the history views. The text of
+    the views is created on request only, for the pages to be shown.
+    Made with blob None the data are read from the compressed chunks of
+    DB_Connection, the summaries from their table only, and the bytes of a
+    page only when needed, see DB_readBinRange"""
+
+    lenPage     = 1024                  # bytes per page of the LST view, and per line of the FF map
+    lenChunk    = 16                    # bytes per character of the FF map
+
+    # value as printed in the LST view, e.g. 'ff=255' for all 256 values
+    valueText   = ["{:02x}={:<3d}".format(v, v) for v in range(256)]
+    itemFormat  = "%04x=%-5d:%s"
+    lineFormat  = "|".join([itemFormat] * 4)
+
+    def __init__(self, blob, DB_Connection=None):
+
+        self.conn       = DB_Connection
+        self._data      = None
+        self._chunkFF   = None
+
+        if blob is None:
+            self.size, self.countFF, self.sizeRC = DB_getBinSummary(DB_Connection)
+        else:
+            self._data      = np.frombuffer(blob, dtype=np.uint8)
+            self.size       = self._data.size                           # total length
+            isFF            = self._data == 0xFF
+            self.countFF    = int(np.count_nonzero(isFF))               # total count of FF bytes
+            notFF           = np.flatnonzero(~isFF)
+            self.sizeRC     = int(notFF[-1]) + 1 if notFF.size else 0   # length after right-clip of trailing FF
+
+        self.pages      = (self.sizeRC + self.lenPage - 1) // self.lenPage
+
+
+    @property
+    def data(self):
+        """all bytes as numpy uint8 array"""
+
+        if self._data is None:
+            self._data = np.frombuffer(DB_readBinblob(self.conn), dtype=np.uint8)
+
+        return self._data
+
+
+    @property
+    def chunkFF(self):
+        """FF map: per chunk True if the chunk has any FF"""
+
+        if self._chunkFF is None:
+            nchunks         = (self.size + self.lenChunk - 1) // self.lenChunk
+            padded          = np.zeros(nchunks * self.lenChunk, dtype=bool)
+            padded[:self.size] = self.data == 0xFF
+            self._chunkFF   = padded.reshape(nchunks, self.lenChunk).any(axis=1)
+
+        return self._chunkFF
+
+
+    def values(self, first, last):
+        """the bytes first ... last - 1 as list of int"""
+
+        if self._data is None: return list(DB_readBinRange(self.conn, first, last))
+
+        return self._data[first:last].tolist()
+
+
+    def lstPage(self, page):
+        """lines of the LST view for page (of lenPage bytes) of the right-clipped data"""
+
+        first   = page * self.lenPage
+        last    = min(first + self.lenPage, self.sizeRC)
+        values  = [self.valueText[v] for v in self.values(first, last)]
+        items   = [v for a, i in zip(range(first, last), range(len(values))) for v in (a, a, values[i])]
+
+        # one format per line of 4 items; last line may be shorter
+        nfull   = (last - first) // 4
+        lines   = [self.lineFormat % tuple(items[i * 12 : i * 12 + 12]) for i in range(nfull)]
+        rest    = (last - first) % 4
+        if rest: lines.append("|".join([self.itemFormat] * rest) % tuple(items[nfull * 12:]))
+
+        lines.append("Reading Page {} of size {} bytes complete; next address: 0x{:04x}={:5d} {}".format(first / self.lenPage, self.lenPage, first + self.lenPage, first + self.lenPage, "-" * 6))
+        if last % 4096 == 0:
+            lines.append("Reading Page {} of size {} Bytes complete {}".format(first / 4096, 4096, "-" * 35))
+
+        return lines
+
+
+    def lstTrailer(self):
+        """last line of the LST view"""
+
+        if self.sizeRC < self.size:
+            return "Remaining {} Bytes to the end of history (size:{}) are all ff".format(self.size - self.sizeRC, self.size)
+        else:
+            return "End of history reached"
+
+
+    def ffMapLines(self, first=0, last=None):
+        """lines first ... last of the FF map, one line per lenPage bytes"""
+
+        perline = self.lenPage // self.lenChunk
+        nlines  = (self.size + self.lenPage - 1) // self.lenPage
+        if last is None or last > nlines: last = nlines
+
+        marks   = np.where(self.chunkFF, ord("X"), ord(".")).astype(np.uint8).tobytes().decode()
+        lines   = []
+        for i in range(first, last):
+            lines.append("{:7d}|".format(i * self.lenPage) + marks[i * perline : (i + 1) * perline])
+
+        return lines
+
+
+# the decoded history per database connection, see getHistView
+histViewCache = {}
+
+
+def getHistView(DB_Connection):
+    """Return the HistView of the bin blob of the database, decoding it only
+    on the first call; None if there is no binary data"""
+
+    if DB_Connection not in histViewCache:
+        start = time.time()
+        if DB_getBinSummary(DB_Connection) is not None:             # compressed chunks, read as needed
+            histViewCache[DB_Connection] = HistView(None, DB_Connection)
+        else:
+            blob = DB_readBinblob(DB_Connection)
+            if blob is None: return None
+            histViewCache[DB_Connection] = HistView(blob)
+        vprint("getHistView: {} bytes decoded in {:0.1f} ms".format(histViewCache[DB_Connection].size, (time.time() - start) * 1000))
+
+    return histViewCache[DB_Connection]
+
+
 def DB_readParse(DB_Connection):
     """Read the data from the database table parse"""
 
@@ -386,6 +993,37 @@ def DB_readDevice(DB_Connection):
     return rows
 
 
+def DB_readLogPadLines(DB_Connection, julian, limit, varchecked):
+    """Read the latest limit records and comments before julian, formatted as
+    lines of the LogPad. Return: list of (julian, text), oldest first.
+    Records are taken in descending ROWID, as logging adds them in time order;
+    this reads only the records after the ones returned. With partitions read
+    in groups, each group gives up to limit rows, merged here by time"""
+
+    fncname = "DB_readLogPadLines: "
+
+    sqldata     = "SELECT Julianday, dindex, datetime(Julianday), {} FROM data WHERE Julianday < ? ORDER BY ROWID DESC LIMIT ?".format(", ".join(gglobs.varnames))
+    sqlcomments = "SELECT cJulianday, ctype, datetime(cJulianday), cinfo FROM comments WHERE cJulianday < ? ORDER BY cJulianday DESC LIMIT ?"
+
+    lines = []
+    try:
+        for row in DB_fetchall(DB_Connection, sqldata, (julian, limit), merged=True):
+            values = {vname: (np.nan if v is None else v) for vname, v in zip(gglobs.varnames, row[3:])}
+            lines.append((row[0], formatLogPadLine(row[1] or 0, row[2], values, varchecked)))
+
+        for row in DB_fetchall(DB_Connection, sqlcomments, (julian, limit), merged=True):
+            lines.append((row[0], "#{}, {}, {}".format(row[1], row[2], str(row[3]).replace("\n", " "))))
+
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        return []
+
+    lines.sort(key=lambda line: line[0])
+
+    return lines[-limit:]
+
+
 def DB_readLogcycle(DB_Connection):
     """Read the data from the database table logcycle"""
 
@@ -438,6 +1076,256 @@ def DB_updateLogcycle(DB_Connection, value):
     DB_commit(DB_Connection)
 
 
+def DB_createTiming(DB_Connection):
+    """Create the table timing if not existing; it is optional and therefore
+    not part of sqlCreate"""
+
+    fncname = "DB_createTiming: "
+
+    try:
+        DB_Connection.execute(sqlCreateTiming)
+        vprint(fncname + "done")
+    except Exception as e:
+        srcinfo = fncname + "Exception: " + sqlCreateTiming
+        exceptPrint(e, sys.exc_info(), srcinfo)
+
+    DB_commit(DB_Connection)
+
+
+def DB_insertTiming(DB_Connection, datalist):
+    """Insert many rows of stage durations into the table timing
+    ATTENTION: datalist MUST be a list of lists to 'executemany' !!!"""
+
+    fncname = "DB_insertTiming: "
+
+    sql = sqlInsertTiming
+    wprint(fncname + "SQL:", sql, ", Data: ", datalist[0:10])
+
+    try:
+        DB_Connection.executemany(sql, datalist)
+    except Exception as e:
+        srcinfo = fncname + "Exception: " + sql
+        exceptPrint(e, sys.exc_info(), srcinfo)
+
+    DB_commit(DB_Connection)
+
+
+def DB_isCompact(DB_Connection):
+    """True if the database has the compact data table, see DB_createCompact"""
+
+    res = DB_Connection.execute("SELECT count(*) FROM main.sqlite_master WHERE type='table' AND name='datac'")
+    return res.fetchone()[0] > 0
+
+
+def DB_createCompact(DB_Connection, vnames):
+    """Make the compact data table datac having the columns of the variables
+    vnames, or add any missing ones if it exists already. 'data' becomes a
+    view on datac with all the columns of the standard table, and a trigger
+    makes inserts into data go into datac, so reading and writing need no
+    change. Works only on a database with an empty standard data table.
+    Return: True if the database has the compact data table"""
+
+    fncname = "DB_createCompact: "
+
+    try:
+        if DB_isCompact(DB_Connection):
+            res  = DB_Connection.execute("PRAGMA main.table_info(datac)")
+            have = [row[1] for row in res.fetchall()]
+            for vname in vnames:
+                if vname not in have:
+                    DB_Connection.execute("ALTER TABLE main.datac ADD COLUMN {} {}".format(vname, compactTypes[vname]))
+                    have.append(vname)
+                    vprint(fncname + "added column ", vname)
+        else:
+            if DB_Connection.execute("SELECT count(*) FROM main.data").fetchone()[0] > 0:
+                wprint(fncname + "standard data table is not empty; not changed")
+                return False
+
+            have = ["tms", "dindex"] + [vname for vname in gglobs.varnames if vname in vnames]
+            DB_Connection.execute("DROP TABLE main.data")
+            DB_Connection.execute(sqlCreateCompact.format(",\n".join("          {} {}".format(vname, compactTypes[vname]) for vname in have)))
+            vprint(fncname + "created with columns: ", have)
+
+        # remake view and trigger to match the columns
+        columns = [vname for vname in gglobs.varnames if vname in have]
+        DB_Connection.execute("DROP VIEW IF EXISTS main.data")
+        DB_Connection.execute("DROP TRIGGER IF EXISTS main.data_insert")
+        DB_Connection.execute(sqlCreateCompactView.format(", ".join(vname if vname in have else "NULL AS " + vname for vname in gglobs.varnames)))
+        DB_Connection.execute(sqlCreateCompactTrigger.format(cols="".join(", " + vname for vname in columns), news="".join(", NEW." + vname for vname in columns)))
+
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        DB_Connection.rollback()
+        return False
+
+    DB_commit(DB_Connection)
+
+    return True
+
+
+def DB_convertToCompact(DB_SrcPath, DB_DstPath):
+    """Copy the database at DB_SrcPath into a new database at DB_DstPath with
+    the compact data table holding the variables found in the source. An
+    existing file at DB_DstPath is overwritten. The records and comments of
+    the partition files of the source, see DB_rollPartitions, are copied as
+    well, so the new file holds all of them and has no partitions. The rollup
+    tables are not copied; they are rebuilt when the new file is loaded.
+    Return: (records read, records written), or None on error"""
+
+    fncname = "DB_convertToCompact: "
+
+    dprint(fncname + "from '{}' to '{}'".format(DB_SrcPath, DB_DstPath))
+    setDebugIndent(1)
+
+    start = time.time()
+    if os.path.isfile(DB_DstPath): os.remove(DB_DstPath)
+    conn  = sqlite3.connect(DB_DstPath, isolation_level="EXCLUSIVE")
+    DB_createStructure(conn)
+
+    try:
+        srcconn  = sqlite3.connect(DB_SrcPath)
+        try:     srcpaths = DB_getPartitions(srcconn) + [DB_SrcPath]    # oldest first
+        finally: srcconn.close()
+
+        # the variables having values in any of the files
+        counts  = [0] * (len(gglobs.varnames) + 1)
+        for path in srcpaths:
+            conn.execute("ATTACH DATABASE ? AS src", (path,))
+            row     = conn.execute("SELECT count(*), {} FROM src.data".format(", ".join("count({})".format(vname) for vname in gglobs.varnames))).fetchone()
+            counts  = [c + r for c, r in zip(counts, row)]
+            conn.execute("DETACH DATABASE src")
+        vnames  = [vname for i, vname in enumerate(gglobs.varnames) if counts[i + 1] > 0]
+
+        if not DB_createCompact(conn, vnames): raise Exception("cannot create compact data table")
+
+        # duplicates of (time, index) cannot be stored and are dropped
+        cols    = "".join(", " + vname for vname in vnames)
+        for path in srcpaths[:-1]:
+            conn.execute("ATTACH DATABASE ? AS src", (path,))
+            conn.execute(sqlCopyToCompact.format(cols=cols))
+            conn.execute("INSERT INTO main.comments SELECT * FROM src.comments")
+            conn.commit()
+            conn.execute("DETACH DATABASE src")
+
+        conn.execute("ATTACH DATABASE ? AS src", (DB_SrcPath,))
+        conn.execute(sqlCopyToCompact.format(cols=cols))
+
+        srctables = [row[0] for row in conn.execute("SELECT name FROM src.sqlite_master WHERE type='table'").fetchall()]
+        if "timing" in srctables: conn.execute(sqlCreateTiming)
+        for table in ("comments", "parse", "bin", "binchunk", "device", "logcycle", "timing"):
+            if table in srctables:
+                conn.execute("INSERT INTO main.{0} SELECT * FROM src.{0}".format(table))
+
+        nout    = conn.execute("SELECT count(*) FROM main.datac").fetchone()[0]
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        conn.close()
+        setDebugIndent(0)
+        return None
+
+    conn.close()
+    vprint(fncname + "{} of {} records in {:0.2f} sec".format(nout, counts[0], time.time() - start))
+    setDebugIndent(0)
+
+    return counts[0], nout
+
+
+def DB_updateRollups(DB_Connection):
+    """Add all records of table data not yet included to the rollup tables.
+    Works incrementally from the last ROWID done, so it serves the write
+    path as well as the first build for an existing file. Returns the number
+    of new records, or -1 if the file has no rollup tables (e.g. read-only)"""
+
+    fncname = "DB_updateRollups: "
+
+    try:
+        lastrowid = DB_Connection.execute("SELECT lastrowid FROM rollup_state").fetchone()
+        maxrowid  = DB_Connection.execute("SELECT max(ROWID) FROM data").fetchone()[0]
+    except Exception as e:
+        wprint(fncname + "no rollup tables: ", e)
+        return -1
+
+    lastrowid = 0 if lastrowid is None else lastrowid[0]
+    if maxrowid is None or maxrowid <= lastrowid: return 0
+
+    start = time.time()
+    try:
+        # the finest level from the new records, the coarser ones by
+        # recomputing their affected buckets from the next finer level
+        level, N = rollupLevels[0]
+        DB_Connection.execute(sqlUpdateRollup.format(level=level, N=N), (lastrowid, maxrowid))
+
+        jmin = DB_Connection.execute("SELECT min(Julianday) FROM data WHERE ROWID > ? AND ROWID <= ?", (lastrowid, maxrowid)).fetchone()[0]
+        if jmin is not None:
+            for (finer, Nfiner), (level, N) in zip(rollupLevels[:-1], rollupLevels[1:]):
+                factor = Nfiner // N
+                bmin   = int((jmin + 0.5) * N) * factor
+                DB_Connection.execute(sqlRollupCoarser.format(level=level, finer=finer, factor=factor), (bmin,))
+        DB_Connection.execute("DELETE FROM rollup_state")
+        DB_Connection.execute("INSERT INTO rollup_state (lastrowid) VALUES (?)", (maxrowid,))
+    except Exception as e:
+        srcinfo = fncname + "Exception: "
+        exceptPrint(e, sys.exc_info(), srcinfo)
+        DB_Connection.rollback()
+        return -1
+
+    DB_commit(DB_Connection)
+
+    wprint(fncname + "{} records added in {:0.1f} ms".format(maxrowid - lastrowid, (time.time() - start) * 1000))
+
+    return maxrowid - lastrowid
+
+
+def DB_getRollupInfo(DB_Connection):
+    """Return (number of records, first Julianday, last Julianday) as known
+    by the rollups, or None if there are no rollups"""
+
+    try:
+        nrec, bmin, bmax = DB_Connection.execute("SELECT sum(nrec), min(bucket), max(bucket) FROM rollup_minute").fetchone()
+    except Exception as e:
+        return None
+
+    if nrec is None: return None
+
+    N = dict(rollupLevels)["minute"]
+    return nrec, bmin / N - 0.5, (bmax + 1) / N - 0.5
+
+
+def DB_readRollup(DB_Connection, level):
+    """Read the rollup table of level ('minute', 'hour', 'day').
+    Return (dataArray, aggregates): dataArray has the layout of the raw data
+    as read in getDataFromDatabase, i.e. time in matplotlib days at the center
+    of each bucket, followed by the means of all variables (NAN if no value);
+    aggregates[vname] is an array with columns count, sum, min, max, sum of
+    squares, one row per bucket"""
+
+    N       = dict(rollupLevels)[level]
+    cols    = []
+    for vname in gglobs.varnames:
+        cols.append("{v}_sum / {v}_n".format(v=vname))
+    for vname in gglobs.varnames:
+        cols.extend(["{}_{}".format(vname, a) for a in rollupAggregates])
+
+    sql     = "SELECT (bucket + 0.5) / {N}.0 - 0.5 - {J}, {cols} FROM rollup_{level} ORDER BY bucket"\
+                                                .format(N=N, J=gglobs.JULIAN111, cols=", ".join(cols), level=level)
+    rows    = DB_Connection.execute(sql).fetchall()
+    allcols = np.array(rows, dtype=np.float64).reshape(len(rows), 1 + 6 * len(gglobs.varnames)) # None -> NAN
+
+    ncols       = gglobs.datacolsDefault
+    dataArray   = allcols[:, :ncols]
+    aggregates  = {}
+    for i, vname in enumerate(gglobs.varnames):
+        k = ncols + i * len(rollupAggregates)
+        aggregates[vname] = allcols[:, k : k + len(rollupAggregates)]
+
+    return dataArray, aggregates
+
+
 def createFFmapFromDB():
     """Read data from table bin as blob and print map of FFs into notePad"""
 
@@ -450,41 +1338,26 @@ def createFFmapFromDB():
     fprint(header("Show History Binary Data as FF Map"))
     fprint("from: {}\n".format(gglobs.hisDBPath))
 
-    hist    = DB_readBinblob(gglobs.hisConn)
-    #print("createFFmapFromDB: hist:", hist)
-    if hist == None:
+    hv      = getHistView(gglobs.hisConn)
+    if hv == None:
         fprint("No binary data found in this database", error=True)
         return
 
     gglobs.exgg.setBusyCursor()
 
-    lenLine   = 1024
-    lenChunk  = 16
-    lenHist   = len(hist)
-    markline  = "Occurence of 0xFF values in History binary data is marked with 'X'\n"
-    lstlines  = markline
-    lstlines += "1 printed character maps a chunk of 16 bytes of data\n"
-    lstlines += "Byte No|" + "_______|" * 8 + "\n"
-    counter   = 0
-    batch     = 100
-    for i in range(0, lenHist, lenLine):
-        if counter == batch:
-            fprint(lstlines[:-1])
-            lstlines = ""
-            counter  = 0
-
-        lstline ="{:7d}|".format(i)
-        for j in range(0, lenLine, lenChunk):
-            l = i + j
-            if l >= lenHist: break
-            if 255 in hist[l:l + lenChunk]:  s = "X"
-            else:                            s = "."
-            lstline += s
-
-        lstlines += lstline + "\n"
-        counter  += 1
-
-    fprint(lstlines)
+    fprint("Occurence of 0xFF values in History binary data is marked with 'X'")
+    fprint("1 printed character maps a chunk of {} bytes of data".format(hv.lenChunk))
+    fprint("Byte No|" + "_______|" * 8)
+
+    batch   = 100
+    nlines  = (hv.size + hv.lenPage - 1) // hv.lenPage
+    gglobs.stopPrinting = False
+    for i in range(0, nlines, batch):
+        fprint("\n".join(hv.ffMapLines(i, i + batch)))
+        if gglobs.stopPrinting: break
+    gglobs.stopPrinting = False
+    fprint("")
+
     vprint("timing 16b per char chunks: {:7.2f}ms".format((time.time() -start)*1000))
 
     gglobs.exgg.setNormalCursor()
@@ -582,55 +1455,47 @@ def createLstFromDB(*args, lmax=12, full=True):
     fprint(header("Show History Binary Data in Human Readable Form" + addh))
     fprint("from: {}\n".format(gglobs.hisDBPath))
 
-    hist    = DB_readBinblob(gglobs.hisConn)
-    #print("createLstFromDB: hist:", hist)
-    if hist == None:
+    hv      = getHistView(gglobs.hisConn)
+    if hv == None:
         fprint("No binary data found in this database", error=True)
         return
 
     gglobs.exgg.setBusyCursor()
 
-    histlen     = len(hist)                  # Total length; could be any length e.g. when read from file
-    histRC      = hist.rstrip(b'\xFF')       # after right-clip FF (removal of all trailing 0xff)
-    histRClen   = len(histRC)                # total byte count
-    ppagesize   = 1024                          # for the breaks in printing
     data_origin = "Download Date: {} from device {}".format(* DB_readDevice(gglobs.hisConn))
 
     # header
-    lstlines    = "#History Download - Binary Data in Human-Readable Form\n"
-    lstlines   += "#{}\n".format(data_origin)
-    lstlines   += "#Format: bytes_index[hex]=bytes_index[dec] : value[hex]=value[dec] |\n"
+    lsthead     = ["#History Download - Binary Data in Human-Readable Form",
+                   "#{}".format(data_origin),
+                   "#Format: bytes_index[hex]=bytes_index[dec] : value[hex]=value[dec] |"]
 
     # This takes the full hist data clipped for FF, independent of the
     # memory setting of the currently selected counter
-    for i in range(0, histRClen, ppagesize):
-        for j in range(0, ppagesize, 4):
-            lstline =""
-            for k in range(0, 4):
-                if j + k >= ppagesize:   break
-                l  = i + j + k
-                if l >= histRClen:       break
-                lstline += "{:04x}={:<5d}:{:02x}={:<3d}|".format(l, l, histRC[l], histRC[l])
-            lstlines += lstline[:-1] + "\n"
-            if l >= histRClen:           break
-
-        lstlines += "Reading Page {} of size {} bytes complete; next address: 0x{:04x}={:5d} {}\n".format(i/ppagesize, ppagesize, i+ppagesize, i+ppagesize, "-" * 6)
-        #print "(l +1)", (l+1), "(l +1) % 4096", (l+1) % 4096
-        if (l + 1) % 4096 == 0 :
-            lstlines += "Reading Page {} of size {} Bytes complete {}\n".format(i/4096, 4096, "-" * 35)
-        if l >= histRClen:               break
-
-    if histRClen < histlen:
-        lstlines += "Remaining {} Bytes to the end of history (size:{}) are all ff\n".format(histlen -histRClen, histlen)
-    else:
-        lstlines += "End of history reached\n"
-
-    if full:        fprint(lstlines)
-    else: #excerpt only
-        listlstlines = lstlines.split('\n')[:-1]
-        for a in listlstlines[:+lmax]: fprint(a)
+    if full:
+        fprint("\n".join(lsthead))
+        gglobs.stopPrinting = False
+        for page in range(hv.pages):
+            fprint("\n".join(hv.lstPage(page)))
+            if gglobs.stopPrinting: break
+        gglobs.stopPrinting = False
+        fprint(hv.lstTrailer())
+
+    else: #excerpt only; make the lines of only as many pages as needed
+        head = lsthead[:]
+        page = 0
+        while len(head) < lmax and page < hv.pages:
+            head += hv.lstPage(page)
+            page += 1
+
+        tail = [hv.lstTrailer()]
+        last = hv.pages - 1
+        while len(tail) < lmax and last >= 0:
+            tail  = hv.lstPage(last) + tail
+            last -= 1
+
+        for a in head[:+lmax]: fprint(a)
         fprint('...')
-        for a in listlstlines[-lmax:]: fprint(a)
+        for a in tail[-lmax:]: fprint(a)
     fprint("")
 
     gglobs.exgg.setNormalCursor()
@@ -853,10 +1718,16 @@ sqlGetLogUnionAsString =   """
 # NOTE: when the argument to julianday is already julianday, sqlite does not change it!
 #sqlInsertData       = """INSERT INTO data       (dindex, Julianday, cpm, cps, cpm1st, cps1st, cpm2nd, cps2nd, t, p, h, r) VALUES (?,julianday(?,?),?,?,?,?,?,?,?,?,?,?)"""
 sqlInsertData       = """INSERT INTO data       (dindex, Julianday, cpm, cps, cpm1st, cps1st, cpm2nd, cps2nd, cpm3rd, cps3rd, t, p, h, x) VALUES (?,julianday(?,?),?,?,?,?,?,?,?,?,?,?,?,?)"""
+sqlInsertDataJulian = """INSERT INTO data       (dindex, Julianday, cpm, cps, cpm1st, cps1st, cpm2nd, cps2nd, cpm3rd, cps3rd, t, p, h, x) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"""
+sqlInsertDataColumns= """INSERT INTO data       ({}) VALUES ({})"""
+dataColumns         = ("dindex", "Julianday", "cpm", "cps", "cpm1st", "cps1st", "cpm2nd", "cps2nd", "cpm3rd", "cps3rd", "t", "p", "h", "x")
+commentsColumns     = ("ctype", "cJulianday", "cinfo")
 sqlInsertComments   = """INSERT INTO comments   (ctype, cJulianday, cinfo)  VALUES (?, julianday(?, ?), ?)"""
 sqlInsertParse      = """INSERT INTO parse      (pindex, pinfo)             VALUES (?, ?)"""
 sqlInsertDevice     = """INSERT INTO device     (ddatetime, dname)          VALUES (?, ?)"""
 sqlInsertBin        = """INSERT INTO bin        (bblob)                     VALUES (?)"""
+sqlInsertBinChunk   = """INSERT INTO binchunk   (cindex, clen, cnotff, cff, cdata) VALUES (?, ?, ?, ?, ?)"""
+sqlInsertTiming     = """INSERT INTO timing     (tindex, Julianday, stage, duration, overrun) VALUES (?, julianday(?, ?), ?, ?, ?)"""
 
 
 # assemble all the commands needed to make the database structure as a list,
@@ -916,6 +1787,24 @@ sqlCreate.append('''
              )
         ''')
 
+# make table binchunk
+# storing the binary data as chunks of binChunkSize bytes (a flash page),
+# each zlib compressed without its trailing FF, see binChunkRows; a chunk of
+# only FF has an empty cdata. cnotff is the length without trailing FF, cff
+# the count of FF, which give the summaries without decompressing
+binChunkSize = 4096
+
+sqlCreate.append('''
+        CREATE TABLE binchunk
+             (
+              cindex    INTEGER PRIMARY KEY,
+              clen      INTEGER,
+              cnotff    INTEGER,
+              cff       INTEGER,
+              cdata     BLOB
+             )
+        ''')
+
 # make table device
 # storing the device name and the download datetime string
 sqlCreate.append('''
@@ -935,6 +1824,138 @@ sqlCreate.append('''
          )
     ''')
 
+# make table timing (optional, see DB_createTiming)
+# storing the duration in ms of each stage of a logging cycle
+sqlCreateTiming = '''
+    CREATE TABLE IF NOT EXISTS timing
+         (
+          tindex     INTEGER,
+          Julianday  REAL,
+          stage      TEXT,
+          duration   REAL,
+          overrun    INTEGER
+         )
+    '''
+
+# make table partitions (only with gglobs.logPartition, see DB_rollPartitions)
+# storing the name, the first and last Julianday, and the number of records of
+# the partition files, which are in the folder of the database file
+sqlCreatePartitions = '''
+    CREATE TABLE IF NOT EXISTS main.partitions
+         (
+          pname      TEXT,
+          pfirst     REAL,
+          plast      REAL,
+          prows      INTEGER
+         )
+    '''
+
+# the strftime format of the partition file names, the start of a period,
+# and the step to the next period for the julianday() modifiers
+partitionPeriods = {
+                    "daily"   : ("%Y-%m-%d", "start of day",   "+1 day"),
+                    "monthly" : ("%Y-%m",    "start of month", "+1 month"),
+                    "yearly"  : ("%Y",       "start of year",  "+1 year"),
+                   }
+
+# make the compact data table (optional, see DB_createCompact)
+# the time as integer ms since 1970-01-01 of the same local time as Julianday
+# of table data; only the columns of variables logged; counts as integers.
+# The key is (tms, dindex), as different records may have the same time; a
+# missing dindex is stored as 0
+compactTypes = {"tms": "INTEGER", "dindex": "INTEGER"}
+compactTypes.update({vname: ("INTEGER" if vname.startswith("CP") else "REAL") for vname in gglobs.varnames})
+
+sqlCreateCompact = """
+    CREATE TABLE main.datac
+         (
+{},
+          PRIMARY KEY (tms, dindex)
+         ) WITHOUT ROWID
+    """
+
+# Julianday 2440587.5 is 1970-01-01 00:00:00; tms is also given as ROWID to
+# allow the range selections made on the standard data table
+sqlCreateCompactView = """
+    CREATE VIEW main.data AS
+        SELECT tms AS ROWID, dindex, tms / 86400000.0 + 2440587.5 AS Julianday, {}
+        FROM datac
+    """
+
+sqlCreateCompactTrigger = """
+    CREATE TRIGGER main.data_insert INSTEAD OF INSERT ON data
+    BEGIN
+        INSERT INTO datac (tms, dindex{cols})
+            VALUES (CAST(round((NEW.Julianday - 2440587.5) * 86400000) AS INTEGER), ifnull(NEW.dindex, 0){news});
+    END
+    """
+
+sqlCopyToCompact = """
+    INSERT OR IGNORE INTO main.datac (tms, dindex{cols})
+        SELECT CAST(round((Julianday - 2440587.5) * 86400000) AS INTEGER), ifnull(dindex, 0){cols}
+        FROM src.data
+        WHERE Julianday IS NOT NULL
+    """
+
+# make the rollup tables: per minute, hour, day, per variable the count,
+# sum, min, max, sum of squares of the values; nrec is the number of records.
+# bucket = integer part of (Julianday + 0.5) * N, with N buckets per day; the
+# +0.5 shifts the Julianday start from noon to midnight
+rollupLevels        = (("minute", 1440), ("hour", 24), ("day", 1))
+rollupAggregates    = ("n", "sum", "min", "max", "sq")
+
+for level, N in rollupLevels:
+    cols = ",\n".join("          {}_n INTEGER, {v}_sum REAL, {v}_min REAL, {v}_max REAL, {v}_sq REAL".format(vname, v=vname) for vname in gglobs.varnames)
+    sqlCreate.append('''
+    CREATE TABLE rollup_{}
+         (
+          bucket     INTEGER PRIMARY KEY,
+          nrec       INTEGER,
+{}
+         )
+    '''.format(level, cols))
+
+# make table rollup_state
+# storing the last ROWID of table data which is included in the rollups
+sqlCreate.append('''
+    CREATE TABLE rollup_state
+         (
+          lastrowid  INTEGER
+         )
+    ''')
+
+# the upsert of the records with lastrowid < ROWID <= maxrowid into the
+# rollup table of level with N buckets per day; NULL values are not counted
+sqlUpdateRollup = """
+    INSERT INTO rollup_{{level}} (bucket, nrec, {cols})
+        SELECT CAST((Julianday + 0.5) * {{N}} AS INTEGER) AS b, count(*), {selects}
+        FROM data
+        WHERE ROWID > ? AND ROWID <= ? AND Julianday IS NOT NULL
+        GROUP BY b
+    ON CONFLICT(bucket) DO UPDATE SET nrec = nrec + excluded.nrec, {updates}
+    """.format(
+        cols    = ", ".join("{v}_n, {v}_sum, {v}_min, {v}_max, {v}_sq"                          .format(v=v) for v in gglobs.varnames),
+        selects = ", ".join("count({v}), sum({v}), min({v}), max({v}), sum({v} * {v})"          .format(v=v) for v in gglobs.varnames),
+        updates = ", ".join(("{v}_n = {v}_n + excluded.{v}_n, "
+                             "{v}_sum = ifnull({v}_sum + excluded.{v}_sum, ifnull({v}_sum, excluded.{v}_sum)), "
+                             "{v}_min = min(ifnull({v}_min, excluded.{v}_min), ifnull(excluded.{v}_min, {v}_min)), "
+                             "{v}_max = max(ifnull({v}_max, excluded.{v}_max), ifnull(excluded.{v}_max, {v}_max)), "
+                             "{v}_sq  = ifnull({v}_sq + excluded.{v}_sq, ifnull({v}_sq, excluded.{v}_sq))")     .format(v=v) for v in gglobs.varnames),
+    )
+
+# recompute the buckets of the coarser rollup table of level from the finer
+# one, starting with bucket bmin of the finer table; factor = buckets per bucket
+sqlRollupCoarser = """
+    INSERT OR REPLACE INTO rollup_{{level}} (bucket, nrec, {cols})
+        SELECT bucket / {{factor}} AS b, sum(nrec), {selects}
+        FROM rollup_{{finer}}
+        WHERE bucket >= ?
+        GROUP BY b
+    """.format(
+        cols    = ", ".join("{v}_n, {v}_sum, {v}_min, {v}_max, {v}_sq"                          .format(v=v) for v in gglobs.varnames),
+        selects = ", ".join("sum({v}_n), sum({v}_sum), min({v}_min), max({v}_max), sum({v}_sq)" .format(v=v) for v in gglobs.varnames),
+    )
+
 sqlCreate.append("""CREATE VIEW ViewData     AS Select ROWID, Datetime(Julianday),  * from data     order by  Julianday, dindex""")
 sqlCreate.append("""CREATE VIEW ViewComments AS Select ROWID, Datetime(cJulianday), * from comments order by cJulianday, ctype """)
 sqlCreate.append("""CREATE VIEW ViewUnion    AS {}""".format(sqlGetLogUnionAsString))
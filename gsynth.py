@@ -30,8 +30,30 @@ __copyright__       = "Copyright 2016, 2017, 2018, 2019, 2020"
 __credits__         = [""]
 __license__         = "GPL3"
 
+import gglobs
+if __name__ == '__main__':
+    gglobs.headless = True                  # command line use without GUI; set BEFORE importing gutils!
+
 from   gutils       import *
 
+import gsql
+
+
+# realistic defaults for all variables; counters are Poisson with this mean,
+# T, P, H, X vary around it with daily or slower periods plus noise
+synthMeans  = { "CPM"    : 20,
+                "CPS"    : 0.33,
+                "CPM1st" : 20,
+                "CPS1st" : 0.33,
+                "CPM2nd" : 200,
+                "CPS2nd" : 3.3,
+                "CPM3rd" : 2000,
+                "CPS3rd" : 33,
+                "T"      : 20,       # °C
+                "P"      : 1013,     # hPa
+                "H"      : 50,       # %
+                "X"      : 500,      # Lux at noon
+              }
 
 
 def createSyntheticLog():
@@ -72,11 +94,9 @@ def createSyntheticLog():
 
         # convert time in sec to datetime strings
         strt0 = "2018-01-03 00:00:00"          # nominal default start datetime
-        t0    = mpld.datestr2num(strt0)        # time zero
-        td    = np.empty(records, dtype='U19') # holds strings of max length 19
-        #print("td, len:", td.size, td)
-        for i in range(0, records):
-            td[i] = mpld.num2date(t0 + t[i] / 86400.) # clipped after 19 chars by U19 def
+        t0    = np.datetime64(strt0.replace(" ", "T"), "ms")
+        td    = np.datetime_as_string(t0 + np.int64(np.round(t * 1000)).astype("timedelta64[ms]"), unit="s")
+        td    = np.char.replace(td, "T", " ")
 
     # get data
         sigt, DataSrc     = getWhiteNoisePoisson(records, mean, cycletime, mode)            # White Noise from Poisson Distribution
@@ -109,16 +129,100 @@ def createSyntheticLog():
 
     # write to log file
         path = os.path.join(gglobs.dataPath, DataSrc + ".log")
-        writeFileW(path, "", linefeed = True)
-        writeFileA(path, "#HEADER ," + strt0 + ", SYNTHETIC data: " + DataSrc)
-        writeFileA(path, "#LOGGING," + strt0 + ", Start: cycle {} sec, mode '{}', device 'SYNTHETIC'".format(cycletime, mode))
-        for i in range(records):
-            writestring = " {:7d},{:19s}, {:}".format(i, td[i], sigt[i])
-            writeFileA(path, writestring)
+        with open(path, 'wt', encoding="UTF-8", errors='replace') as f:
+            f.write("#HEADER ," + strt0 + ", SYNTHETIC data: " + DataSrc + "\n")
+            f.write("#LOGGING," + strt0 + ", Start: cycle {} sec, mode '{}', device 'SYNTHETIC'\n".format(cycletime, mode))
+            f.write("".join(" {:7d},{:19s}, {:}\n".format(i, tdi, sigti) for i, tdi, sigti in zip(range(records), td, sigt)))
 
         fprint("Created file: {}\n".format(path))
 
 
+def getSyntheticColumn(vname, mean, tsec):
+    """Synthetic values for variable vname at the times tsec (in sec)"""
+
+    day = 2.0 * np.pi * tsec / 86400.
+
+    if vname.startswith("CP"):
+        x = np.random.poisson(mean, size=tsec.size)
+    elif vname == "T":
+        x = mean + 3.0 * np.sin(day) + np.random.normal(0, 0.1, size=tsec.size)
+    elif vname == "P":
+        x = mean + 5.0 * np.sin(day / 5) + np.random.normal(0, 0.2, size=tsec.size)
+    elif vname == "H":
+        x = np.clip(mean - 10.0 * np.sin(day) + np.random.normal(0, 1.0, size=tsec.size), 0, 100)
+    else: # "X"
+        x = np.clip(mean * np.sin(day - np.pi / 2) + np.random.normal(0, 1.0, size=tsec.size), 0, None)
+
+    return x
+
+
+def getSyntheticChunks(records, cycletime, means, start, chunksize):
+    """Yield synthetic data in chunks of at most chunksize records as tuple
+    (index, datetime64 times, {vname: values}). Memory needed is independent
+    of the number of records"""
+
+    t0   = np.datetime64(start.replace(" ", "T"), "ms")
+    step = np.timedelta64(int(round(cycletime * 1000)), "ms")
+
+    for first in range(0, records, chunksize):
+        index   = np.arange(first, min(first + chunksize, records), dtype=np.int64)
+        times   = t0 + index * step
+        tsec    = index * cycletime
+        columns = {vname: getSyntheticColumn(vname, means[vname], tsec) for vname in means}
+
+        yield index, times, columns
+
+
+def writeSyntheticLog(path, records, cycletime=1.0, means=None, start="2018-01-03 00:00:00", chunksize=100000):
+    """Write synthetic data for the variables in means (default: all) into a
+    CSV log file (.log) or into a database (.logdb), depending on the
+    extension of path. Returns number of records written"""
+
+    fncname = "writeSyntheticLog: "
+
+    if means is None: means = synthMeans
+    DataSrc = "Synthetic data for {} with means {}".format(", ".join(means), ", ".join(str(means[v]) for v in means))
+    dprint(fncname + "{} records, cycle {} sec, into: '{}'".format(records, cycletime, path))
+
+    start_time = time.time()
+    if path.endswith(".logdb"):
+        if os.path.isfile(path): os.remove(path)
+        conn = gsql.DB_openDatabase(None, path)
+        gsql.DB_insertComments(conn, [["HEADER",  start, "0 hours", "SYNTHETIC data: " + DataSrc],
+                                      ["LOGGING", start, "0 hours", "Start: cycle {} sec, device 'SYNTHETIC'".format(cycletime)]])
+        for index, times, columns in getSyntheticChunks(records, cycletime, means, start, chunksize):
+            # the DB keeps local time as Julianday; no timezone conversion
+            julian = times.astype(np.int64) / 86400000. + 2440587.5
+            cols   = [index.tolist(), julian.tolist()]
+            for vname in gglobs.varnames:
+                if vname in columns:    cols.append(columns[vname].tolist())
+                else:                   cols.append([None] * index.size)
+            gsql.DB_insertDataJulian(conn, list(zip(*cols)))
+        gsql.DB_closeDatabase(conn)
+
+    else:
+        # a single buffered handle for the whole file; times with milliseconds
+        # unless the cycle is whole seconds, so that no two records get the
+        # same time
+        unit = "s" if int(round(cycletime * 1000)) % 1000 == 0 else "ms"
+        with open(path, 'wt', encoding="UTF-8", errors='replace') as f:
+            f.write("#HEADER ," + start + ", SYNTHETIC data: " + DataSrc + "\n")
+            f.write("#LOGGING," + start + ", Start: cycle {} sec, device 'SYNTHETIC'\n".format(cycletime))
+            for index, times, columns in getSyntheticChunks(records, cycletime, means, start, chunksize):
+                tstr = np.char.replace(np.datetime_as_string(times, unit=unit), "T", " ")
+                cols = [index.tolist(), tstr.tolist()]
+                for vname in gglobs.varnames:
+                    if   vname not in columns:          cols.append([""] * index.size)
+                    elif vname.startswith("CP"):        cols.append(columns[vname].tolist())
+                    else:                               cols.append(np.char.mod("%0.3f", columns[vname]).tolist())
+                f.write("".join(" {:7d},{:19s}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {}\n".format(*row) for row in zip(*cols)))
+
+    duration = time.time() - start_time
+    dprint(fncname + "{} records written in {:0.1f} sec ({:0.0f} records/sec)".format(records, duration, records / max(duration, 1e-9)))
+
+    return records
+
+
 def getWhiteNoisePoisson(records, mean, cycletime, mode):
     """White noise data drawn from Poisson distribution"""
 
@@ -272,3 +376,31 @@ def getRandomData(records, mean, stddev):
     print(DataSrc, x)
 
     return x, DataSrc
+
+
+def main():
+    """
+    Start with: 'python3 gsynth.py PATH RECORDS [CYCLE [VARS]]' to write
+                RECORDS synthetic records with cycle time CYCLE sec (default: 1)
+                into PATH, either a '.log' or a '.logdb' file. VARS is a comma
+                separated list like 'CPM,T,P' (default: all variables)
+    """
+
+    if len(sys.argv) < 3:
+        print(main.__doc__)
+        return
+
+    path        = sys.argv[1]
+    records     = int(float(sys.argv[2]))
+    cycletime   = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    if len(sys.argv) > 4:   means = {v.strip(): synthMeans[v.strip()] for v in sys.argv[4].split(",")}
+    else:                   means = synthMeans
+
+    start = time.time()
+    writeSyntheticLog(path, records, cycletime, means)
+    duration = time.time() - start
+    print("{} records written to '{}' in {:0.1f} sec ({:0.0f} records/sec)".format(records, path, duration, records / duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -36,6 +36,7 @@ import urllib.request           # for use with Radiation World Map
 import urllib.parse             # for use with Radiation World Map
 
 import gsql
+import gplot
 #import gaudio
 import gsounddev
 
@@ -51,6 +52,8 @@ def printSuSt():
         gglobs.exgg.showStatusMessage("No data available")
         return
 
+    if gplot.isRollupShown("Summary Statistics"): return
+
     fprint(header("Summary Statistics of Variables selected in Plot"))
     fprint("File      = {}".format(gglobs.currentDBPath))
     fprint("Filesize  = {:10,.0f} Bytes".format(os.path.getsize(gglobs.currentDBPath)))
@@ -75,14 +78,20 @@ def getlstats(logTime, logVar, vname):
     logtime_min      = logTime.min()
     logtime_delta    = logtime_max - logtime_min # in days
 
-    logVar_max       = np.nanmax    (logVar)
-    logVar_min       = np.nanmin    (logVar)
-    logVar_avg       = np.nanmean   (logVar)
-    logVar_med       = np.nanmedian (logVar)
-    logVar_var       = np.nanvar    (logVar)
-    logVar_std       = np.nanstd    (logVar)
+    # the statistics of the plotted slice are kept up to date by makePlot
+    if vname in gglobs.varStats:    stats = gglobs.varStats[vname]
+    else:                           stats = RunningStats(logVar)
+
+    logVar_max       = stats.max
+    logVar_min       = stats.min
+    logVar_avg       = stats.mean
+    logVar_med       = stats.quantile(0.5)
+    logVar_var       = stats.var
+    logVar_std       = stats.std
+    logVar_p05       = stats.quantile(0.05)
+    logVar_p95       = stats.quantile(0.95)
 
-    logVar_err       = logVar_std / np.sqrt(logVar.size)
+    logVar_err       = logVar_std / np.sqrt(stats.count)
     logVar_sqrt      = np.sqrt(logVar_avg)
     logVar_95        = logVar_std * 1.96   # 95% confidence range
 
@@ -118,14 +127,14 @@ def getlstats(logTime, logVar, vname):
         ltext.append("  Std.Dev.  ={:8.2f} {:8.2f}%       LoLim={:8.2f}        HiLim={:8.2f}" .format(logVar_std,  logVar_std  / logVar_avg * 100.,  logVar_avg-logVar_std,         logVar_avg+logVar_std)  )
         ltext.append("  Sqrt(Avg) ={:8.2f} {:8.2f}%       LoLim={:8.2f}        HiLim={:8.2f}" .format(logVar_sqrt, logVar_sqrt / logVar_avg * 100.,  logVar_avg-logVar_sqrt,        logVar_avg+logVar_sqrt) )
         ltext.append("  Std.Err.  ={:8.2f} {:8.2f}%       LoLim={:8.2f}        HiLim={:8.2f}" .format(logVar_err,  logVar_err  / logVar_avg * 100.,  logVar_avg-logVar_err,         logVar_avg+logVar_err) )
-        ltext.append("  Median    ={:8.2f} {:8.2f}%       P_5% ={:8.2f}        P_95%={:8.2f}" .format(logVar_med,  logVar_med  / logVar_avg * 100.,  np.nanpercentile(logVar, 5),   np.nanpercentile(logVar, 95)))
+        ltext.append("  Median    ={:8.2f} {:8.2f}%       P_5% ={:8.2f}        P_95%={:8.2f}" .format(logVar_med,  logVar_med  / logVar_avg * 100.,  logVar_p05,                    logVar_p95))
         ltext.append("  95% Conf*)={:8.2f} {:8.2f}%       LoLim={:8.2f}        HiLim={:8.2f}" .format(logVar_95,   logVar_95   / logVar_avg * 100.,  logVar_avg-logVar_95,          logVar_avg+logVar_95)   )
     else:
         ltext.append("  Variance  ={:8.2f}  {:>8s}"                                             .format(logVar_var,  "N.A."))
         ltext.append("  Std.Dev.  ={:8.2f}  {:>8s}       LoLim={:8.2f}        HiLim={:8.2f}"   .format(logVar_std,  "N.A."                         ,  logVar_avg-logVar_std,         logVar_avg+logVar_std)  )
         ltext.append("  Sqrt(Avg) ={:8.2f}  {:>8s}       LoLim={:8.2f}        HiLim={:8.2f}"   .format(logVar_sqrt, "N.A."                         ,  logVar_avg-logVar_sqrt,        logVar_avg+logVar_sqrt) )
         ltext.append("  Std.Err.  ={:8.2f}  {:>8s}       LoLim={:8.2f}        HiLim={:8.2f}"   .format(logVar_err,  "N.A."                         ,  logVar_avg-logVar_err,         logVar_avg+logVar_err) )
-        ltext.append("  Median    ={:8.2f}  {:>8s}       P_5% ={:8.2f}        P_95%={:8.2f}"   .format(logVar_med,  "N.A."                         ,  np.nanpercentile(logVar, 5),   np.nanpercentile(logVar, 95)))
+        ltext.append("  Median    ={:8.2f}  {:>8s}       P_5% ={:8.2f}        P_95%={:8.2f}"   .format(logVar_med,  "N.A."                         ,  logVar_p05,                    logVar_p95))
         ltext.append("  95% Conf*)={:8.2f}  {:>8s}       LoLim={:8.2f}        HiLim={:8.2f}"   .format(logVar_95,   "N.A."                         ,  logVar_avg-logVar_95,          logVar_avg+logVar_95)   )
 
     return "\n".join(ltext)
@@ -209,6 +218,59 @@ def printStats():
     d.exec_()
 
 
+def printTimingStats():
+    """Shows the durations of the stages of getLogValues as measured by
+    gglobs.logTiming since the start of logging"""
+
+    timing = gglobs.logTiming
+
+    if timing is None or timing.cycles == 0:
+        gglobs.exgg.showStatusMessage("No timing data available; start logging first")
+        return
+
+    lstats   = QTextBrowser()
+    lstats.setLineWrapMode(QTextEdit.NoWrap)
+    lstats.setTextInteractionFlags(Qt.LinksAccessibleByMouse|Qt.TextSelectableByMouse)
+
+    lstats.append("Logging Cycle Timing\n")
+    lstats.append("  Logcycle      = {} s".format(gglobs.logcycle))
+    lstats.append("  Cycles        = {:,.0f}".format(timing.cycles))
+    lstats.append("  Overruns      = {:,.0f}  (cycles taking longer than Logcycle)".format(timing.overruns))
+    if timing.lastOverrun is not None:
+        lstats.append("  Last Overrun  = {}  duration {:0.1f} ms".format(*timing.lastOverrun))
+    lstats.append("  Timing Table  = {}".format("saved in table 'timing' of the log database" if gglobs.timingTable else "not saved"))
+    lstats.append("")
+    lstats.append("Legend: durations in ms; Percentiles from the last {} cycles; Count and Max from all cycles\n".format(timing.size))
+    lstats.append("="*100)
+
+    lstats.append("{:15s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}".format("Stage", "Count", "Last", "P_50%", "P_95%", "P_99%", "Max"))
+    lstats.append("-"*100)
+    for stage, count, last, p50, p95, p99, vmax in timing.summary():
+        if stage == "Total": lstats.append("-"*100)
+        lstats.append("{:15s} {:10,.0f} {:10.2f} {:10.2f} {:10.2f} {:10.2f} {:10.2f}".format(stage, count, last, p50, p95, p99, vmax))
+    lstats.append("="*100)
+
+    lstats.moveCursor(QTextCursor.Start)
+
+    d = QDialog()
+    d.setWindowIcon(gglobs.exgg.iconGeigerLog)
+    d.setFont(gglobs.exgg.fontstd)
+    d.setWindowTitle("Timing Statistics")
+    d.setWindowModality(Qt.WindowModal)
+    d.setMinimumWidth(900)
+    d.setMinimumHeight(500)
+
+    bbox    = QDialogButtonBox()
+    bbox.setStandardButtons(QDialogButtonBox.Ok)
+    bbox.accepted.connect(lambda: d.done(0))
+
+    layoutV = QVBoxLayout(d)
+    layoutV.addWidget(lstats)
+    layoutV.addWidget(bbox)
+
+    d.exec_()
+
+
 def pushToWeb():
     """Send countrate info to website"""
 
@@ -962,6 +1024,27 @@ def displayLastValues(self):
     gglobs.displayLastValuesIsOn = False
 
 
+def formatPlotData(t0, columns):
+    """Format the records of printPlotData in bulk: t0 is the array of times in
+    matplotlib days, columns the list of value arrays. Return an array of
+    strings, one per record like '    0, 2020-09-13 12:26:40,    21.00, ...',
+    with blanks for NAN"""
+
+    # the times as datetime64, from the first one as given by matplotlib,
+    # then truncated to full seconds like str(mpld.num2date(t))[:19]
+    t0      = np.asarray(t0, dtype=np.float64)
+    tfirst  = np.datetime64(mpld.num2date(t0[0]).replace(tzinfo=None), "us")
+    tdelta  = np.round((t0 - t0[0]) * 86400E6).astype("timedelta64[us]")
+    dtimes  = np.char.replace(np.datetime_as_string((tfirst + tdelta).astype("datetime64[s]")), "T", " ")
+
+    lines   = np.char.add(np.char.mod("%5d, ", np.arange(len(t0))), dtimes)
+    for values in columns:
+        vtext = np.char.mod(", %8.2f", values)
+        lines = np.char.add(lines, np.where(np.isnan(values), ", " + " " * 8, vtext))
+
+    return lines
+
+
 def printPlotData():
     """Print Data as selected in Plot. Data are taken from the plot, not from
     the database!"""
@@ -972,24 +1055,27 @@ def printPlotData():
         gglobs.exgg.showStatusMessage("No data available")
         return
 
+    if gplot.isRollupShown("Print Plot Data"): return
+
     gglobs.exgg.setBusyCursor()
 
-    header = "{:5s}, {:19s}".format("#No", "Datetime")
+    header  = "{:5s}, {:19s}".format("#No", "Datetime")
+    columns = []
     for vname in gglobs.varnames:
         if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
             header += ", {:>8s}".format(vname)
+            columns.append(gglobs.logSlice[vname])
 
+    lines = formatPlotData(t0, columns)
+
+    # print as few large text blocks, not line by line
+    batch = 5000
     fprint(header)
-    for i in range(len(t0)):
-        vcc = "{:>5d}, {:<19s}".format(i, str(mpld.num2date(t0[i]))[:19])
-        for vname in gglobs.varnames:
-            if gglobs.exgg.varDisplayCheckbox[vname].isChecked():
-                vi = gglobs.logSlice[vname][i]
-                if np.isnan(vi):
-                    vcc += ", {:>8s}".format(" ")
-                else:
-                    vcc += ", {:>8.2f}".format(gglobs.logSlice[vname][i])
-        fprint(vcc)
+    gglobs.stopPrinting = False
+    for i in range(0, len(lines), batch):
+        fprint("\n".join(lines[i:i + batch].tolist()))
+        if gglobs.stopPrinting: break
+    gglobs.stopPrinting = False
     fprint(header)
 
     gglobs.exgg.setNormalCursor()
@@ -40,6 +40,7 @@ import copy                         # make shallow and deep copies
 import threading
 import queue                        # queue for threading
 import re                           # regex
+import bisect                       # searching in sorted lists
 import configparser                 # parse configuration file geigerlog.cfg
 
 import sounddevice       as sd
@@ -50,7 +51,6 @@ import serial.tools.list_ports      # allows listing of serial ports
 import urllib.request               # for ambiomon web transfer
 
 import numpy             as np
-import matplotlib
 import struct                       # packing numbers into chars (needed by gcommands.py)
 import paho.mqtt.client  as mqtt    # https://pypi.org/project/paho-mqtt/ (needed by gambiomon.py und gradmon.py)
 import sqlite3                      # sudo -H pip3 install  pysqlite3; but should be part of python3 (needed by gsql.py)
@@ -64,25 +64,29 @@ import scipy.stats                  # a subpackage of scipy; needs separate impo
 import gglobs                       # all global vars
 
 
-# Installing PyQt5
-# http://pyqt.sourceforge.net/Docs/PyQt5/installation.html easy with Pip:
-# pip3 install pyqt5
-from PyQt5.QtWidgets            import *
-from PyQt5.QtGui                import *
-from PyQt5.QtCore               import *
-from PyQt5.QtPrintSupport       import *
+# The headless daemon (gdaemon.py) sets gglobs.headless before importing this
+# module; then neither Qt nor matplotlib will be imported
+if not gglobs.headless:
+    # Installing PyQt5
+    # http://pyqt.sourceforge.net/Docs/PyQt5/installation.html easy with Pip:
+    # pip3 install pyqt5
+    from PyQt5.QtWidgets            import *
+    from PyQt5.QtGui                import *
+    from PyQt5.QtCore               import *
+    from PyQt5.QtPrintSupport       import *
 
-##~matplotlib.use('Qt5Agg', warn=True, force=False) # use Qt5Agg, not the default TkAgg
-##~matplotlib.use(backend, warn=<deprecated parameter>, force=True)[source]
-matplotlib.use('Qt5Agg', force=False) # use Qt5Agg, not the default TkAgg für Py3.7 erforderlich
+    import matplotlib
+    ##~matplotlib.use('Qt5Agg', warn=True, force=False) # use Qt5Agg, not the default TkAgg
+    ##~matplotlib.use(backend, warn=<deprecated parameter>, force=True)[source]
+    matplotlib.use('Qt5Agg', force=False) # use Qt5Agg, not the default TkAgg für Py3.7 erforderlich
 
 
-import matplotlib.backends.backend_qt5agg        # MUST be done BEFORE importing pyplot!
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg    as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+    import matplotlib.backends.backend_qt5agg        # MUST be done BEFORE importing pyplot!
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg    as FigureCanvas
+    from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
-import matplotlib.pyplot as plt # MUST import AFTER 'matplotlib.use()' / matplotlib-backend!!!
-import matplotlib.dates  as mpld
+    import matplotlib.pyplot as plt # MUST import AFTER 'matplotlib.use()' / matplotlib-backend!!!
+    import matplotlib.dates  as mpld
 
 
 # tricks for Linux:
@@ -275,18 +279,79 @@ def header(txt):
     return "<br>==== {} {}".format(txt, "=" * max(0, (75 - len(txt))))
 
 
-def logPrint(*args):
-    """print all args in logPad area"""
+def logPrint(*args, julian=None):
+    """print all args in logPad area. julian is the time of the line as
+    Julianday, default is now; it is needed to load older lines from the log
+    database when the LogPad is scrolled to its top"""
 
     line = "{:35s}".format(args[0])
     for s in range(1, len(args)):   line += "{}".format(args[s])
 
+    if gglobs.headless:
+        print(line)
+        return
+
+    document = gglobs.logPad.document()
+    nblocks  = 0 if document.isEmpty() else document.blockCount()
     gglobs.logPad.append(line)
     #QApplication.processEvents() # if this is present then execution stops when
                                   # the DisplayLastLogValues is called. Strange!
+
+    if julian is None: julian = getLocaltimeJulian()[0]
+    gglobs.logPadTimes += [julian] * (document.blockCount() - nblocks)
+
+    # the LogPad is a ring of logPadMaxLines lines when showing the end; when
+    # scrolled back it may hold up to twice as many
+    scrollbar = gglobs.logPad.verticalScrollBar()
+    if scrollbar.value() == scrollbar.maximum():    maxlines = gglobs.logPadMaxLines
+    else:                                           maxlines = gglobs.logPadMaxLines * 2
+
+    excess = document.blockCount() - maxlines
+    if excess > 0:
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.Start)
+        cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, excess)
+        cursor.removeSelectedText()
+        del gglobs.logPadTimes[:excess]
+
     return
 
 
+def logPadPrepend(lines):
+    """insert lines, a list of (julian, text) as from gsql.DB_readLogPadLines,
+    at the top of the LogPad, keeping the view on the lines shown before"""
+
+    scrollbar = gglobs.logPad.verticalScrollBar()
+    oldmax    = scrollbar.maximum()
+
+    cursor    = QTextCursor(gglobs.logPad.document())
+    cursor.movePosition(QTextCursor.Start)
+    cursor.beginEditBlock()
+    cursor.insertText("\n".join(text for julian, text in lines) + "\n")
+    cursor.endEditBlock()
+    gglobs.logPadTimes[0:0] = [julian for julian, text in lines]
+
+    scrollbar.setValue(scrollbar.maximum() - oldmax)
+
+
+def formatLogPadLine(index, timetag, values, varchecked):
+    """the line of a log record in the LogPad, for the variables checked in
+    varchecked, e.g.:
+    1162 11:43:40   M=143  S=1  M1=  S1=  M2=128.0  S2=3.0  T=25.0  P=983.63  H=24.0  R=18.0
+    timetag: cut-off Date, use time only  '2018-07-14 12:00:52' --> '12:00:52'"""
+
+    printstring = "{:2.7g} {:8s} " .format(index, timetag[11:])
+    for vname in gglobs.varnames:
+        if varchecked[vname]:
+            printstring     += " {}=".format(gglobs.vardict[vname][1])
+            if not np.isnan(values[vname]):
+                printstring += "{:<7.6g}".format(values[vname]) # can print 6 digit number as integer
+            else:
+                printstring += " " * 6
+
+    return printstring
+
+
 def efprint(*args, error=False, debug=False, errsound=True):
     """error fprint"""
 
@@ -300,30 +365,71 @@ def qefprint(*args, error=False, debug=False, errsound=False):
 
 
 def fprint(*args, error=False, debug=False, errsound=True):
-    """print all args in the notePad area"""
+    """print all args in the notePad area. The text is collected and written
+    to the notePad at most notePadRate times per second, see flushNotePad"""
 
     ps = "{:30s}".format(str(args[0]))     # 1st arg
     for s in range(1, len(args)):          # skip 1st arg
         ps += str(args[s])
 
-    # jump to the end of text --> new text will always become visible
-    #gglobs.notePad.ensureCursorVisible() # does work, but moves text to left, so than
-                                          # cursor on most-right position is visible
-                                          # requires moving text to left; not helpful
-    gglobs.notePad.verticalScrollBar().setValue(gglobs.notePad.verticalScrollBar().maximum())
+    if gglobs.headless:
+        # no notePad; write to the program log file and the terminal instead
+        commonPrint("NOTE", cleanHTML(ps), error=error)
+        return
 
     if error :
         if errsound:  playWav("error")
-        gglobs.notePad.append("<span style='color:red;'>"   + ps + "</span>")
+        gglobs.notePadBuffer.append("<span style='color:red;'>"   + ps + "</span>")
     else:
-        gglobs.notePad.setTextColor(QColor(60, 60, 60))
-        gglobs.notePad.append(ps)
-
-    Qt_update()
+        gglobs.notePadBuffer.append(ps)
+
+    # the first text after a quiet period is shown at once, any following
+    # within the interval is written by the next call after it, or by timer
+    interval = 1 / gglobs.notePadRate
+    if time.time() - gglobs.notePadFlushed >= interval:
+        flushNotePad()
+        if not gglobs.notePadUpdating:     # no recursion from within processEvents
+            gglobs.notePadUpdating = True
+            Qt_update()
+            gglobs.notePadUpdating = False
+
+    elif not gglobs.notePadTimer:
+        gglobs.notePadTimer = True
+        QTimer.singleShot(int(interval * 1000), flushNotePad)
 
     dprint(ps, debug=debug)
 
 
+def flushNotePad():
+    """write all texts collected by fprint to the notePad in a single edit"""
+
+    gglobs.notePadTimer   = False
+    gglobs.notePadFlushed = time.time()
+    if len(gglobs.notePadBuffer) == 0: return
+
+    texts                 = gglobs.notePadBuffer
+    gglobs.notePadBuffer  = []
+
+    # like notePad.append: every text as a new paragraph, as html if it looks like html
+    document    = gglobs.notePad.document()
+    cursor      = QTextCursor(document)
+    cursor.movePosition(QTextCursor.End)
+    textformat  = QTextCharFormat()
+    textformat.setForeground(QColor(60, 60, 60))
+    newblock    = not document.isEmpty()
+
+    cursor.beginEditBlock()
+    for text in texts:
+        if newblock:                    cursor.insertBlock()
+        if Qt.mightBeRichText(text):    cursor.insertHtml(text)
+        else:                           cursor.insertText(text, textformat)
+        newblock = True
+    cursor.endEditBlock()
+
+    # jump to the end of text --> new text will always become visible
+    gglobs.notePad.verticalScrollBar().setValue(gglobs.notePad.verticalScrollBar().maximum())
+
+
 def commonPrint(ptype, *args, error=False):
     """Printing function to dprint, vprint, and wprint"""
 
@@ -658,6 +764,21 @@ def readGeigerLogConfig():
             if t >= 0.1:                            gglobs.logcycle = t
             vprint(infostr.format("Logcycle (sec)", gglobs.logcycle))
 
+        t = getConfigEntry("Logging", "timing_table", "upper" )
+        if t != "WARNING":
+            if t == "YES":                          gglobs.timingTable = True
+            vprint(infostr.format("Timing Table", gglobs.timingTable))
+
+        t = getConfigEntry("Logging", "compact_schema", "upper" )
+        if t != "WARNING":
+            if t == "YES":                          gglobs.compactSchema = True
+            vprint(infostr.format("Compact Schema", gglobs.compactSchema))
+
+        t = getConfigEntry("Logging", "log_partition", "upper" )
+        if t != "WARNING":
+            if t in ("DAILY", "MONTHLY", "YEARLY"): gglobs.logPartition = t.lower()
+            vprint(infostr.format("Log Partition", gglobs.logPartition))
+
 
     # Folder data
         t = getConfigEntry("Folder", "data", "str" )
@@ -723,9 +844,15 @@ def readGeigerLogConfig():
             else:                      gglobs.window_size = 'auto'
             vprint(infostr.format("Window Size ", gglobs.window_size))
 
+    # LogPad lines
+        t = getConfigEntry("Window", "logpad_lines", "int" )
+        if t != "WARNING":
+            if t >= 100:                            gglobs.logPadMaxLines = t
+            vprint(infostr.format("LogPad lines", gglobs.logPadMaxLines))
+
     # Window Style
         t = getConfigEntry("Window", "windowStyle", "upper" )
-        if t != "WARNING":
+        if t != "WARNING" and not gglobs.headless:
             available_style = QStyleFactory.keys()
             #print("readGeigerLogConfig: WindowStyle available: ", available_style)
             if t in available_style:    gglobs.windowStyle = t
@@ -760,6 +887,19 @@ def readGeigerLogConfig():
             gglobs.mav = gglobs.mav_initial
             vprint(infostr.format("Moving Average Initial (sec)", int(gglobs.mav_initial)))
 
+    # Graphic mav_mode
+        t = getConfigEntry("Graphic", "mav_mode", "upper" )
+        if t != "WARNING":
+            if   t == "POINTS":  gglobs.mavMode = "points"
+            else:                gglobs.mavMode = "time"
+            vprint(infostr.format("Moving Average Mode", gglobs.mavMode))
+
+    # Graphic rollup_points
+        t = getConfigEntry("Graphic", "rollup_points", "int" )
+        if t != "WARNING":
+            if t >= 0:  gglobs.rollupPoints = t
+            vprint(infostr.format("Rollup Points", gglobs.rollupPoints))
+
 
     # Plotstyle
         vprint(infostrHeader.format("Plotstyle", ""))
@@ -1042,6 +1182,18 @@ def readGeigerLogConfig():
                     else:                   gglobs.AudioThreshold = 60
                 vprint(infostr.format("AudioThreshold", gglobs.AudioThreshold))
 
+            # AudioCounter DEADTIME
+            t = getConfigEntry("AudioCounter", "AudioDeadtime", "upper" )
+            if t != "WARNING":
+                if t == "AUTO":             gglobs.AudioDeadtime = "auto"
+                else:
+                    try:
+                        t = float(t)
+                        if t >= 0:          gglobs.AudioDeadtime = t
+                        else:               gglobs.AudioDeadtime = "auto"
+                    except:                 gglobs.AudioDeadtime = "auto"
+                vprint(infostr.format("AudioDeadtime (µs)", gglobs.AudioDeadtime))
+
             # AudioCounter Variables
             t = getConfigEntry("AudioCounter", "AudioVariables", "str" )
             if t != "WARNING":
@@ -1378,8 +1530,9 @@ def getVersionStatus():
 
     python_version = sys.version.replace('\n', "")
 
-    from sip            import SIP_VERSION_STR
-    from matplotlib     import __version__          as mpl_version
+    if not gglobs.headless:
+        from sip        import SIP_VERSION_STR
+        from matplotlib import __version__          as mpl_version
     from numpy          import __version__          as np_version
     from scipy          import __version__          as scipy_version
     from serial         import __version__          as serial_version     # alternartive  serial_version = serial.VERSION
@@ -1392,12 +1545,14 @@ def getVersionStatus():
     version_status.append(["GeigerLog",         "{}".format(gglobs.__version__)])
 
     version_status.append(["Python",            "{}".format(sys.version.replace('\n', ""))])
-    version_status.append(["Qt",                "{}".format(QT_VERSION_STR)])
-    version_status.append(["PyQt",              "{}".format(PYQT_VERSION_STR)])
-    version_status.append(["SIP",               "{}".format(SIP_VERSION_STR)])
+    if not gglobs.headless:
+        version_status.append(["Qt",            "{}".format(QT_VERSION_STR)])
+        version_status.append(["PyQt",          "{}".format(PYQT_VERSION_STR)])
+        version_status.append(["SIP",           "{}".format(SIP_VERSION_STR)])
 
     version_status.append(["pyserial",          "{}".format(serial_version)])
-    version_status.append(["matplotlib",        "{}".format(mpl_version)])
+    if not gglobs.headless:
+        version_status.append(["matplotlib",    "{}".format(mpl_version)])
     version_status.append(["numpy",             "{}".format(np_version)])
     version_status.append(["scipy",             "{}".format(scipy_version)])
     version_status.append(["paho.mqtt",         "{}".format(paho_version)])
@@ -1423,6 +1578,10 @@ def beep():
     # https://askubuntu.com/questions/19906/beep-in-shell-script-not-working
     #print("beep by print\7")
 
+    if gglobs.headless:
+        print("\7", end="")
+        return
+
     QApplication.beep()
     QApplication.processEvents()
 
@@ -1579,6 +1738,297 @@ def scaleGraphValues(variable, value, scale):
     return scaledValue
 
 
+class P2Quantile:
+    """Streaming estimate of the p-quantile with the P² algorithm (Jain and
+    Chlamtac, 1985): 5 markers, O(1) memory and time per value"""
+
+    def __init__(self, p):
+
+        self.p      = p
+        self.dn     = [0, p / 2, p, (1 + p) / 2, 1]     # python lists are faster than numpy for 5 items
+        self.init   = []                    # the first values, until 5 are present
+        self.q      = None                  # marker heights
+        self.n      = None                  # marker positions (1-based)
+        self.nd     = None                  # desired marker positions
+
+
+    def reset(self, values):
+        """Set the markers from all values at once; exact at this point"""
+
+        count = values.size
+        if count < 5:
+            self.init   = sorted(values.tolist())
+            self.q      = None
+            return
+
+        self.q      = np.percentile(values, [dn * 100 for dn in self.dn]).tolist()
+        self.n      = [1 + round((count - 1) * dn) for dn in self.dn]
+        self.nd     = [1 + (count - 1) * dn for dn in self.dn]
+        self.init   = []
+
+
+    def add(self, x):
+        """Update the markers with a new value x"""
+
+        if self.q is None:
+            self.init.append(x)
+            if len(self.init) == 5:
+                self.q      = sorted(self.init)
+                self.n      = [1, 2, 3, 4, 5]
+                self.nd     = [1 + 4 * dn for dn in self.dn]
+                self.init   = []
+            return
+
+        q, n = self.q, self.n
+        if   x <  q[0]: q[0] = x; k = 0
+        elif x >= q[4]: q[4] = x; k = 3
+        else:           k = bisect.bisect_right(q, x) - 1
+
+        for i in range(k + 1, 5): n[i]       += 1
+        for i in range(5):        self.nd[i] += self.dn[i]
+
+        for i in (1, 2, 3):
+            d = self.nd[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d  = 1 if d > 0 else -1
+                # parabolic prediction, if not monotonic then linear
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) + \
+                                                         (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i]  = qp
+                n[i] += d
+
+
+    def value(self):
+        """The current estimate of the quantile"""
+
+        if self.q is not None:      return self.q[2]
+        if len(self.init) == 0:     return gglobs.NAN
+        return np.percentile(self.init, self.p * 100)
+
+
+class RunningStats:
+    """Statistics of a variable, updated incrementally when values are
+    appended: count, mean and variance (Welford), min, max, and the median,
+    P_5% and P_95% by P² estimators. NAN values are ignored."""
+
+    def __init__(self, values=None):
+
+        self.quantiles = {0.05: P2Quantile(0.05), 0.5: P2Quantile(0.5), 0.95: P2Quantile(0.95)}
+        self.reset(np.empty(0) if values is None else values)
+
+
+    def reset(self, values):
+        """Compute all statistics from scratch, vectorized"""
+
+        values      = values[np.isfinite(values)]
+        self.count  = values.size
+        if self.count > 0:
+            self.mean   = np.mean(values)
+            self.M2     = np.sum((values - self.mean)**2)
+            self.min    = np.min(values)
+            self.max    = np.max(values)
+        else:
+            self.mean   = gglobs.NAN
+            self.M2     = 0.0
+            self.min    = gglobs.NAN
+            self.max    = gglobs.NAN
+
+        for qe in self.quantiles.values(): qe.reset(values)
+
+
+    def add(self, values):
+        """Update the statistics with the appended values"""
+
+        values = values[np.isfinite(values)]
+        if values.size == 0: return
+        if self.count == 0:
+            self.reset(values)
+            return
+
+        # merge with the statistics of the new values (Chan et al.);
+        # for a single value this is Welford's update
+        n       = values.size
+        mean    = np.mean(values)
+        delta   = mean - self.mean
+        total   = self.count + n
+        self.M2    += np.sum((values - mean)**2) + delta**2 * self.count * n / total
+        self.mean  += delta * n / total
+        self.count  = total
+        self.min    = min(self.min, np.min(values))
+        self.max    = max(self.max, np.max(values))
+
+        for x in values.tolist():
+            for qe in self.quantiles.values(): qe.add(x)
+
+
+    @property
+    def var(self):
+        """population variance, like np.nanvar"""
+        return self.M2 / self.count if self.count > 0 else gglobs.NAN
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def quantile(self, p):
+        """p must be one of 0.05, 0.5, 0.95"""
+        return self.quantiles[p].value()
+
+
+class CycleTiming:
+    """Durations of the stages of a logging cycle, measured with a monotonic
+    clock. For every stage the last 'size' durations are kept in a ring buffer,
+    from which the percentiles are calculated when needed; count and maximum
+    cover all cycles since the start of logging. All durations in ms."""
+
+    def __init__(self, size=1000):
+
+        self.size       = size
+        self.rings      = {}                # stage -> numpy array of size, NAN-filled
+        self.pos        = {}                # stage -> next write position in ring
+        self.count      = {}                # stage -> number of all measurements
+        self.max        = {}                # stage -> max of all measurements
+        self.last       = {}                # stage -> last measurement
+        self.current    = {}                # stage -> measurement in the current cycle
+        self.cycles     = 0
+        self.overruns   = 0
+        self.lastOverrun = None             # (time as string, duration) of last overrun
+        self.t0         = time.perf_counter()
+        self.tlast      = self.t0
+
+
+    def start(self):
+        """Begin a new cycle"""
+
+        self.t0         = time.perf_counter()
+        self.tlast      = self.t0
+        self.current    = {}
+
+
+    def mark(self, stage):
+        """Record the time since the previous mark (or the start) as the
+        duration of stage"""
+
+        now         = time.perf_counter()
+        self.record(stage, (now - self.tlast) * 1000)
+        self.tlast  = now
+
+
+    def record(self, stage, duration):
+        """Add a duration to the ring buffer of stage"""
+
+        if stage not in self.rings:
+            self.rings[stage]   = np.full(self.size, np.nan)
+            self.pos[stage]     = 0
+            self.count[stage]   = 0
+            self.max[stage]     = 0
+
+        self.rings[stage][self.pos[stage]] = duration
+        self.pos[stage]     = (self.pos[stage] + 1) % self.size
+        self.count[stage]  += 1
+        self.max[stage]     = max(self.max[stage], duration)
+        self.last[stage]    = duration
+        self.current[stage] = duration
+
+
+    def stop(self, logcycle):
+        """End the cycle; record the total duration as stage 'Total' and
+        return (duration, overrun), with overrun True when the cycle took
+        longer than logcycle (in sec)"""
+
+        duration    = (time.perf_counter() - self.t0) * 1000
+        overrun     = duration > logcycle * 1000
+        self.record("Total", duration)
+        self.cycles += 1
+        if overrun:
+            self.overruns   += 1
+            self.lastOverrun = (stime(), duration)
+
+        return duration, overrun
+
+
+    def summary(self):
+        """list of (stage, count, last, p50, p95, p99, max) for all stages"""
+
+        rows = []
+        for stage, ring in self.rings.items():
+            p50, p95, p99 = np.nanpercentile(ring, [50, 95, 99])
+            rows.append((stage, self.count[stage], self.last[stage], p50, p95, p99, self.max[stage]))
+
+        return rows
+
+
+class CycleScheduler:
+    """Schedules logging cycles at absolute deadlines t0 + k * cycle on the
+    monotonic clock, so the duration of a cycle and the latency of the timer
+    do not accumulate as drift. A cycle whose deadline has already passed by
+    a full cycle or more is not caught up but counted as missed."""
+
+    def __init__(self, cycle):
+
+        self.cycle      = cycle             # in sec
+        self.t0         = time.monotonic()
+        self.k          = 0                 # number of the current cycle
+        self.missed     = 0                 # total of missed cycles
+        self.late       = 0.0               # lateness of the current cycle, sec
+
+
+    def begin(self):
+        """Call at the start of a cycle; returns the lateness in sec vs. its deadline"""
+
+        self.late = max(0.0, time.monotonic() - (self.t0 + self.k * self.cycle))
+        return self.late
+
+
+    def next(self):
+        """Call at the end of a cycle; advances to the next deadline and returns
+        (wait time in sec until that deadline, number of cycles missed). A
+        deadline passed by less than a full cycle gives a wait of 0, i.e. the
+        next cycle runs at once, late; only the whole cycles elapsed beyond
+        the deadline are skipped and counted as missed"""
+
+        self.k  += 1
+        now      = time.monotonic()
+        deadline = self.t0 + self.k * self.cycle
+        missed   = 0
+        if now > deadline:
+            missed       = int((now - deadline) / self.cycle)
+            self.k      += missed
+            self.missed += missed
+            deadline     = self.t0 + self.k * self.cycle
+
+        return max(0.0, deadline - now), missed
+
+
+def getLocaltimeJulian(t=None):
+    """Local time as both Julianday and timetag, like gsql.DB_getLocaltime,
+    but from the computer clock without a database query:
+    (2458512.928904213, '2019-01-29 10:17:37'). t is unix time, default now."""
+
+    if t is None: t = time.time()
+
+    lt      = time.localtime(t)
+    julian  = (t + lt.tm_gmtoff) / 86400.0 + 2440587.5      # 2440587.5 = julianday('1970-01-01 00:00:00')
+    timetag = time.strftime("%Y-%m-%d %H:%M:%S", lt)
+
+    return julian, timetag
+
+
+def getLocaltimeJulianArray(t):
+    """Local time as Julianday for a numpy array of unix times t, the same as
+    getLocaltimeJulian, but in bulk. UTC offsets change only at multiples
+    of 15 min, so the offset is looked up once per 15 min slot in use"""
+
+    t       = np.asarray(t, dtype=np.float64)
+    slots   = np.floor(t / 900)
+    uslots, inverse = np.unique(slots, return_inverse=True)
+    offsets = np.array([time.localtime(s * 900).tm_gmtoff for s in uslots.tolist()], dtype=np.float64)
+
+    return (t + offsets[inverse]) / 86400.0 + 2440587.5
+
+
 def readSerialConsole():
     """read the ESP32 terminal output"""
 
@@ -1676,12 +2126,13 @@ def setTime():
 
 
 # making a label click-sensitive
-class ClickLabel(QLabel):
-    def __init__(self, parent):
-        QLabel.__init__(self, parent)
+if not gglobs.headless:
+    class ClickLabel(QLabel):
+        def __init__(self, parent):
+            QLabel.__init__(self, parent)
 
-    def mousePressEvent(self, event):
-        colorPicker()
+        def mousePressEvent(self, event):
+            colorPicker()
 
 
 def colorPicker():
@@ -1717,6 +2168,8 @@ def printProgError(*args):
 def Qt_update():
     """updates the Qt window"""
 
+    if gglobs.headless: return
+
     QApplication.processEvents()
     #~if gglobs.devel: wprint("--------------------Qt_update: QApplication.processEvents()")
 